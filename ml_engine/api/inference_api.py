@@ -1,21 +1,81 @@
 from fastapi import FastAPI, UploadFile, File, Form
-from typing import Optional, Dict, Any
-import cv2
-import numpy as np
+from fastapi.responses import JSONResponse, Response
+from typing import Optional, List
+import asyncio
+import json
+import os
 import traceback
-from core.decision_engine import process_frame
-
-from modules.water_leak.leak_pipeline import process_water_frame
-from modules.waste_monitor.waste_pipeline import process_waste_frame
-from detectors.person_detector import detect_person
-from detectors.water_detector import detect_raw_puddles
-from detectors.waste_detector import detect_waste as detect_waste_raw
+from core.analysis import (
+    analyze_batch,
+    analyze_bytes,
+    analyze_shared_frame,
+    analyze_tracked_frame,
+    convert_numpy_types,
+    decode_native,
+    lookup_response,
+    make_options_key,
+    remember_response,
+)
+from core.config import (
+    ANALYSIS_EXECUTOR,
+    ANALYSIS_WORKERS,
+    ANALYSIS_QUEUE_SIZE,
+    ANALYSIS_RETRY_AFTER,
+    BATCH_MAX_IMAGES,
+    CAMERA_PROFILES,
+    DEFAULT_CAMERA_ID,
+    DETECTOR_PROFILES,
+    FRAME_ARENA_ENABLED,
+    MODEL_WARMUP,
+    RESPONSE_CACHE_ENABLED,
+    STREAM_SAMPLE_FPS,
+)
+from core import change_gate, near_duplicate
+from core.camera_state import camera_states
+from core.detection_store import detection_store
+from core.executor import AnalysisExecutor, QueueFullError
+from core.frame_arena import ArenaFullError, FrameArena
+from core.frame_context import FrameContext
+from core.detector_registry import DETECTORS, resolve_selection
+from core.jobs import JobQueueFullError, callback_error, job_manager
+from core.metrics import (
+    CONTENT_TYPE,
+    DECODE_SECONDS,
+    ERRORS_TOTAL,
+    REJECTED_TOTAL,
+    SERIALIZATION_SECONDS,
+    render_metrics,
+)
+from core.model_registry import (
+    WorkerReadiness,
+    readiness,
+    start_background_warmup,
+    warmup_worker,
+)
+from core.response_cache import cache_key, response_cache
+from core.serialization import dumps
+from api.schemas import AnalysisResponse, BatchAnalysisResponse, BatchImageOptions
+from core.stream_ingest import stream_manager, stream_source_error
+from detectors.person_detector import person_cascade_stats
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import ValidationError
 
 # ... after app = FastAPI() ...
 
 
-app = FastAPI()
+class NumpyJSONResponse(JSONResponse):
+    """
+    JSON response encoded in one orjson pass, numpy values included.
+    Analysis endpoints return it directly so FastAPI's jsonable_encoder
+    walk is skipped as well.
+    """
+
+    def render(self, content) -> bytes:
+        with SERIALIZATION_SECONDS.time(step="render"):
+            return dumps(content)
+
+
+app = FastAPI(default_response_class=NumpyJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Allows your Vercel frontend to connect
@@ -24,329 +84,580 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def convert_numpy_types(obj):
+# Process workers load their own models and report readiness back;
+# in thread mode the models of this process are the ones that count
+worker_readiness = (
+    WorkerReadiness(ANALYSIS_WORKERS, warming=MODEL_WARMUP) if ANALYSIS_EXECUTOR == "process" else None
+)
+
+# Detector pipeline runs here, never on the event loop
+executor = AnalysisExecutor(
+    mode=ANALYSIS_EXECUTOR,
+    workers=ANALYSIS_WORKERS,
+    queue_size=ANALYSIS_QUEUE_SIZE,
+    initializer=warmup_worker if worker_readiness is not None and MODEL_WARMUP else None,
+    initargs=(worker_readiness.acks,) if worker_readiness is not None else ()
+)
+
+# Decoded uploads reach process workers through shared memory, not pickling
+frame_arena = FrameArena() if ANALYSIS_EXECUTOR == "process" and FRAME_ARENA_ENABLED else None
+
+
+@app.on_event("startup")
+def warmup_models():
+    # Load + warm models off the request path; /ready reports progress
+    if not MODEL_WARMUP:
+        return
+    if worker_readiness is not None:
+        # Starts every worker; each warms up in the pool initializer
+        executor.prime(os.getpid)
+    else:
+        start_background_warmup()
+
+
+@app.on_event("startup")
+async def start_jobs():
+    # Re-queues jobs persisted by a previous run
+    job_manager.start(run_analysis)
+
+
+@app.on_event("startup")
+async def start_streams():
+    # Stream frames share the executor (and its queue bound) with uploads
+    stream_manager.start(analyze_stream_frame, asyncio.get_running_loop())
+
+
+@app.on_event("shutdown")
+async def stop_jobs():
+    await job_manager.stop()
+
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    stream_manager.stop_all()
+    executor.shutdown()
+    if frame_arena is not None:
+        frame_arena.close()
+    detection_store.close()
+
+
+def busy_response():
+    """503 with Retry-After when the analysis queue is full"""
+    REJECTED_TOTAL.inc()
+    return JSONResponse(
+        status_code=503,
+        content={"status": "BUSY", "message": "Analysis queue is full, retry later"},
+        headers={"Retry-After": str(ANALYSIS_RETRY_AFTER)}
+    )
+
+
+@app.get("/health")
+async def health():
+    """Liveness check; answered by the event loop even while workers are busy"""
+    return {
+        "status": "OK",
+        "executor": executor.stats(),
+        "frame_arena": frame_arena.stats() if frame_arena is not None else None,
+        "jobs": job_manager.stats(),
+        "camera_state": camera_states.stats(),
+        "detection_store": detection_store.stats(),
+        "change_gate": change_gate.stats(),
+        "near_duplicate": near_duplicate.stats(),
+        "person_cascade": person_cascade_stats(),
+        "response_cache": response_cache.stats()
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text-format metrics (stage latency histograms, outcomes, queue gauges)"""
+    return Response(content=render_metrics(executor.stats()), media_type=CONTENT_TYPE)
+
+
+@app.get("/ready")
+async def ready():
     """
-    Recursively convert numpy types to Python native types for JSON serialization.
+    Readiness check: 200 once every model is loaded and has run a warmup
+    inference (in every worker process with NAZAR_EXECUTOR=process), 503
+    before that (starts the warmup if it isn't running).
     """
-    if isinstance(obj, dict):
-        return {key: convert_numpy_types(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_numpy_types(item) for item in obj]
-    elif isinstance(obj, (np.integer, np.int64, np.int32)):
-        return int(obj)
-    elif isinstance(obj, (np.floating, np.float64, np.float32)):
-        return float(obj)
-    elif isinstance(obj, (np.bool_,)):
-        return bool(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    else:
-        return obj
+    state = worker_readiness.state() if worker_readiness is not None else readiness()
+    if state["ready"]:
+        return {"status": "READY", **state}
+    # Retries a failed warmup too, e.g. once missing weights were copied in
+    if worker_readiness is None:
+        start_background_warmup()
+    elif worker_readiness.claim_retry():
+        executor.prime(warmup_worker, worker_readiness.acks)
+    return JSONResponse(status_code=503, content={"status": "NOT_READY", **state})
+
+
+# Cameras whose leak timer a worker last reported as pending; the
+# response cache of the process path is bypassed for them
+worker_leak_pending = set()
+
 
+def decode_into_arena(contents: bytes):
+    """Decode an upload into a free arena slot: (FrameHandle, None) or (None, error_response)"""
+    with DECODE_SECONDS.time():
+        ctx, error = decode_native(contents)
+        if error is not None:
+            return None, error
+        return frame_arena.put(ctx), None
 
-def standardize_detection(detection_type: str, detection_data: Dict[str, Any]) -> Dict[str, Any]:
+
+async def analyze_in_worker_process(
+    contents: bytes,
+    start_hour: Optional[int],
+    end_hour: Optional[int],
+    check_unauthorized: bool,
+    debug: bool,
+    camera_id: Optional[str],
+    detectors
+):
     """
-    Standardize any detection to the unified schema:
-    {detection, category, severity, risks, confidence}
+    Process-executor path of /ML_analyze: answer repeats from the
+    response cache, else take an executor slot, decode here (off the
+    event loop), hand the worker a slot handle and free the slot when
+    it finishes.
     """
-    if detection_type == "water_leak":
-        return {
-            "detection": detection_data.get("issue", "Water Leak Detected"),
-            "category": "Plumbing",
-            "severity": detection_data.get("severity", "Medium").title(),
-            "risks": "Water damage, mold growth, structural damage, slip hazard",
-            "confidence": 85  # Water is very specific
-        }
+    selected, error = resolve_selection(detectors, camera_id)
+    if error is not None:
+        return error
     
-    elif detection_type == "waste":
-        clutter_score = detection_data.get("details", {}).get("clutter_score", 0)
-        confidence = min(int(clutter_score * 2.5), 95)
-        return {
-            "detection": detection_data.get("issue_type", "Waste/Clutter Detected"),
-            "category": "Cleanliness",
-            "severity": detection_data.get("severity", "Medium").title(),
-            "risks": "Hazard to students, poor hygiene, pest attraction",
-            "confidence": confidence
-        }
+    camera = camera_id or DEFAULT_CAMERA_ID
+    key = None
+    if RESPONSE_CACHE_ENABLED:
+        options_key = make_options_key(start_hour, end_hour, check_unauthorized, debug, selected)
+        cached, key = lookup_response(
+            cache_key(contents, options_key, camera_id), camera_id, pending=camera in worker_leak_pending
+        )
+        if cached is not None:
+            return cached
     
-    elif detection_type == "unauthorized_access":
-        return {
-            "detection": "Unauthorized Person Detected",
-            "category": "Safety",
-            "severity": "High",
-            "risks": "Security breach, potential theft, safety concern",
-            "confidence": 90
-        }
+    # Admitted before decoding, so bursts cannot pile up decode work
+    executor.reserve()
+    try:
+        handle, error = await asyncio.to_thread(decode_into_arena, contents)
+    except BaseException:
+        executor.unreserve()
+        raise
+    if error is not None:
+        executor.unreserve()
+        ERRORS_TOTAL.inc(kind="decode")
+        return error
     
-    elif detection_type == "broken_infrastructure":
-        damage_score = detection_data.get("details", {}).get("total_damage_score", 0)
-        confidence = min(int(damage_score * 100), 95)
-        return {
-            "detection": "Broken Infrastructure Detected",
-            "category": "Infrastructure",
-            "severity": detection_data.get("severity", "Medium").title(),
-            "risks": "Safety hazard, further deterioration, potential injury",
-            "confidence": confidence
-        }
+    response, pending = await executor.run(
+        analyze_shared_frame,
+        handle, start_hour, end_hour, check_unauthorized, debug, camera_id, selected,
+        on_done=lambda: frame_arena.release(handle),
+        reserved=True
+    )
+    if pending:
+        worker_leak_pending.add(camera)
+    else:
+        worker_leak_pending.discard(camera)
+    remember_response(key, camera_id, response, pending=pending)
+    return response
+
+
+async def analyze_stream_frame(frame, camera_id: str, options: dict):
+    """
+    Analyze one decoded stream frame on the executor, as an upload would
+    be: through the frame arena in process mode.
     
-    elif detection_type == "energy_waste":
-        return {
-            "detection": "Energy Waste Detected",
-            "category": "Electrical",
-            "severity": "Medium",
-            "risks": "Increased electricity costs, environmental impact",
-            "confidence": 70
-        }
+    Returns:
+        (response, whether the camera's leak timer is pending afterwards)
+    
+    Raises:
+        QueueFullError / ArenaFullError when the executor is saturated
+    """
+    args = (
+        options.get("start_hour"),
+        options.get("end_hour"),
+        bool(options.get("check_unauthorized", False)),
+        bool(options.get("debug", False)),
+        camera_id,
+        options.get("detectors")
+    )
+    if frame_arena is None:
+        return await executor.run(analyze_tracked_frame, frame, *args)
     
+    executor.reserve()
+    try:
+        handle = await asyncio.to_thread(frame_arena.put, FrameContext(frame))
+    except BaseException:
+        executor.unreserve()
+        raise
+    response, pending = await executor.run(
+        analyze_shared_frame, handle, *args, on_done=lambda: frame_arena.release(handle), reserved=True
+    )
+    if pending:
+        worker_leak_pending.add(camera_id)
     else:
-        return {
-            "detection": "Unknown Detection",
-            "category": "General",
-            "severity": "Low",
-            "risks": "Unknown risk",
-            "confidence": 0
-        }
+        worker_leak_pending.discard(camera_id)
+    return response, pending
 
 
-def resolve_conflicts(detections: Dict[str, Any]) -> Dict[str, Any]:
+async def run_analysis(
+    contents: bytes,
+    start_hour: Optional[int] = None,
+    end_hour: Optional[int] = None,
+    check_unauthorized: bool = False,
+    debug: bool = False,
+    camera_id: Optional[str] = None,
+    detectors: Optional[str] = None
+):
     """
-    Intelligent conflict resolution.
-    
-    IMPORTANT: Only return the MOST CONFIDENT detection.
-    Don't report multiple issues from a single image.
+    Analyze one upload on the executor (shared by /ML_analyze and jobs).
     
-    Special Rule: If infrastructure is broken, it takes priority over waste.
-    (e.g., broken chair = broken infrastructure, NOT waste/clutter)
+    Raises:
+        QueueFullError / ArenaFullError when the executor is saturated
+    """
+    # Decode + detectors run off the event loop so this worker keeps
+    # serving other connections (including /health) meanwhile
+    if frame_arena is not None:
+        return await analyze_in_worker_process(
+            contents, start_hour, end_hour, check_unauthorized, debug, camera_id, detectors
+        )
+    return await executor.run(
+        analyze_bytes, contents, start_hour, end_hour, check_unauthorized, debug, camera_id, detectors
+    )
+
+
+@app.get("/detectors")
+async def list_detectors():
+    """Detector registry, profiles and per-camera profile assignments"""
+    return {
+        "status": "SUCCESS",
+        "detectors": [d.describe() for d in DETECTORS.values() if d.selectable],
+        "internal": [d.describe() for d in DETECTORS.values() if not d.selectable],
+        "profiles": DETECTOR_PROFILES,
+        "camera_profiles": CAMERA_PROFILES
+    }
+
+
+@app.post("/ML_analyze", responses={200: {"model": AnalysisResponse}})
+async def analyze_image(
+    file: UploadFile = File(...),
+    start_hour: Optional[int] = Form(None),
+    end_hour: Optional[int] = Form(None),
+    check_unauthorized: bool = Form(False),
+    debug: bool = Form(False),
+    camera_id: Optional[str] = Form(None),
+    detectors: Optional[str] = Form(None)
+):
+    """
+    Analyze an image for multiple potential issues.
+    Each detector runs independently and results are reconciled.
     
-    Priority order (most specific first):
-    1. Water leak (very specific, high confidence if detected)
-    2. Broken infrastructure (structural damage - takes priority over waste)
-    3. Person (exact match - specific)
-    4. Waste/Clutter (but only if infrastructure is NOT broken)
-    5. Energy waste (least specific, could be shadows/reflections)
+    Args:
+        file: Image file to analyze
+        debug: If True, return raw detection results from all detectors
+        camera_id: Camera that took the image; temporal checks (leak
+                   confirmation, fan motion) are tracked per camera
+        detectors: Comma-separated detectors and/or profiles to run (see
+                   GET /detectors); default: the camera's profile
     """
+    try:
+        contents = await file.read()
+        result = await run_analysis(
+            contents, start_hour, end_hour, check_unauthorized, debug, camera_id, detectors
+        )
+        return NumpyJSONResponse(result)
     
-    verified = {}
+    except (QueueFullError, ArenaFullError):
+        return busy_response()
+
+    except Exception as e:
+        traceback.print_exc()
+        error_response = {"status": "SERVER_ERROR", "error": str(e)}
+        return convert_numpy_types(error_response)
+
+
+def parse_batch_options(options: Optional[str], count: int):
+    """
+    Parse the per-image options of a batch request.
     
-    # Collect all detections with confidence scores
-    candidates = []
+    `options` is a JSON array with one object per uploaded file, each
+    optionally holding start_hour, end_hour, check_unauthorized, camera_id
+    and detectors, validated by BatchImageOptions. Only the fields an
+    object sets override the request-wide defaults.
     
-    # Water leak - highest priority if present
-    if detections.get("water_leak"):
-        candidates.append({
-            "type": "water_leak",
-            "data": detections["water_leak"],
-            "priority": 1,
-            "confidence": 0.95  # Water is very specific
-        })
+    Returns:
+        (list_of_dicts, None) or (None, 400 error response)
+    """
+    if options is None:
+        return [{} for _ in range(count)], None
     
-    # Person - very specific
-    if detections.get("unauthorized_access"):
-        candidates.append({
-            "type": "unauthorized_access",
-            "data": detections["unauthorized_access"],
-            "priority": 2,
-            "confidence": 0.90
-        })
+    try:
+        parsed = json.loads(options)
+    except ValueError:
+        return None, options_error("options must be a JSON array")
     
-    # Infrastructure damage - but only if VERY confident
-    infrastructure_broken = False
-    infra_data = detections.get("general_infrastructure")
-    if infra_data and isinstance(infra_data, dict):
-        if "broken_infrastructure" in infra_data:
-            damage_data = infra_data["broken_infrastructure"]
-            damage_score = damage_data.get("details", {}).get("total_damage_score", 0)
-            
-            # STRICT: Only report if HIGH confidence (>0.55)
-            if damage_score > 0.55:
-                infrastructure_broken = True
-                candidates.append({
-                    "type": "broken_infrastructure",
-                    "data": {"broken_infrastructure": damage_data},
-                    "priority": 3,
-                    "confidence": min(damage_score, 1.0)
-                })
-        
-        # Energy waste - lowest priority
-        if "energy_waste" in infra_data:
-            candidates.append({
-                "type": "energy_waste",
-                "data": {"energy_waste": infra_data["energy_waste"]},
-                "priority": 5,
-                "confidence": 0.65  # Low confidence due to false positives
-            })
+    if not isinstance(parsed, list) or not all(isinstance(o, dict) for o in parsed):
+        return None, options_error("options must be a JSON array of objects")
     
-    # Waste/Clutter - moderate priority, but SKIP if infrastructure is broken
-    # (A broken chair is infrastructure, not waste)
-    if detections.get("waste") and not infrastructure_broken:
-        waste_data = detections["waste"]
-        clutter_score = waste_data.get("details", {}).get("clutter_score", 0)
-        
-        # STRICT: Only report if HIGH confidence (>25)
-        if clutter_score > 25:
-            candidates.append({
-                "type": "waste",
-                "data": detections["waste"],
-                "priority": 4,
-                "confidence": min(clutter_score / 40.0, 1.0)  # Normalize to 0-1
-            })
+    if len(parsed) != count:
+        return None, options_error(f"options has {len(parsed)} entries but {count} files were uploaded")
     
-    # If no candidates with confidence, return empty
-    if not candidates:
-        return {}
+    per_image = []
+    for i, overrides in enumerate(parsed):
+        try:
+            validated = BatchImageOptions.model_validate(overrides)
+        except ValidationError as e:
+            problems = "; ".join(
+                f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+            return None, options_error(f"options[{i}]: {problems}")
+        per_image.append(validated.model_dump(exclude_unset=True))
     
-    # Sort by priority, then confidence
-    candidates.sort(key=lambda x: (x["priority"], -x["confidence"]))
+    return per_image, None
+
+
+def options_error(message: str):
+    return JSONResponse(status_code=400, content={"status": "ERROR", "message": message})
+
+
+@app.post("/ML_analyze/batch", responses={200: {"model": BatchAnalysisResponse}})
+async def analyze_image_batch(
+    files: List[UploadFile] = File(...),
+    options: Optional[str] = Form(None),
+    start_hour: Optional[int] = Form(None),
+    end_hour: Optional[int] = Form(None),
+    check_unauthorized: bool = Form(False),
+    debug: bool = Form(False),
+    camera_id: Optional[str] = Form(None),
+    detectors: Optional[str] = Form(None)
+):
+    """
+    Analyze several images in one request.
     
-    # Return ONLY the top candidate - standardized
-    best = candidates[0]
-    detection_type = best["type"]
-    detection_data = best["data"]
+    YOLO runs as one batched call over all decoded frames; every other
+    detector runs per frame as in /ML_analyze.
     
-    # Unwrap nested structures for standardization
-    if detection_type == "broken_infrastructure":
-        detection_data = detection_data.get("broken_infrastructure", detection_data)
-    elif detection_type == "energy_waste":
-        detection_data = detection_data.get("energy_waste", detection_data)
+    Args:
+        files: Image files to analyze
+        options: Optional JSON array of per-image overrides
+                 ({"start_hour", "end_hour", "check_unauthorized", "camera_id", "detectors"})
+        start_hour, end_hour, check_unauthorized, camera_id, detectors: Defaults for every image
+        debug: If True, return raw detection results for each image
     
-    # Standardize to unified schema
-    standardized = standardize_detection(detection_type, detection_data)
+    Returns:
+        {"status": "SUCCESS", "results": [...]} with one standardized
+        result per image, in upload order
+    """
+    try:
+        if len(files) > BATCH_MAX_IMAGES:
+            return {"status": "ERROR", "message": f"At most {BATCH_MAX_IMAGES} images per batch"}
+        
+        per_image, error = parse_batch_options(options, len(files))
+        if error is not None:
+            return error
+        
+        defaults = {
+            "start_hour": start_hour,
+            "end_hour": end_hour,
+            "check_unauthorized": check_unauthorized,
+            "camera_id": camera_id,
+            "detectors": detectors
+        }
+        items = []
+        for upload, overrides in zip(files, per_image):
+            item = dict(defaults)
+            item.update(overrides)
+            item["contents"] = await upload.read()
+            items.append(item)
+        
+        results = await executor.run(analyze_batch, items, debug)
+        return NumpyJSONResponse({"status": "SUCCESS", "results": results})
     
-    return standardized
+    except QueueFullError:
+        return busy_response()
 
-@app.post("/ML_analyze")
-async def analyze_image(
+    except Exception as e:
+        traceback.print_exc()
+        error_response = {"status": "SERVER_ERROR", "error": str(e)}
+        return convert_numpy_types(error_response)
+
+
+# ---------------- ANALYSIS JOBS ----------------
+
+@app.post("/ML_analyze/jobs", status_code=202)
+async def submit_analysis_job(
     file: UploadFile = File(...),
     start_hour: Optional[int] = Form(None),
     end_hour: Optional[int] = Form(None),
     check_unauthorized: bool = Form(False),
-    debug: bool = Form(False)
+    debug: bool = Form(False),
+    camera_id: Optional[str] = Form(None),
+    detectors: Optional[str] = Form(None),
+    callback_url: Optional[str] = Form(None)
 ):
     """
-    Analyze an image for multiple potential issues.
-    Each detector runs independently and results are reconciled.
+    Queue an analysis and return its job id without waiting for it.
     
     Args:
-        file: Image file to analyze
-        debug: If True, return raw detection results from all detectors
+        file, start_hour, end_hour, check_unauthorized, debug, camera_id, detectors:
+            As in /ML_analyze
+        callback_url: Optional URL the finished job is POSTed to as JSON
+                      (defaults to JOB_CALLBACK_URL); other URLs are only
+                      accepted on a host in NAZAR_JOB_CALLBACK_HOSTS (400 otherwise)
+    
+    Returns:
+        {"status": "QUEUED", "job_id": ...}; poll GET /ML_analyze/jobs/{job_id}
     """
     try:
-        contents = await file.read()
-        frame = cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_COLOR)
+        _, error = resolve_selection(detectors, camera_id)
+        if error is not None:
+            return error
         
-        # Validate frame was decoded successfully
-        if frame is None:
-            return {"status": "ERROR", "message": "Could not decode image"}
+        error = callback_error(callback_url)
+        if error is not None:
+            return options_error(error)
         
-        # Validate frame has valid dimensions
-        if frame.shape[0] < 10 or frame.shape[1] < 10:
-            return {"status": "ERROR", "message": "Image dimensions too small"}
-        
-        if len(frame.shape) != 3 or frame.shape[2] != 3:
-            return {"status": "ERROR", "message": "Image must be a valid color image (BGR)"}
+        contents = await file.read()
+        options = {
+            "start_hour": start_hour,
+            "end_hour": end_hour,
+            "check_unauthorized": check_unauthorized,
+            "debug": debug,
+            "camera_id": camera_id,
+            "detectors": detectors
+        }
+        job_id = await job_manager.submit(contents, options, callback_url)
+        return {"status": "QUEUED", "job_id": job_id}
+    
+    except JobQueueFullError:
+        return busy_response()
 
-        # Dictionary to store all raw detections
-        all_detections = {}
-        
-        # ====== DETECTOR 1: WATER LEAK ======
-        water_result, water_mask = process_water_frame(frame)
-        all_detections["water_leak"] = water_result
-        
-        # ====== DETECTOR 2: WASTE / CLUTTER ======
-        # Now pass water mask to avoid false positives
-        waste_result, _ = process_waste_frame(frame, water_mask)
-        all_detections["waste"] = waste_result
-        
-        # ====== DETECTOR 3: PERSON / UNAUTHORIZED ACCESS ======
-        # Always run person detection - don't make it optional
-        person_detected = detect_person(frame)
-        unauthorized_result = None
-        
-        if person_detected:
-            # Check if we should flag as unauthorized
-            if check_unauthorized:
-                unauthorized_result = {
-                    "status": "DETECTED",
-                    "message": "Unauthorized person detected",
-                    "severity": "High",
-                    "context": "restricted_hours" if check_unauthorized else "restricted_area"
-                }
-            elif start_hour is not None and end_hour is not None:
-                # Validate hours
-                if not (0 <= start_hour <= 23 and 0 <= end_hour <= 23):
-                    unauthorized_result = {"status": "ERROR", "message": "Hours must be between 0 and 23"}
-                else:
-                    # Person found, hours provided - flag as unauthorized
-                    unauthorized_result = {
-                        "status": "DETECTED",
-                        "message": f"Person detected outside allowed hours ({start_hour}-{end_hour})",
-                        "severity": "High",
-                        "context": "restricted_hours",
-                        "start_hour": start_hour,
-                        "end_hour": end_hour
-                    }
-            else:
-                # Person detected but no time context - still report it
-                unauthorized_result = {
-                    "status": "DETECTED",
-                    "message": "Person detected in camera",
-                    "severity": "Medium",
-                    "context": "general"
-                }
-        
-        all_detections["unauthorized_access"] = unauthorized_result
-        
-        # ====== DETECTOR 4: GENERAL INFRASTRUCTURE (lights, fans, broken parts) ======
-        infrastructure_result = process_frame(frame)
-        all_detections["general_infrastructure"] = infrastructure_result
-        
-        # ====== CONFLICT RESOLUTION ======
-        # Verify and reconcile multiple detections
-        verified_results = resolve_conflicts(all_detections)
-        
-        # Convert numpy types to Python types for JSON serialization
-        verified_results = convert_numpy_types(verified_results)
-        all_detections = convert_numpy_types(all_detections)
-        
-        # If no issues found, return standardized "No Issue" response
-        if not verified_results or all(v is None for v in verified_results.values()):
-            return {
-                "detection": "No Issue",
-                "category": "General",
-                "severity": "Low",
-                "risks": "No known risks",
-                "confidence": 0
-            }
+    except Exception as e:
+        traceback.print_exc()
+        return {"status": "SERVER_ERROR", "error": str(e)}
+
+
+@app.get("/ML_analyze/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """
+    Status of a job: QUEUED, RUNNING, DONE (with "result", the same body
+    /ML_analyze returns) or FAILED (with "error").
+    """
+    job = await job_manager.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"status": "ERROR", "message": "Unknown job"})
+    return job
+
+
+@app.get("/detections")
+async def list_detections(
+    camera_id: Optional[str] = None,
+    type: Optional[str] = None,
+    kind: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: int = 100,
+    include_data: bool = True
+):
+    """
+    Detection history from the local event store, newest first.
+    
+    Args:
+        camera_id: Only this camera
+        type: Only this detection type (water_leak, waste, ...)
+        kind: "verified" (reported detections) or "raw" (detector results)
+        since / until: Unix timestamps bounding the time range
+        limit: Rows returned (at most DETECTION_QUERY_LIMIT)
+        include_data: Include each event's full detection payload
+    """
+    if kind not in (None, "verified", "raw"):
+        return {"status": "ERROR", "message": "kind must be 'verified' or 'raw'"}
+    
+    # SQLite read + JSON decoding: off the event loop
+    events = await asyncio.to_thread(
+        detection_store.query,
+        camera_id=camera_id,
+        detection_type=type,
+        kind=kind,
+        since=since,
+        until=until,
+        limit=limit,
+        include_data=include_data
+    )
+    return {"status": "SUCCESS", "count": len(events), "detections": events}
+
+
+# ---------------- STREAM INGESTION ----------------
+
+@app.post("/streams")
+async def register_stream(
+    camera_id: str = Form(...),
+    source: str = Form(...),
+    fps: float = Form(STREAM_SAMPLE_FPS),
+    loop: bool = Form(False),
+    start_hour: Optional[int] = Form(None),
+    end_hour: Optional[int] = Form(None),
+    check_unauthorized: bool = Form(False),
+    detectors: Optional[str] = Form(None)
+):
+    """
+    Start continuous analysis of a camera stream.
+    
+    Args:
+        camera_id: Camera the stream belongs to (replaces any existing stream)
+        source: RTSP/HTTP(MJPEG) URL on a host in NAZAR_STREAM_HOSTS, or
+                a video file under a directory in NAZAR_STREAM_DIRS (400 otherwise)
+        fps: Frames analyzed per second while the camera is active; idle
+             cameras back off within the global STREAM_BUDGET_FPS
+        loop: Restart local video files at end of file
+        detectors: As in /ML_analyze
+    """
+    try:
+        _, error = resolve_selection(detectors, camera_id)
+        if error is not None:
+            return error
         
-        # If debug mode, return both raw and verified
-        if debug:
-            # Check if infrastructure results exist
-            infra_exists = all_detections.get("general_infrastructure") is not None
-            energy_waste = False
-            infrastructure_broken = False
-            
-            if infra_exists:
-                infra_data = all_detections["general_infrastructure"]
-                if isinstance(infra_data, dict):
-                    energy_waste = "energy_waste" in infra_data
-                    infrastructure_broken = "broken_infrastructure" in infra_data
-            
-            return {
-                "status": "SUCCESS",
-                "verified_detections": verified_results,
-                "raw_detections": all_detections,
-                "detection_summary": {
-                    "water_detected": bool(all_detections.get("water_leak") is not None),
-                    "waste_detected": bool(all_detections.get("waste") is not None),
-                    "person_detected": bool(all_detections.get("unauthorized_access") is not None),
-                    "energy_waste_detected": energy_waste,
-                    "infrastructure_broken_detected": infrastructure_broken
-                }
+        error = stream_source_error(source)
+        if error is not None:
+            return options_error(error)
+
+        stream = stream_manager.register(
+            camera_id,
+            source,
+            fps=fps,
+            loop=loop,
+            options={
+                "start_hour": start_hour,
+                "end_hour": end_hour,
+                "check_unauthorized": check_unauthorized,
+                "detectors": detectors
             }
-        
-        return verified_results
+        )
+        return {"status": "SUCCESS", "stream": stream.status()}
+    
+    except ValueError as e:
+        return {"status": "ERROR", "message": str(e)}
 
-    except Exception as e:
-        traceback.print_exc()
-        error_response = {"status": "SERVER_ERROR", "error": str(e)}
-        return convert_numpy_types(error_response)
+
+@app.get("/streams")
+async def list_streams():
+    return {
+        "status": "SUCCESS",
+        "sampling": stream_manager.sampling_stats(),
+        "streams": stream_manager.statuses()
+    }
+
+
+@app.get("/streams/{camera_id}")
+async def get_stream(camera_id: str):
+    """Stream status including the latest analysis result"""
+    stream = stream_manager.get(camera_id)
+    if stream is None:
+        return {"status": "ERROR", "message": f"No stream registered for camera {camera_id}"}
+    return {"status": "SUCCESS", "stream": stream.status()}
+
+
+@app.delete("/streams/{camera_id}")
+async def delete_stream(camera_id: str):
+    if not stream_manager.unregister(camera_id):
+        return {"status": "ERROR", "message": f"No stream registered for camera {camera_id}"}
+    return {"status": "SUCCESS"}
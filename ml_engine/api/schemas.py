@@ -0,0 +1,91 @@
+"""
+Response Schemas
+
+Typed models of the /ML_analyze responses, used for the OpenAPI
+documentation and by clients that want to validate payloads.
+
+The endpoints don't build responses through these models: the pipeline
+returns plain dicts (which may hold numpy values) and NumpyJSONResponse
+encodes them in one orjson pass. Keep the models in sync with
+core.analysis.standardize_detection and build_response.
+"""
+
+from typing import Any, Dict, List, Optional, Union
+
+from pydantic import BaseModel, ConfigDict
+
+
+class StandardizedDetection(BaseModel):
+    """Unified schema of the single verified detection of a frame."""
+
+    model_config = ConfigDict(extra="allow")
+
+    detection: str
+    category: str
+    severity: str
+    risks: str
+    confidence: int
+    # Broken infrastructure: boxes (x1, y1, x2, y2) of the most damaged tiles
+    regions: Optional[List[List[int]]] = None
+    # Set when the response was reused from a near-duplicate frame
+    reused: Optional[bool] = None
+
+
+class DetectionSummary(BaseModel):
+    water_detected: bool
+    waste_detected: bool
+    person_detected: bool
+    energy_waste_detected: bool
+    infrastructure_broken_detected: bool
+
+
+class RawDetections(BaseModel):
+    """Raw detector outputs; each is None when the detector found nothing (or was skipped)."""
+
+    model_config = ConfigDict(extra="allow")
+
+    water_leak: Optional[Dict[str, Any]] = None
+    waste: Optional[Dict[str, Any]] = None
+    unauthorized_access: Optional[Dict[str, Any]] = None
+    general_infrastructure: Optional[Dict[str, Any]] = None
+
+
+class DebugAnalysisResponse(BaseModel):
+    """Response with debug=true and at least one verified detection."""
+
+    model_config = ConfigDict(extra="allow")
+
+    status: str
+    verified_detections: StandardizedDetection
+    raw_detections: RawDetections
+    detection_summary: DetectionSummary
+    reused: Optional[bool] = None
+
+
+class ErrorResponse(BaseModel):
+    """ERROR (invalid input), SERVER_ERROR or BUSY."""
+
+    status: str
+    message: Optional[str] = None
+    error: Optional[str] = None
+
+
+AnalysisResponse = Union[StandardizedDetection, DebugAnalysisResponse, ErrorResponse]
+
+
+class BatchAnalysisResponse(BaseModel):
+    status: str
+    results: List[AnalysisResponse]
+
+
+class BatchImageOptions(BaseModel):
+    """
+    Per-image overrides of a batch request, coerced like the matching
+    Form fields of /ML_analyze ("7" -> 7, "false" -> False).
+    """
+
+    start_hour: Optional[int] = None
+    end_hour: Optional[int] = None
+    check_unauthorized: Optional[bool] = None
+    camera_id: Optional[str] = None
+    detectors: Optional[str] = None
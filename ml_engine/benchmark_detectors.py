@@ -0,0 +1,284 @@
+"""
+Detector micro-benchmark suite.
+
+Times every detector in detectors/ and the full /ML_analyze path
+(decode -> detectors -> conflict resolution) on deterministic synthetic
+scenes (utils/synthetic_scenes.py), so no camera footage or network is
+needed. Reports latency distributions and peak traced memory per
+detector and resolution, and optionally compares them with a stored
+baseline, exiting non-zero on regressions.
+
+Usage:
+    python benchmark_detectors.py [--resolutions 480p 720p 1080p 4k]
+                                  [--detectors water waste ... full]
+                                  [--repeat 20] [--warmup 2]
+                                  [--save-baseline bench_baseline.json]
+                                  [--baseline bench_baseline.json --threshold 0.2]
+
+Detectors that need YOLO/MediaPipe (objects, person, waste, full) use
+whatever model the registry can load; a case whose model fails to load
+is reported as skipped (and fails a --baseline comparison that has it)
+rather than timed. Pass --skip-models to leave them out on machines
+without weights.
+
+The full case runs with the response cache, change gate, near-duplicate
+index and detection history switched off, so every iteration does the
+whole analysis and nothing is written next to the script.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from core import analysis
+from core.analysis import analyze_bytes
+from core.camera_state import CameraState
+from core.detection_store import detection_store
+from core.frame_context import FrameContext
+from core.model_registry import get_pose_model, get_yolo_backend
+from detectors.fan_motion_detector import detect_fan_motion
+from detectors.infrastructure_detector import detect_broken_infrastructure
+from detectors.light_detector import detect_artificial_light
+from detectors.object_detector import detect_objects
+from detectors.person_detector import detect_person
+from detectors.waste_detector import clutter_score, detect_waste
+from detectors.water_detector import detect_raw_puddles
+from utils.synthetic_scenes import RESOLUTIONS, generate_scene, scene_sequence
+
+# Models each case needs
+MODEL_DETECTORS = {
+    "objects": ("yolo",),
+    "person": ("yolo", "pose"),
+    "waste": ("yolo",),
+    "full": ("yolo", "pose"),
+}
+MODEL_LOADERS = {"yolo": get_yolo_backend, "pose": get_pose_model}
+
+
+def isolate_full_pipeline():
+    """
+    Make every "full" iteration decode and run the detectors: no answers
+    from the response cache, change gate or near-duplicate index, and no
+    detection history (its store is also moved to a temporary directory).
+    """
+    analysis.RESPONSE_CACHE_ENABLED = False
+    analysis.CHANGE_GATE_ENABLED = False
+    analysis.NEAR_DUPLICATE_ENABLED = False
+    analysis.DETECTION_STORE_ENABLED = False
+    detection_store.path = os.path.join(tempfile.mkdtemp(prefix="nazar-bench-"), "detections.sqlite3")
+
+
+def model_errors(names, errors):
+    """
+    Load the named models; errors caches {model: message} across cases.
+
+    Returns:
+        "model: message" for every model that failed, or None
+    """
+    for name in names:
+        if name not in errors:
+            try:
+                MODEL_LOADERS[name]()
+                errors[name] = None
+            except Exception as e:
+                errors[name] = str(e)
+    failed = [f"{name}: {errors[name]}" for name in names if errors[name]]
+    return "; ".join(failed) or None
+
+
+def _fan_runner(frames):
+    """Fan motion is temporal: feed a rotating-fan sequence through one camera state."""
+    state = CameraState("benchmark")
+    position = [0]
+
+    def run(_):
+        frame = frames[position[0] % len(frames)]
+        position[0] += 1
+        return detect_fan_motion(frame, state)
+
+    return run
+
+
+def build_cases(resolution):
+    """
+    Returns:
+        {name: (callable taking a fresh input, input factory)}
+    """
+    frame = generate_scene(resolution)
+    ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    contents = jpeg.tobytes()
+
+    # A fresh FrameContext per call so memoized intermediates
+    # (gray, hsv, YOLO boxes) never leak between iterations
+    fresh = lambda: FrameContext(frame)
+
+    return {
+        "water": (detect_raw_puddles, fresh),
+        "clutter": (clutter_score, fresh),
+        "waste": (detect_waste, fresh),
+        "light": (detect_artificial_light, fresh),
+        "fan": (_fan_runner(scene_sequence(resolution)), fresh),
+        "infrastructure": (detect_broken_infrastructure, fresh),
+        "objects": (detect_objects, fresh),
+        "person": (detect_person, fresh),
+        "full": (analyze_bytes, lambda: contents),
+    }
+
+
+def summarize(samples_ms):
+    samples = np.asarray(samples_ms)
+    return {
+        "n": int(samples.size),
+        "mean_ms": round(float(samples.mean()), 3),
+        "min_ms": round(float(samples.min()), 3),
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p90_ms": round(float(np.percentile(samples, 90)), 3),
+        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+        "max_ms": round(float(samples.max()), 3),
+    }
+
+
+def benchmark(fn, make_input, repeat, warmup):
+    for _ in range(warmup):
+        fn(make_input())
+
+    samples = []
+    for _ in range(repeat):
+        data = make_input()
+        started = time.perf_counter()
+        fn(data)
+        samples.append((time.perf_counter() - started) * 1000)
+    result = summarize(samples)
+
+    # Separate traced run: tracemalloc slows allocation-heavy code down,
+    # so it must not be on while timing. numpy/OpenCV output arrays are traced.
+    data = make_input()
+    tracemalloc.start()
+    fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result["peak_kb"] = round(peak / 1024, 1)
+    return result
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "cpu_threads": cv2.getNumThreads(),
+    }
+
+
+def compare(results, baseline, threshold, metrics=("p50_ms", "p90_ms", "peak_kb")):
+    """
+    Returns:
+        list of (key, metric, baseline_value, current_value, ratio)
+        for every metric slower/larger than baseline * (1 + threshold)
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if "skipped" in current:
+            # Measured before, not now: never a pass
+            if "skipped" not in previous:
+                regressions.append((key, "skipped", previous.get("p50_ms") or 0.0, 0.0, 0.0))
+            continue
+        if "skipped" in previous:
+            continue
+        for metric in metrics:
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            ratio = after / before
+            if ratio > 1 + threshold:
+                regressions.append((key, metric, before, after, ratio))
+    return regressions
+
+
+def print_table(results):
+    print(f"\n{'case':<26}{'mean':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}{'peak KB':>11}")
+    print("-" * 82)
+    for key, r in results.items():
+        if "skipped" in r:
+            print(f"{key:<26}skipped ({r['skipped']})")
+            continue
+        print(
+            f"{key:<26}{r['mean_ms']:>9.2f}{r['p50_ms']:>9.2f}{r['p90_ms']:>9.2f}"
+            f"{r['p99_ms']:>9.2f}{r['max_ms']:>9.2f}{r['peak_kb']:>11.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark detectors on synthetic scenes")
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument("--detectors", nargs="+", default=None, help="Subset of cases to run")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per case")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed runs per case")
+    parser.add_argument("--skip-models", action="store_true", help="Skip cases that need YOLO/MediaPipe")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown/growth vs baseline (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", help="Write results to this JSON file")
+
+    args = parser.parse_args()
+    isolate_full_pipeline()
+
+    results = {}
+    load_errors = {}
+    for resolution in args.resolutions:
+        cases = build_cases(resolution)
+        for name, (fn, make_input) in cases.items():
+            if args.detectors and name not in args.detectors:
+                continue
+            if args.skip_models and name in MODEL_DETECTORS:
+                continue
+            key = f"{name}@{resolution}"
+            error = model_errors(MODEL_DETECTORS.get(name, ()), load_errors)
+            if error:
+                print(f"  ... {key} skipped, model unavailable: {error}", flush=True)
+                results[key] = {"skipped": f"model unavailable: {error}"}
+                continue
+            print(f"  ... {key}", flush=True)
+            results[key] = benchmark(fn, make_input, args.repeat, args.warmup)
+
+    print_table(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+        print(f"\n✓ Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        if stored.get("environment") != environment():
+            print("\n⚠ Baseline was recorded in a different environment:")
+            print(f"  baseline: {stored.get('environment')}")
+            print(f"  current:  {environment()}")
+
+        regressions = compare(results, stored.get("results", {}), args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s) above {args.threshold:.0%}:")
+            for key, metric, before, after, ratio in regressions:
+                if metric == "skipped":
+                    print(f"  {key:<26}skipped now ({results[key]['skipped']})")
+                    continue
+                print(f"  {key:<26}{metric:<8} {before:>10.2f} -> {after:>10.2f}  ({ratio:.2f}x)")
+            sys.exit(1)
+        print(f"\n✓ No regressions above {args.threshold:.0%} vs {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,892 @@
+"""
+Analysis Pipeline
+
+Decodes an uploaded image, runs every detector on it and reconciles the
+raw results into the unified response schema.
+
+Kept free of FastAPI so the executor can run it in worker threads or
+worker processes off the asyncio event loop.
+"""
+
+import cv2
+import numpy as np
+import traceback
+from typing import Optional, Dict, Any, List
+from core import change_gate, near_duplicate
+from core.camera_state import camera_states
+from core.config import (
+    CHANGE_GATE_ENABLED,
+    DETECTION_STORE_ENABLED,
+    LAZY_DETECTOR_EVALUATION,
+    MAX_WORKING_RESOLUTION,
+    NEAR_DUPLICATE_ENABLED,
+    RESPONSE_CACHE_ENABLED,
+)
+from core.decision_engine import detect_infrastructure_damage, energy_waste_issue
+from core.detection_store import detection_store
+from core.detector_registry import (
+    Detector,
+    DetectorRun,
+    register,
+    models_needed,
+    resolve_selection,
+    selectable_detectors,
+)
+from core.frame_arena import open_frame
+from core.frame_context import FrameContext, as_frame_context
+from core.metrics import (
+    ANALYSIS_SECONDS,
+    CONFLICT_RESOLUTION_SECONDS,
+    DECODE_SECONDS,
+    ERRORS_TOTAL,
+    record_outcome,
+)
+
+from core.response_cache import cache_key, response_cache
+from modules.water_leak.leak_pipeline import leak_pending, process_water_frame
+from modules.waste_monitor.waste_pipeline import process_waste_frame
+from detectors.fan_motion_detector import detect_fan_motion, track_fan_motion
+from detectors.light_detector import detect_artificial_light
+from detectors.object_detector import detect_objects_batch
+from detectors.person_detector import detect_person
+from detectors.water_detector import analyze_puddles
+from utils.image_ops import read_image_size
+
+# Minimum scores for resolve_conflicts to report these detections
+INFRA_REPORT_THRESHOLD = 0.55
+CLUTTER_REPORT_THRESHOLD = 25
+
+
+def convert_numpy_types(obj):
+    """
+    Recursively convert numpy types to Python native types for JSON serialization.
+    """
+    if isinstance(obj, dict):
+        return {key: convert_numpy_types(value) for key, value in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_numpy_types(item) for item in obj]
+    elif isinstance(obj, (np.integer, np.int64, np.int32)):
+        return int(obj)
+    elif isinstance(obj, (np.floating, np.float64, np.float32)):
+        return float(obj)
+    elif isinstance(obj, (np.bool_,)):
+        return bool(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    else:
+        return obj
+
+
+def standardize_detection(detection_type: str, detection_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Standardize any detection to the unified schema:
+    {detection, category, severity, risks, confidence}
+    """
+    if detection_type == "water_leak":
+        return {
+            "detection": detection_data.get("issue", "Water Leak Detected"),
+            "category": "Plumbing",
+            "severity": detection_data.get("severity", "Medium").title(),
+            "risks": "Water damage, mold growth, structural damage, slip hazard",
+            "confidence": 85  # Water is very specific
+        }
+    
+    elif detection_type == "waste":
+        clutter_score = detection_data.get("details", {}).get("clutter_score", 0)
+        confidence = min(int(clutter_score * 2.5), 95)
+        return {
+            "detection": detection_data.get("issue_type", "Waste/Clutter Detected"),
+            "category": "Cleanliness",
+            "severity": detection_data.get("severity", "Medium").title(),
+            "risks": "Hazard to students, poor hygiene, pest attraction",
+            "confidence": confidence
+        }
+    
+    elif detection_type == "unauthorized_access":
+        return {
+            "detection": "Unauthorized Person Detected",
+            "category": "Safety",
+            "severity": "High",
+            "risks": "Security breach, potential theft, safety concern",
+            "confidence": 90
+        }
+    
+    elif detection_type == "broken_infrastructure":
+        details = detection_data.get("details", {})
+        damage_score = details.get("total_damage_score", 0)
+        confidence = min(int(damage_score * 100), 95)
+        standardized = {
+            "detection": "Broken Infrastructure Detected",
+            "category": "Infrastructure",
+            "severity": detection_data.get("severity", "Medium").title(),
+            "risks": "Safety hazard, further deterioration, potential injury",
+            "confidence": confidence
+        }
+        # Boxes (x1, y1, x2, y2) of the most damaged tiles, when grid scoring is on
+        if details.get("damaged_tiles"):
+            standardized["regions"] = [tile["box"] for tile in details["damaged_tiles"]]
+        return standardized
+    
+    elif detection_type == "energy_waste":
+        return {
+            "detection": "Energy Waste Detected",
+            "category": "Electrical",
+            "severity": "Medium",
+            "risks": "Increased electricity costs, environmental impact",
+            "confidence": 70
+        }
+    
+    else:
+        return {
+            "detection": "Unknown Detection",
+            "category": "General",
+            "severity": "Low",
+            "risks": "Unknown risk",
+            "confidence": 0
+        }
+
+
+def resolve_conflicts(detections: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Intelligent conflict resolution.
+    
+    IMPORTANT: Only return the MOST CONFIDENT detection.
+    Don't report multiple issues from a single image.
+    
+    Special Rule: If infrastructure is broken, it takes priority over waste.
+    (e.g., broken chair = broken infrastructure, NOT waste/clutter)
+    
+    Priority order (most specific first):
+    1. Water leak (very specific, high confidence if detected)
+    2. Broken infrastructure (structural damage - takes priority over waste)
+    3. Person (exact match - specific)
+    4. Waste/Clutter (but only if infrastructure is NOT broken)
+    5. Energy waste (least specific, could be shadows/reflections)
+    """
+    
+    verified = {}
+    
+    # Collect all detections with confidence scores
+    candidates = []
+    
+    # Water leak - highest priority if present
+    if detections.get("water_leak"):
+        candidates.append({
+            "type": "water_leak",
+            "data": detections["water_leak"],
+            "priority": 1,
+            "confidence": 0.95  # Water is very specific
+        })
+    
+    # Person - very specific
+    if detections.get("unauthorized_access"):
+        candidates.append({
+            "type": "unauthorized_access",
+            "data": detections["unauthorized_access"],
+            "priority": 2,
+            "confidence": 0.90
+        })
+    
+    # Infrastructure damage - but only if VERY confident
+    infrastructure_broken = False
+    infra_data = detections.get("general_infrastructure")
+    if infra_data and isinstance(infra_data, dict):
+        if "broken_infrastructure" in infra_data:
+            damage_data = infra_data["broken_infrastructure"]
+            damage_score = damage_data.get("details", {}).get("total_damage_score", 0)
+            
+            # STRICT: Only report if HIGH confidence (>0.55)
+            if damage_score > INFRA_REPORT_THRESHOLD:
+                infrastructure_broken = True
+                candidates.append({
+                    "type": "broken_infrastructure",
+                    "data": {"broken_infrastructure": damage_data},
+                    "priority": 3,
+                    "confidence": min(damage_score, 1.0)
+                })
+        
+        # Energy waste - lowest priority
+        if "energy_waste" in infra_data:
+            candidates.append({
+                "type": "energy_waste",
+                "data": {"energy_waste": infra_data["energy_waste"]},
+                "priority": 5,
+                "confidence": 0.65  # Low confidence due to false positives
+            })
+    
+    # Waste/Clutter - moderate priority, but SKIP if infrastructure is broken
+    # (A broken chair is infrastructure, not waste)
+    if detections.get("waste") and not infrastructure_broken:
+        waste_data = detections["waste"]
+        clutter_score = waste_data.get("details", {}).get("clutter_score", 0)
+        
+        # STRICT: Only report if HIGH confidence (>25)
+        if clutter_score > CLUTTER_REPORT_THRESHOLD:
+            candidates.append({
+                "type": "waste",
+                "data": detections["waste"],
+                "priority": 4,
+                "confidence": min(clutter_score / 40.0, 1.0)  # Normalize to 0-1
+            })
+    
+    # If no candidates with confidence, return empty
+    if not candidates:
+        return {}
+    
+    # Sort by priority, then confidence
+    candidates.sort(key=lambda x: (x["priority"], -x["confidence"]))
+    
+    # Return ONLY the top candidate - standardized
+    best = candidates[0]
+    detection_type = best["type"]
+    detection_data = best["data"]
+    
+    # Unwrap nested structures for standardization
+    if detection_type == "broken_infrastructure":
+        detection_data = detection_data.get("broken_infrastructure", detection_data)
+    elif detection_type == "energy_waste":
+        detection_data = detection_data.get("energy_waste", detection_data)
+    
+    # Standardize to unified schema
+    standardized = standardize_detection(detection_type, detection_data)
+    
+    return standardized
+
+
+def reduced_decode_flag(contents: bytes):
+    """
+    Pick the cheapest JPEG decode mode that still yields at least
+    MAX_WORKING_RESOLUTION pixels on the longest side.
+    
+    Returns:
+        (imread_flag, reduction_factor)
+    """
+    size = read_image_size(contents)
+    if size is None or contents[:2] != b"\xff\xd8":
+        return cv2.IMREAD_COLOR, 1
+    
+    long_side = max(size)
+    for factor, flag in ((8, cv2.IMREAD_REDUCED_COLOR_8),
+                         (4, cv2.IMREAD_REDUCED_COLOR_4),
+                         (2, cv2.IMREAD_REDUCED_COLOR_2)):
+        if long_side // factor >= MAX_WORKING_RESOLUTION:
+            return flag, factor
+    return cv2.IMREAD_COLOR, 1
+
+
+def decode_native(contents: bytes):
+    """
+    Decode and validate uploaded image bytes, without the final downscale.
+    
+    Large JPEGs are decoded with reduced DCT scaling; the context's scale
+    records the reduction relative to the uploaded image.
+    
+    Returns:
+        (FrameContext, None) on success, (None, error_response) otherwise
+    """
+    flag, factor = reduced_decode_flag(contents)
+    frame = cv2.imdecode(np.frombuffer(contents, np.uint8), flag)
+    
+    # Validate frame was decoded successfully
+    if frame is None:
+        return None, {"status": "ERROR", "message": "Could not decode image"}
+    
+    # Validate frame has valid dimensions
+    if frame.shape[0] < 10 or frame.shape[1] < 10:
+        return None, {"status": "ERROR", "message": "Image dimensions too small"}
+    
+    if len(frame.shape) != 3 or frame.shape[2] != 3:
+        return None, {"status": "ERROR", "message": "Image must be a valid color image (BGR)"}
+    
+    return FrameContext(frame, scale=1.0 / factor), None
+
+
+@DECODE_SECONDS.time()
+def decode_image(contents: bytes):
+    """
+    decode_native, downscaled to MAX_WORKING_RESOLUTION.
+    
+    Returns:
+        (FrameContext, None) on success, (None, error_response) otherwise
+    """
+    ctx, error = decode_native(contents)
+    if error is not None:
+        return None, error
+    return ctx.at_resolution(MAX_WORKING_RESOLUTION), None
+
+
+def unauthorized_access_result(
+    person_detected: bool,
+    start_hour: Optional[int] = None,
+    end_hour: Optional[int] = None,
+    check_unauthorized: bool = False
+) -> Optional[Dict[str, Any]]:
+    """Turn the person check into the unauthorized-access raw detection."""
+    unauthorized_result = None
+    
+    if person_detected:
+        # Check if we should flag as unauthorized
+        if check_unauthorized:
+            unauthorized_result = {
+                "status": "DETECTED",
+                "message": "Unauthorized person detected",
+                "severity": "High",
+                "context": "restricted_hours" if check_unauthorized else "restricted_area"
+            }
+        elif start_hour is not None and end_hour is not None:
+            # Validate hours
+            if not (0 <= start_hour <= 23 and 0 <= end_hour <= 23):
+                unauthorized_result = {"status": "ERROR", "message": "Hours must be between 0 and 23"}
+            else:
+                # Person found, hours provided - flag as unauthorized
+                unauthorized_result = {
+                    "status": "DETECTED",
+                    "message": f"Person detected outside allowed hours ({start_hour}-{end_hour})",
+                    "severity": "High",
+                    "context": "restricted_hours",
+                    "start_hour": start_hour,
+                    "end_hour": end_hour
+                }
+        else:
+            # Person detected but no time context - still report it
+            unauthorized_result = {
+                "status": "DETECTED",
+                "message": "Person detected in camera",
+                "severity": "Medium",
+                "context": "general"
+            }
+    
+    return unauthorized_result
+
+
+# ---------------- DETECTOR REGISTRY ----------------
+# Priorities follow the resolve_conflicts order: a decisive result can't
+# be outranked by anything evaluated after it.
+
+register(Detector(
+    "person",
+    lambda run: detect_person(run.ctx),
+    features=("rgb",),
+    models=("yolo", "pose"),
+    priority=0,
+    cost=3.0,
+    selectable=False
+))
+
+# Returns (issue or None, water mask); owns the per-camera leak timer
+register(Detector(
+    "water_leak",
+    lambda run: process_water_frame(run.ctx, run.get("person"), run.state),
+    depends_on=("person",),
+    features=("hsv", "gray"),
+    priority=10,
+    cost=1.0,
+    decisive=lambda result: bool(result[0])
+))
+
+register(Detector(
+    "unauthorized_access",
+    lambda run: unauthorized_access_result(run.get("person"), **run.options),
+    depends_on=("person",),
+    priority=20,
+    cost=0.0,
+    decisive=lambda result: result is not None
+))
+
+register(Detector(
+    "broken_infrastructure",
+    lambda run: detect_infrastructure_damage(run.ctx),
+    features=("gray", "hsv", "edges", "laplacian"),
+    priority=30,
+    cost=2.0,
+    decisive=lambda result: bool(result) and result["details"]["total_damage_score"] > INFRA_REPORT_THRESHOLD
+))
+
+
+def _water_mask(run):
+    # The leak pipeline's mask when it ran (None while a person occludes
+    # the scene), otherwise the puddle mask without the leak timer
+    if "water_leak" in run.results:
+        return run.results["water_leak"][1]
+    return analyze_puddles(run.ctx).mask
+
+
+register(Detector(
+    "water_mask",
+    _water_mask,
+    features=("hsv", "gray"),
+    priority=10,
+    cost=1.0,
+    selectable=False
+))
+
+# Returns (issue or None, clutter mask)
+register(Detector(
+    "waste",
+    lambda run: process_waste_frame(run.ctx, run.get("water_mask")),
+    depends_on=("water_mask",),
+    features=("gray", "edges"),
+    models=("yolo",),
+    priority=40,
+    cost=2.0,
+    decisive=lambda result: bool(result[0]) and result[0]["details"]["clutter_score"] > CLUTTER_REPORT_THRESHOLD
+))
+
+register(Detector(
+    "lights",
+    lambda run: detect_artificial_light(run.ctx),
+    features=("gray", "hsv"),
+    priority=50,
+    cost=0.5
+))
+
+register(Detector(
+    "fan",
+    lambda run: detect_fan_motion(run.ctx, run.state),
+    features=("gray", "laplacian"),
+    priority=50,
+    cost=1.0,
+    skipped=lambda run: track_fan_motion(run.ctx, run.state)
+))
+
+
+def raw_detections(run) -> Dict[str, Any]:
+    """Raw detections keyed like the debug response, from the detectors that ran"""
+    results = run.results
+    water = results.get("water_leak")
+    waste = results.get("waste")
+    
+    infrastructure = {}
+    if "lights" in results or "fan" in results:
+        energy_waste = energy_waste_issue(results.get("lights", False), results.get("fan", False))
+        if energy_waste:
+            infrastructure["energy_waste"] = energy_waste
+    if results.get("broken_infrastructure"):
+        infrastructure["broken_infrastructure"] = results["broken_infrastructure"]
+    
+    return {
+        "water_leak": water[0] if water else None,
+        "waste": waste[0] if waste else None,
+        "unauthorized_access": results.get("unauthorized_access"),
+        "general_infrastructure": infrastructure or None
+    }
+
+
+def run_detectors(
+    ctx,
+    state,
+    start_hour: Optional[int] = None,
+    end_hour: Optional[int] = None,
+    check_unauthorized: bool = False,
+    selected=None
+) -> Dict[str, Any]:
+    """
+    Run every selected detector on one frame.
+    
+    Args:
+        ctx: FrameContext of the frame
+        state: CameraState used by the temporal pipelines
+        selected: Detector names (default: every selectable detector)
+    
+    Returns:
+        Raw detections keyed by detector
+    """
+    run = DetectorRun(ctx, state, {
+        "start_hour": start_hour, "end_hour": end_hour, "check_unauthorized": check_unauthorized
+    })
+    run.run_all(selected or selectable_detectors())
+    return raw_detections(run)
+
+
+def run_detectors_lazy(
+    ctx,
+    state,
+    start_hour: Optional[int] = None,
+    end_hour: Optional[int] = None,
+    check_unauthorized: bool = False,
+    selected=None
+) -> Dict[str, Any]:
+    """
+    Run the selected detectors in resolve_conflicts priority order and
+    stop as soon as a result is decisive, i.e. nothing evaluated later
+    could outrank it.
+    
+    resolve_conflicts returns the same verified result as with
+    run_detectors; only the raw detections of skipped detectors are
+    missing (None), so this is used when debug output is not requested.
+    
+    Order: water leak (after the person check it needs) -> unauthorized
+    access -> broken infrastructure -> waste -> energy waste.
+    """
+    run = DetectorRun(ctx, state, {
+        "start_hour": start_hour, "end_hour": end_hour, "check_unauthorized": check_unauthorized
+    })
+    run.run_until_decisive(selected or selectable_detectors())
+    return raw_detections(run)
+
+
+def build_response(all_detections: Dict[str, Any], debug: bool = False) -> Dict[str, Any]:
+    """Reconcile raw detections into the standardized (or debug) response."""
+    # ====== CONFLICT RESOLUTION ======
+    # Verify and reconcile multiple detections
+    with CONFLICT_RESOLUTION_SECONDS.time():
+        verified_results = resolve_conflicts(all_detections)
+    
+    # numpy values stay as they are: the response is encoded in one pass
+    # by core.serialization (orjson with native numpy support)
+    
+    # If no issues found, return standardized "No Issue" response
+    if not verified_results or all(v is None for v in verified_results.values()):
+        return {
+            "detection": "No Issue",
+            "category": "General",
+            "severity": "Low",
+            "risks": "No known risks",
+            "confidence": 0
+        }
+    
+    # If debug mode, return both raw and verified
+    if debug:
+        # Check if infrastructure results exist
+        infra_exists = all_detections.get("general_infrastructure") is not None
+        energy_waste = False
+        infrastructure_broken = False
+        
+        if infra_exists:
+            infra_data = all_detections["general_infrastructure"]
+            if isinstance(infra_data, dict):
+                energy_waste = "energy_waste" in infra_data
+                infrastructure_broken = "broken_infrastructure" in infra_data
+        
+        return {
+            "status": "SUCCESS",
+            "verified_detections": verified_results,
+            "raw_detections": all_detections,
+            "detection_summary": {
+                "water_detected": bool(all_detections.get("water_leak") is not None),
+                "waste_detected": bool(all_detections.get("waste") is not None),
+                "person_detected": bool(all_detections.get("unauthorized_access") is not None),
+                "energy_waste_detected": energy_waste,
+                "infrastructure_broken_detected": infrastructure_broken
+            }
+        }
+    
+    return verified_results
+
+
+def make_options_key(start_hour, end_hour, check_unauthorized, debug, selected):
+    """Request options that change the response; keys the caches and the change gate"""
+    return (start_hour, end_hour, check_unauthorized, debug, tuple(selected))
+
+
+def analyze_frame(
+    frame,
+    start_hour: Optional[int] = None,
+    end_hour: Optional[int] = None,
+    check_unauthorized: bool = False,
+    debug: bool = False,
+    camera_id: Optional[str] = None,
+    detectors=None
+) -> Dict[str, Any]:
+    """
+    Analyze a decoded BGR frame (or a FrameContext) for multiple potential
+    issues. Each detector runs independently and results are reconciled.
+    
+    Args:
+        camera_id: Camera that produced the frame; selects the temporal
+                   state (leak timer, previous fan frame) to use and
+                   enables change gating against that camera's last frame
+        detectors: Detector / profile names to run (see
+                   core.detector_registry); default: the camera's profile
+    
+    Frames perceptually identical to a recently analyzed frame of the same
+    camera (all requests without camera_id share one index) return that
+    frame's response with "reused": True.
+    """
+    # Shared per-frame feature cache: gray/HSV/Laplacian/edges/ROIs and
+    # the single YOLO pass are computed once and reused by every detector.
+    # Raw frames (e.g. from streams) are capped at the working resolution.
+    selected, error = resolve_selection(detectors, camera_id)
+    if error is not None:
+        return error
+    
+    ctx = as_frame_context(frame).at_resolution(MAX_WORKING_RESOLUTION)
+    
+    # Frames of the same camera are analyzed one at a time so their
+    # temporal state stays consistent; other cameras run concurrently
+    state = camera_states.get(camera_id)
+    gated = CHANGE_GATE_ENABLED and camera_id is not None
+    options_key = make_options_key(start_hour, end_hour, check_unauthorized, debug, selected)
+    
+    with state.lock:
+        # Reused responses are skipped while the leak timer runs: it must
+        # see every frame, however similar
+        pending = leak_pending(state)
+        
+        gated = gated and not pending
+        if gated:
+            # Unchanged scene: reuse the last verified result of this camera
+            thumbnail = change_gate.frame_thumbnail(ctx)
+            cached = change_gate.lookup(state, thumbnail, options_key)
+            if cached is not None:
+                record_outcome(cached)
+                return cached
+        
+        # Same scene as a recently analyzed frame (re-encoded, JPEG noise)?
+        deduplicated = NEAR_DUPLICATE_ENABLED and not pending
+        if deduplicated:
+            frame_hash = near_duplicate.dhash(ctx)
+            reused = near_duplicate.lookup(state, frame_hash, options_key)
+            if reused is not None:
+                record_outcome(reused)
+                return reused
+        
+        # Debug responses report every raw detection, so only the
+        # non-debug path may stop early
+        if LAZY_DETECTOR_EVALUATION and not debug:
+            runner, path = run_detectors_lazy, "lazy"
+        else:
+            runner, path = run_detectors, "full"
+        
+        with ANALYSIS_SECONDS.time(path=path):
+            all_detections = runner(ctx, state, start_hour, end_hour, check_unauthorized, selected)
+            response = build_response(all_detections, debug)
+        
+        if DETECTION_STORE_ENABLED:
+            # Queued only; a background thread writes the history
+            detection_store.record(camera_id, response, all_detections)
+        
+        # Nor is a response reused that was produced mid-timer
+        pending = leak_pending(state)
+        if gated and not pending:
+            change_gate.remember(state, thumbnail, options_key, response)
+        if deduplicated and not pending:
+            near_duplicate.remember(state, frame_hash, options_key, response)
+    
+    record_outcome(response)
+    camera_states.update_usage(state)
+    return response
+
+
+def _temporal_pending(camera_id) -> bool:
+    state = camera_states.get(camera_id)
+    with state.lock:
+        return leak_pending(state)
+
+
+def cached_response(contents: bytes, options_key, camera_id: Optional[str] = None):
+    """
+    Look up the response of a byte-identical earlier request.
+    
+    Bypassed while the camera's leak timer is pending: the timer has to
+    see every frame (see core.response_cache).
+    
+    Returns:
+        (response or None, key to store the new response under or None)
+    """
+    if not RESPONSE_CACHE_ENABLED:
+        return None, None
+    return lookup_response(cache_key(contents, options_key, camera_id), camera_id)
+
+
+def lookup_response(key, camera_id: Optional[str] = None, pending: Optional[bool] = None):
+    """
+    cached_response for an already computed cache key.
+    
+    Args:
+        pending: Whether the camera's leak timer is pending, when known
+                 better than this process's camera state (process workers)
+    """
+    if key is None:
+        return None, None
+    
+    if _temporal_pending(camera_id) if pending is None else pending:
+        response_cache.bypass()
+        return None, None
+    
+    response = response_cache.get(key)
+    if response is not None:
+        record_outcome(response)
+    return response, key
+
+
+def remember_response(
+    key, camera_id: Optional[str], response: Dict[str, Any], pending: Optional[bool] = None
+):
+    """Cache a fresh response unless it was produced while a leak timer runs (see lookup_response)."""
+    if key is not None and not (_temporal_pending(camera_id) if pending is None else pending):
+        response_cache.put(key, response)
+
+
+def analyze_bytes(
+    contents: bytes,
+    start_hour: Optional[int] = None,
+    end_hour: Optional[int] = None,
+    check_unauthorized: bool = False,
+    debug: bool = False,
+    camera_id: Optional[str] = None,
+    detectors=None
+) -> Dict[str, Any]:
+    """
+    Decode uploaded image bytes and analyze them.
+    Entry point submitted to the analysis executor.
+    
+    Byte-identical repeats of a request are answered from the response
+    cache without decoding or running any detector.
+    """
+    try:
+        selected, error = resolve_selection(detectors, camera_id)
+        if error is not None:
+            return error
+        
+        options_key = make_options_key(start_hour, end_hour, check_unauthorized, debug, selected)
+        cached, key = cached_response(contents, options_key, camera_id)
+        if cached is not None:
+            return cached
+        
+        ctx, error = decode_image(contents)
+        if error is not None:
+            ERRORS_TOTAL.inc(kind="decode")
+            return error
+        
+        response = analyze_frame(
+            ctx, start_hour, end_hour, check_unauthorized, debug, camera_id, selected
+        )
+        remember_response(key, camera_id, response)
+        return response
+    
+    except Exception as e:
+        traceback.print_exc()
+        ERRORS_TOTAL.inc(kind="server")
+        error_response = {"status": "SERVER_ERROR", "error": str(e)}
+        return convert_numpy_types(error_response)
+
+
+def analyze_tracked_frame(
+    frame,
+    start_hour: Optional[int] = None,
+    end_hour: Optional[int] = None,
+    check_unauthorized: bool = False,
+    debug: bool = False,
+    camera_id: Optional[str] = None,
+    detectors=None
+) -> Dict[str, Any]:
+    """
+    analyze_frame that also reports the camera's leak-timer state, for
+    callers that may sit in another process than the camera state (the
+    response cache of the process path, stream sampling).
+    
+    Returns:
+        (response, whether the camera's leak timer is pending afterwards)
+    """
+    try:
+        response = analyze_frame(
+            frame, start_hour, end_hour, check_unauthorized, debug, camera_id, detectors
+        )
+    except Exception as e:
+        traceback.print_exc()
+        ERRORS_TOTAL.inc(kind="server")
+        response = convert_numpy_types({"status": "SERVER_ERROR", "error": str(e)})
+    return response, _temporal_pending(camera_id)
+
+
+def analyze_shared_frame(
+    handle,
+    start_hour: Optional[int] = None,
+    end_hour: Optional[int] = None,
+    check_unauthorized: bool = False,
+    debug: bool = False,
+    camera_id: Optional[str] = None,
+    detectors=None
+) -> Dict[str, Any]:
+    """
+    analyze_tracked_frame for a frame the API process already decoded
+    into a shared-memory slot (core.frame_arena); runs in a worker process.
+    
+    The API process answers repeats from its response cache before it
+    decodes, so this never looks at the cache; it reports the camera's
+    leak-timer state instead, which the cache needs and only the worker
+    knows.
+    
+    Args:
+        handle: FrameHandle of the slot
+    
+    Returns:
+        (response, whether the camera's leak timer is pending afterwards)
+    """
+    return analyze_tracked_frame(
+        open_frame(handle), start_hour, end_hour, check_unauthorized, debug, camera_id, detectors
+    )
+
+
+def analyze_batch(items, debug: bool = False) -> List[Dict[str, Any]]:
+    """
+    Analyze several uploaded images with one batched YOLO pass.
+    
+    Args:
+        items: List of dicts with "contents" (bytes) and optional
+               "start_hour", "end_hour", "check_unauthorized", "camera_id",
+               "detectors"
+        debug: If True, each result carries the raw detections
+    
+    Returns:
+        One response per item, in input order
+    """
+    results = [None] * len(items)
+    contexts = {}
+    keys = {}
+    selections = {}
+    
+    for i, item in enumerate(items):
+        selected, error = resolve_selection(item.get("detectors"), item.get("camera_id"))
+        if error is not None:
+            results[i] = error
+            continue
+        selections[i] = selected
+        try:
+            options_key = make_options_key(
+                item.get("start_hour"),
+                item.get("end_hour"),
+                bool(item.get("check_unauthorized", False)),
+                debug,
+                selected
+            )
+            cached, keys[i] = cached_response(item["contents"], options_key, item.get("camera_id"))
+            if cached is not None:
+                results[i] = cached
+                continue
+            ctx, error = decode_image(item["contents"])
+        except Exception as e:
+            traceback.print_exc()
+            ctx, error = None, {"status": "SERVER_ERROR", "error": str(e)}
+        if error is not None:
+            ERRORS_TOTAL.inc(kind="server" if error["status"] == "SERVER_ERROR" else "decode")
+            results[i] = error
+        else:
+            contexts[i] = ctx
+    
+    # One batched model call for every decodable frame whose detectors
+    # use YOLO; the per-frame pipeline below then reads the cached boxes
+    detect_objects_batch([
+        ctx for i, ctx in contexts.items() if "yolo" in models_needed(selections[i])
+    ])
+    
+    for i, ctx in contexts.items():
+        item = items[i]
+        try:
+            results[i] = analyze_frame(
+                ctx,
+                item.get("start_hour"),
+                item.get("end_hour"),
+                bool(item.get("check_unauthorized", False)),
+                debug,
+                item.get("camera_id"),
+                selections[i]
+            )
+            remember_response(keys.get(i), item.get("camera_id"), results[i])
+        except Exception as e:
+            traceback.print_exc()
+            ERRORS_TOTAL.inc(kind="server")
+            results[i] = convert_numpy_types({"status": "SERVER_ERROR", "error": str(e)})
+    
+    return results
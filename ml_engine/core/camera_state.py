@@ -0,0 +1,118 @@
+"""
+Camera State Store
+
+Temporal pipelines (water leak confirmation timer, fan frame differencing)
+keep their state per camera here instead of in process globals, so frames
+from different cameras and concurrent requests never overwrite each other.
+
+Cameras are evicted least-recently-used when the store exceeds its camera
+count or memory budget, and after TTL seconds without a frame.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from core.frame_buffer import FrameRingBuffer
+from core.config import (
+    DEFAULT_CAMERA_ID,
+    CAMERA_STATE_MAX_CAMERAS,
+    CAMERA_STATE_TTL,
+    CAMERA_STATE_MAX_BYTES,
+)
+
+
+class CameraState:
+    """State of one camera, split into one dict section per pipeline."""
+
+    def __init__(self, camera_id):
+        self.camera_id = camera_id
+        self.last_access = time.time()
+        self.nbytes = 0
+        # Held by the analysis pipeline while it updates this camera
+        self.lock = threading.RLock()
+        self._sections = {}
+
+    def section(self, name, **defaults):
+        """Return the named section, creating it with the given defaults."""
+        if name not in self._sections:
+            self._sections[name] = dict(defaults)
+        return self._sections[name]
+
+    def measure(self):
+        """Recompute the bytes held by numpy arrays and frame buffers in this state."""
+        self.nbytes = sum(
+            value.nbytes
+            for section in self._sections.values()
+            for value in section.values()
+            if isinstance(value, (np.ndarray, FrameRingBuffer))
+        )
+        return self.nbytes
+
+
+class CameraStateStore:
+    def __init__(self, max_cameras=256, ttl=3600, max_bytes=256 * 1024 * 1024):
+        self.max_cameras = max_cameras
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, camera_id=None):
+        """Return the state for camera_id, creating it if needed."""
+        camera_id = camera_id or DEFAULT_CAMERA_ID
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            state = self._states.get(camera_id)
+            if state is None:
+                state = CameraState(camera_id)
+                self._states[camera_id] = state
+            else:
+                self._states.move_to_end(camera_id)
+            state.last_access = now
+            self._enforce_caps(keep=camera_id)
+            return state
+
+    def update_usage(self, state):
+        """Re-measure a state after a pipeline wrote to it and enforce the memory cap."""
+        state.measure()
+        with self._lock:
+            self._enforce_caps(keep=state.camera_id)
+
+    def _expire(self, now):
+        while self._states:
+            camera_id, state = next(iter(self._states.items()))
+            if now - state.last_access <= self.ttl:
+                break
+            del self._states[camera_id]
+            self.evictions += 1
+
+    def _enforce_caps(self, keep):
+        total = sum(s.nbytes for s in self._states.values())
+        for camera_id in list(self._states):
+            if len(self._states) <= self.max_cameras and total <= self.max_bytes:
+                break
+            if camera_id == keep:
+                continue
+            total -= self._states.pop(camera_id).nbytes
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cameras": len(self._states),
+                "bytes": sum(s.nbytes for s in self._states.values()),
+                "evictions": self.evictions
+            }
+
+
+# Process-wide store used by the pipelines
+camera_states = CameraStateStore(
+    max_cameras=CAMERA_STATE_MAX_CAMERAS,
+    ttl=CAMERA_STATE_TTL,
+    max_bytes=CAMERA_STATE_MAX_BYTES
+)
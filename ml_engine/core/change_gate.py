@@ -0,0 +1,71 @@
+"""
+Change Gate
+
+Skips the heavy detectors (YOLO, MediaPipe, Hough passes) on frames that
+look the same as the last fully analyzed frame of the same camera.
+
+A tiny downscaled grayscale thumbnail of the last analyzed frame is kept
+in the camera's state. A new frame whose mean absolute thumbnail
+difference is below CHANGE_GATE_THRESHOLD reuses the cached response,
+unless that response is older than CHANGE_GATE_MAX_STALENESS seconds:
+then the frame is analyzed anyway so time-based rules keep advancing.
+The gate is bypassed entirely while the camera's leak timer is pending
+(see analyze_frame), so leak confirmation sees every frame.
+"""
+
+import threading
+import time
+
+import cv2
+
+from core.config import (
+    CHANGE_GATE_THUMB_SIZE,
+    CHANGE_GATE_THRESHOLD,
+    CHANGE_GATE_MAX_STALENESS,
+)
+
+_lock = threading.Lock()
+_counters = {"reused": 0, "analyzed": 0}
+
+
+def frame_thumbnail(ctx):
+    """Small grayscale thumbnail of the frame (memoized on the context)"""
+    def compute():
+        small = cv2.resize(ctx.frame, CHANGE_GATE_THUMB_SIZE, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return ctx.memo("thumbnail", compute)
+
+
+def lookup(state, thumbnail, options_key):
+    """
+    Return the cached response for an unchanged frame, or None if the
+    frame must be analyzed.
+    """
+    gate = state.section("change_gate", thumbnail=None, response=None,
+                         options_key=None, analyzed_at=0.0)
+
+    reusable = (
+        gate["thumbnail"] is not None
+        and gate["options_key"] == options_key
+        and time.time() - gate["analyzed_at"] < CHANGE_GATE_MAX_STALENESS
+        and cv2.absdiff(gate["thumbnail"], thumbnail).mean() < CHANGE_GATE_THRESHOLD
+    )
+
+    with _lock:
+        _counters["reused" if reusable else "analyzed"] += 1
+
+    return gate["response"] if reusable else None
+
+
+def remember(state, thumbnail, options_key, response):
+    """Record the frame that was just fully analyzed."""
+    gate = state.section("change_gate")
+    gate["thumbnail"] = thumbnail
+    gate["response"] = response
+    gate["options_key"] = options_key
+    gate["analyzed_at"] = time.time()
+
+
+def stats():
+    with _lock:
+        return dict(_counters)
@@ -1,20 +1,300 @@
+import json
+import os
+
+
 # ---------------- ENERGY WASTE ----------------
 
 EMPTY_TIME_THRESHOLD = 120
 BRIGHTNESS_THRESHOLD = 180
 FAN_MOTION_THRESHOLD = 25
+# Frames of temporal motion history kept per camera for the fan check
 FRAME_HISTORY = 30
 
 CEILING_ROI = (0.0, 0.0, 1.0, 0.4)
 
 
+# ---------------- FRAME BUFFER ----------------
+
+# Temporal pipelines keep FRAME_HISTORY grayscale frames per camera,
+# downscaled to this width, in a preallocated ring buffer
+FRAME_BUFFER_WIDTH = 160
+# Cap per ring buffer; FRAME_HISTORY is reduced to fit
+FRAME_BUFFER_MAX_BYTES = 512 * 1024
+
+
 # ---------------- WATER INTELLIGENCE ----------------
 
-MIN_PUDDLE_CONTOUR_AREA = 100
+# Areas below are in original-image pixels; detectors convert them to
+# their working resolution (FrameContext.scaled_area) or measure blobs
+# in original-image pixels, so results don't depend on the decode size
+MIN_PUDDLE_CONTOUR_AREA = 200    # smallest contour detect_raw_puddles reports
 
+# Consecutive wet frames before the leak confirmation timer starts
 FLOW_CONFIRM_FRAMES = 3
+# Consecutive dry/occluded frames tolerated before the timer resets
 PERSISTENCE_BUFFER = 30
 
-SEVERITY_SMALL = 400
-SEVERITY_MEDIUM = 800
+# Leak pipeline: less validated water than SEVERITY_SMALL counts as a dry
+# frame; persistent water above SEVERITY_MEDIUM / SEVERITY_HIGH sets the severity
+SEVERITY_SMALL = 250
+SEVERITY_MEDIUM = 600
 SEVERITY_HIGH = 1200
+
+
+# ---------------- INFRASTRUCTURE DAMAGE ----------------
+
+# Score the frame per tile as well, to report where the damage is
+INFRA_GRID_SCORING = os.environ.get("NAZAR_INFRA_GRID", "1") == "1"
+INFRA_GRID = (6, 8)              # rows, columns
+# Most damaged tiles reported with their boxes
+INFRA_TOP_TILES = 3
+# Also return the rows x columns grid of tile scores
+INFRA_DAMAGE_HEATMAP = False
+
+
+# ---------------- OBJECT DETECTION (YOLO) ----------------
+
+YOLO_WEIGHTS = "yolov8n.pt"
+YOLO_IMGSZ = 640
+
+# "ultralytics" (PyTorch) or "onnx" (ONNX Runtime CPU provider)
+YOLO_BACKEND = os.environ.get("NAZAR_YOLO_BACKEND", "ultralytics")
+YOLO_ONNX_PATH = os.environ.get("NAZAR_YOLO_ONNX", "yolov8n.onnx")
+# INT8 static quantization, calibrated on local images
+YOLO_INT8 = os.environ.get("NAZAR_YOLO_INT8", "0") == "1"
+YOLO_ONNX_INT8_PATH = os.environ.get("NAZAR_YOLO_ONNX_INT8", "yolov8n.int8.onnx")
+YOLO_CALIBRATION_DIR = os.environ.get("NAZAR_YOLO_CALIBRATION_DIR", "calibration")
+# 0 lets ONNX Runtime pick (one thread per physical core)
+ONNX_INTRA_OP_THREADS = int(os.environ.get("NAZAR_ONNX_THREADS", "0"))
+
+# One YOLO pass per frame at the lowest confidence any consumer needs;
+# each consumer then filters the shared result with its own threshold
+YOLO_CONF = 0.3
+PERSON_CONF = 0.4
+TRASH_CONF = 0.3
+
+# Frames per batched YOLO call on /ML_analyze/batch
+YOLO_BATCH_SIZE = 16
+
+
+# ---------------- MODEL CACHE ----------------
+
+# Weights and ONNX exports are resolved inside this directory
+MODEL_CACHE_DIR = os.environ.get("NAZAR_MODEL_DIR", "models")
+# Never download: missing weights fail fast instead of hanging air-gapped nodes
+MODEL_OFFLINE = os.environ.get("NAZAR_OFFLINE", "0") == "1"
+# Expected SHA-256 per model file name; a "<file>.sha256" next to it also
+# works, and is written on first use for files without one
+MODEL_SHA256 = {
+    "yolov8n.pt": os.environ.get("NAZAR_YOLO_SHA256"),
+}
+# Load models and run a dummy-frame inference in the background at startup
+MODEL_WARMUP = os.environ.get("NAZAR_WARMUP", "1") == "1"
+
+
+# ---------------- PERSON DETECTION ----------------
+
+# "cascade": YOLO first, MediaPipe Pose only inside the uncertainty band
+# "both": MediaPipe and YOLO on every frame, OR-ed
+PERSON_DETECTION_MODE = os.environ.get("NAZAR_PERSON_MODE", "cascade")
+
+# YOLO person confidence >= CONFIDENT ends the check with "person";
+# no person box >= MIN ends it with "no person" (MIN >= YOLO_CONF).
+# CONFIDENT is PERSON_CONF, the YOLO-only threshold, so MediaPipe only
+# adds confirmations below it and never rejects a YOLO person
+PERSON_CASCADE_CONFIDENT = PERSON_CONF
+PERSON_CASCADE_MIN = 0.3
+PERSON_CASCADE_MAX_CROPS = 3       # uncertain boxes checked by MediaPipe
+PERSON_CROP_PADDING = 0.2          # crop margin, fraction of box size
+
+
+# ---------------- EXECUTION ----------------
+
+# "thread" or "process"; detectors run here instead of on the event loop
+ANALYSIS_EXECUTOR = os.environ.get("NAZAR_EXECUTOR", "thread")
+ANALYSIS_WORKERS = int(os.environ.get("NAZAR_WORKERS", "2"))
+
+# Requests allowed to wait for a worker before new ones get 503
+ANALYSIS_QUEUE_SIZE = int(os.environ.get("NAZAR_QUEUE_SIZE", "8"))
+ANALYSIS_RETRY_AFTER = 2   # seconds, sent in the 503 Retry-After header
+
+# Process executor: uploads are decoded in the API process into slots of
+# a shared-memory arena and workers map the frame instead of unpickling it
+FRAME_ARENA_ENABLED = os.environ.get("NAZAR_FRAME_ARENA", "1") == "1"
+# One slot per admitted analysis (running + queued)
+FRAME_ARENA_SLOTS = ANALYSIS_WORKERS + ANALYSIS_QUEUE_SIZE
+# Decoded frames up to this many pixels go to the worker as decoded, so
+# native-resolution features match the thread executor; larger ones are
+# handed over at MAX_WORKING_RESOLUTION
+FRAME_ARENA_SLOT_PIXELS = 1920 * 1080
+
+# Without debug, evaluate detectors in priority order and stop at the
+# first decisive result (same verified output, less work)
+LAZY_DETECTOR_EVALUATION = True
+
+# Images accepted by one /ML_analyze/batch request
+BATCH_MAX_IMAGES = 64
+
+
+# ---------------- DETECTOR SELECTION ----------------
+
+# Named detector subsets, usable in the `detectors` request field and
+# in CAMERA_PROFILES. Detectors: water_leak, unauthorized_access,
+# broken_infrastructure, waste, lights, fan
+DETECTOR_PROFILES = {
+    "indoor": ("water_leak", "unauthorized_access", "broken_infrastructure", "waste", "lights", "fan"),
+    "outdoor": ("water_leak", "unauthorized_access", "broken_infrastructure", "waste"),
+    "security": ("unauthorized_access",),
+}
+
+# camera_id -> profile name or list of detectors, for requests that
+# don't name their detectors (cameras not listed run every detector).
+# e.g. NAZAR_CAMERA_PROFILES='{"gate-1": "outdoor", "lab-2": ["water_leak"]}'
+CAMERA_PROFILES = json.loads(os.environ.get("NAZAR_CAMERA_PROFILES", "{}"))
+
+
+# ---------------- CAMERA STATE ----------------
+
+# Requests without a camera_id share this camera's temporal state
+DEFAULT_CAMERA_ID = "default"
+
+# LRU eviction beyond these caps, TTL eviction after idle seconds.
+# State is per process: with NAZAR_EXECUTOR=process each worker keeps its own.
+CAMERA_STATE_MAX_CAMERAS = 256
+CAMERA_STATE_TTL = 3600
+CAMERA_STATE_MAX_BYTES = 256 * 1024 * 1024
+
+
+# ---------------- STREAM INGESTION ----------------
+
+# Frames analyzed per second for each registered stream while it is active
+STREAM_SAMPLE_FPS = 1.0
+STREAM_RECONNECT_DELAY = 5   # seconds before reopening a dropped live source
+STREAM_MAX_SOURCES = 64
+# Sources a client may register, so it can't make the server read local
+# files or reach internal hosts: rtsp(s)/http(s) URLs on these hosts and
+# video files under these directories (comma-separated; empty = none)
+STREAM_SOURCE_HOSTS = {
+    host.strip().lower()
+    for host in os.environ.get("NAZAR_STREAM_HOSTS", "").split(",")
+    if host.strip()
+}
+STREAM_SOURCE_DIRS = [
+    os.path.realpath(path.strip())
+    for path in os.environ.get("NAZAR_STREAM_DIRS", "").split(",")
+    if path.strip()
+]
+STREAM_SOURCE_SCHEMES = ("rtsp", "rtsps", "http", "https")
+
+# Adaptive sampling (core.sampling_scheduler): analyses per second across
+# all streams; never exceeded, shared max-min fairly between cameras
+STREAM_BUDGET_FPS = float(os.environ.get("NAZAR_STREAM_BUDGET_FPS", "20"))
+# Stream analyses in flight at once; they run on the shared analysis
+# executor (NAZAR_EXECUTOR) and count against its queue like uploads
+STREAM_ANALYSIS_WORKERS = 4
+# Idle cameras back off by this factor per sample down to STREAM_IDLE_FPS
+STREAM_IDLE_FPS = 0.1
+STREAM_IDLE_BACKOFF = 0.7
+# A camera stays active this long after its last detection (seconds)
+STREAM_ACTIVE_HOLD = 30
+# Mean absolute thumbnail difference (0-255) between samples counted as motion
+STREAM_MOTION_THRESHOLD = 4.0
+
+
+# ---------------- ANALYSIS JOBS ----------------
+
+# Submitted jobs and their results survive restarts in this SQLite file
+JOBS_DB = os.environ.get("NAZAR_JOBS_DB", "jobs.sqlite3")
+# Jobs analyzed at once; the rest of the executor queue stays free for
+# synchronous requests
+JOB_CONCURRENCY = ANALYSIS_WORKERS
+JOB_MAX_QUEUED = 1000              # further submissions get 503
+JOB_RESULT_TTL = 24 * 3600         # seconds finished jobs stay pollable
+# Seconds between maintenance passes: expired results are pruned, running
+# jobs refreshed and jobs left RUNNING by a dead process queued again
+JOB_MAINTENANCE_INTERVAL = 60
+JOB_STALE_AFTER = 300              # seconds a RUNNING job may go unrefreshed
+# Results are POSTed here when a job doesn't name its own callback_url
+JOB_CALLBACK_URL = os.environ.get("NAZAR_JOB_CALLBACK_URL")
+# Hosts a job's own callback_url may point to (comma-separated); any other
+# URL than JOB_CALLBACK_URL is rejected, so clients can't make the server
+# POST to internal addresses
+JOB_CALLBACK_HOSTS = {
+    host.strip().lower()
+    for host in os.environ.get("NAZAR_JOB_CALLBACK_HOSTS", "").split(",")
+    if host.strip()
+}
+JOB_CALLBACK_TIMEOUT = 5           # seconds per delivery attempt
+JOB_CALLBACK_RETRIES = 3
+
+
+# ---------------- DETECTION EVENTS ----------------
+
+# Every analyzed frame's verified and raw detections are appended to this
+# SQLite file (core.detection_store) and served by GET /detections
+DETECTION_STORE_ENABLED = os.environ.get("NAZAR_DETECTION_STORE", "1") == "1"
+DETECTION_DB = os.environ.get("NAZAR_DETECTION_DB", "detections.sqlite3")
+# Events are written by a background thread, one transaction per batch
+DETECTION_BATCH_SIZE = 500
+DETECTION_FLUSH_INTERVAL = 1.0     # seconds an event may wait for its batch
+DETECTION_MAX_PENDING = 20000      # further events are dropped (and counted)
+DETECTION_QUERY_LIMIT = 1000       # most rows one query returns
+
+
+# ---------------- CHANGE GATE ----------------
+
+# Frames of a camera (camera_id given) that barely differ from its last
+# analyzed frame reuse that result instead of running the detectors
+CHANGE_GATE_ENABLED = True
+CHANGE_GATE_THUMB_SIZE = (64, 36)     # (width, height)
+CHANGE_GATE_THRESHOLD = 4.0           # mean absolute gray difference (0-255)
+CHANGE_GATE_MAX_STALENESS = 30        # seconds before a forced re-analysis
+
+
+# ---------------- NEAR-DUPLICATE INDEX ----------------
+
+# Frames whose perceptual hash (dHash) is within MAX_DISTANCE bits of a
+# recently analyzed frame of the same camera (or of any request without
+# camera_id) reuse that frame's response, flagged "reused"
+NEAR_DUPLICATE_ENABLED = True
+NEAR_DUPLICATE_HASH_SIZE = 16      # 16x16 gradients, 2 bits each = 512-bit hash
+NEAR_DUPLICATE_GRADIENT_MARGIN = 3 # gray levels; smaller gradients count as flat
+NEAR_DUPLICATE_MAX_DISTANCE = 3    # Hamming distance, out of 2 * HASH_SIZE ** 2
+NEAR_DUPLICATE_MAX_AGE = 30        # seconds an analyzed frame stays reusable
+NEAR_DUPLICATE_MAX_ENTRIES = 32    # recent frames indexed per camera
+
+
+# ---------------- RESPONSE CACHE ----------------
+
+# Byte-identical uploads (same image bytes, options and camera) reuse the
+# previous response without decoding or running any detector
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_MAX_ENTRIES = 1024
+RESPONSE_CACHE_MAX_BYTES = 32 * 1024 * 1024   # serialized responses held in memory
+RESPONSE_CACHE_TTL = 300                      # seconds
+# Optional SQLite file shared by all workers/processes on the host (unset = memory only)
+RESPONSE_CACHE_DB = os.environ.get("NAZAR_RESPONSE_CACHE_DB")
+
+
+# ---------------- WORKING RESOLUTION ----------------
+
+# Uploads are decoded (JPEG: with reduced DCT decode) and downscaled so
+# their longest side is at most this many pixels
+MAX_WORKING_RESOLUTION = 1280
+
+# Laplacian-variance features (texture damage, fan blur, clutter texture)
+# are measured with the frame's longest side at this size, never more
+# (smaller uploads at their own size), so their thresholds mean the
+# same for every upload size and decode mode
+SHARPNESS_RESOLUTION = MAX_WORKING_RESOLUTION
+
+# Longest side each detector works at (None = the decoded frame).
+# Water and waste must match: the water mask is reused by the waste check.
+# Pixel thresholds are expressed in original-image pixels and rescaled.
+DETECTOR_RESOLUTION = {
+    "water": 960,
+    "waste": 960,
+    "infrastructure": 1280,
+    "light": 640,
+    "fan": 640,
+}
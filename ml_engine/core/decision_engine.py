@@ -7,50 +7,90 @@ Analyzes a single frame for:
 3. General maintenance issues
 """
 
+from core.frame_context import as_frame_context
 from detectors.light_detector import detect_artificial_light
 from detectors.fan_motion_detector import detect_fan_motion
 from detectors.infrastructure_detector import detect_broken_infrastructure
 
 
-def process_frame(frame):
+def detect_energy_waste(frame, state=None):
+    """
+    Lights / fan check.
+    
+    Returns:
+        Energy waste issue dict, or None
+    """
+    ctx = as_frame_context(frame)
+    
+    lights_on = detect_artificial_light(ctx)
+    fan_on = detect_fan_motion(ctx, state)
+    
+    return energy_waste_issue(lights_on, fan_on)
+
+
+def energy_waste_issue(lights_on, fan_on):
+    """Energy waste issue dict from the light and fan checks, or None"""
+    if not (lights_on or fan_on):
+        return None
+    
+    return {
+        "status": "DETECTED",
+        "issue_type": "Energy Waste",
+        "severity": "Medium",
+        "details": {
+            "lights_on": lights_on,
+            "fan_running": fan_on
+        }
+    }
+
+
+def detect_infrastructure_damage(frame):
+    """
+    Cracks / stains / rust / texture damage check.
+    
+    Returns:
+        Broken infrastructure issue dict, or None
+    """
+    is_broken, severity, details = detect_broken_infrastructure(frame)
+    
+    if not is_broken:
+        return None
+    
+    return {
+        "status": "DETECTED",
+        "issue_type": "Broken Infrastructure",
+        "severity": severity,
+        "details": details
+    }
+
+
+def process_frame(frame, state=None):
     """
     Analyze frame for infrastructure issues.
     
     For single image analysis, we don't rely on temporal tracking.
     Instead, we directly analyze what's visible in the frame.
     
+    Args:
+        frame: Input frame or FrameContext
+        state: Optional CameraState for the temporal fan check
+    
     Returns:
         Dictionary with detected issues, or None if no issues found
     """
     
+    ctx = as_frame_context(frame)
     issues = {}
     
     # ====== ENERGY WASTE DETECTION ======
-    lights_on = detect_artificial_light(frame)
-    fan_on = detect_fan_motion(frame)
-    
-    if lights_on or fan_on:
-        issues["energy_waste"] = {
-            "status": "DETECTED",
-            "issue_type": "Energy Waste",
-            "severity": "Medium",
-            "details": {
-                "lights_on": lights_on,
-                "fan_running": fan_on
-            }
-        }
+    energy_waste = detect_energy_waste(ctx, state)
+    if energy_waste:
+        issues["energy_waste"] = energy_waste
     
     # ====== BROKEN INFRASTRUCTURE DETECTION ======
-    is_broken, severity, details = detect_broken_infrastructure(frame)
-    
-    if is_broken:
-        issues["broken_infrastructure"] = {
-            "status": "DETECTED",
-            "issue_type": "Broken Infrastructure",
-            "severity": severity,
-            "details": details
-        }
+    broken = detect_infrastructure_damage(ctx)
+    if broken:
+        issues["broken_infrastructure"] = broken
     
     # Return all detected issues, or None if nothing found
     return issues if issues else None
-
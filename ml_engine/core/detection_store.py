@@ -0,0 +1,282 @@
+"""
+Detection Store
+
+Local, append-only history of detections, for ops queries that should
+not hit the remote ticket database.
+
+Every frame the detectors actually analyze appends one "verified" event
+(the reported detection, if any) and one "raw" event per raw detector
+result to a SQLite file in WAL mode. record() only queues the event; a
+background writer thread encodes queued events and commits them in
+batches of up to DETECTION_BATCH_SIZE, one transaction per batch (group
+commit), so inference never waits on the disk. If the writer falls
+DETECTION_MAX_PENDING events behind, new events are dropped and counted.
+
+Responses reused without running the detectors (response cache, change
+gate, near-duplicates) are not recorded again. With
+NAZAR_EXECUTOR=process every worker writes through its own writer
+thread; WAL lets them share the file with the API process reading it.
+
+Rows are indexed by (camera_id, ts), (type, ts) and ts, so per-camera
+and per-type time-range lookups are index range scans.
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from core.config import (
+    DEFAULT_CAMERA_ID,
+    DETECTION_DB,
+    DETECTION_BATCH_SIZE,
+    DETECTION_FLUSH_INTERVAL,
+    DETECTION_MAX_PENDING,
+    DETECTION_QUERY_LIMIT,
+)
+from core.serialization import dumps, loads
+
+# Detection types of the standardized categories (see standardize_detection)
+CATEGORY_TYPES = {
+    "Plumbing": "water_leak",
+    "Cleanliness": "waste",
+    "Safety": "unauthorized_access",
+    "Infrastructure": "broken_infrastructure",
+    "Electrical": "energy_waste",
+}
+
+_STOP = object()
+
+
+def event_rows(timestamp, camera_id, response, raw):
+    """Table rows of one analyzed frame"""
+    rows = []
+    verified = response.get("verified_detections", response)
+    if verified.get("detection") not in (None, "No Issue"):
+        rows.append((
+            timestamp, camera_id, "verified",
+            CATEGORY_TYPES.get(verified.get("category"), "unknown"),
+            verified.get("detection"), verified.get("category"),
+            verified.get("severity"), verified.get("confidence"), dumps(verified)
+        ))
+
+    # Infrastructure results nest one entry per issue type
+    results = dict(raw or {})
+    results.update(results.pop("general_infrastructure", None) or {})
+    for detection_type, data in results.items():
+        if not data:
+            continue
+        details = data if isinstance(data, dict) else {}
+        confidence = details.get("confidence")
+        rows.append((
+            timestamp, camera_id, "raw", detection_type,
+            details.get("issue") or details.get("issue_type"), None,
+            details.get("severity"),
+            confidence if isinstance(confidence, (int, float)) else None,
+            dumps(data)
+        ))
+    return rows
+
+
+class DetectionStore:
+    def __init__(
+        self,
+        path=DETECTION_DB,
+        batch_size=DETECTION_BATCH_SIZE,
+        flush_interval=DETECTION_FLUSH_INTERVAL,
+        max_pending=DETECTION_MAX_PENDING
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._created = False
+        self._counters = {"recorded": 0, "written": 0, "dropped": 0, "batches": 0, "errors": 0}
+
+    def _connection(self):
+        # sqlite3 connections may not be shared between threads (or processes)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Durable at each checkpoint; a crash loses at most the last commits
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            if not self._created:
+                self._create(conn)
+        return conn
+
+    def _create(self, conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS detections ("
+            "id INTEGER PRIMARY KEY, ts REAL NOT NULL, camera_id TEXT NOT NULL, "
+            "kind TEXT NOT NULL, type TEXT NOT NULL, label TEXT, category TEXT, "
+            "severity TEXT, confidence REAL, data BLOB NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS detections_camera ON detections (camera_id, ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS detections_type ON detections (type, ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS detections_ts ON detections (ts)")
+        self._created = True
+
+    # ---------------- WRITES ----------------
+
+    def _ensure_started(self):
+        """Start the writer in this process (forked workers start their own)."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_pending)
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.close)
+
+    def record(self, camera_id, response, raw=None, timestamp=None):
+        """
+        Queue the detections of one analyzed frame; never blocks.
+
+        Args:
+            response: Response returned for the frame (standardized or debug)
+            raw: Raw detections keyed by detector
+        """
+        self._ensure_started()
+        event = (timestamp or time.time(), camera_id or DEFAULT_CAMERA_ID, response, raw)
+        try:
+            self._queue.put_nowait(event)
+            outcome = "recorded"
+        except queue.Full:
+            outcome = "dropped"
+        with self._lock:
+            self._counters[outcome] += 1
+
+    def _next_batch(self):
+        """Block for one event, then take more until the batch is full or its time is up."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1] is not _STOP:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                             else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is _STOP
+            events = batch[:-1] if stop else batch
+            try:
+                rows = [row for event in events for row in event_rows(*event)]
+                if rows:
+                    conn = self._connection()
+                    conn.execute("BEGIN")
+                    try:
+                        conn.executemany(
+                            "INSERT INTO detections (ts, camera_id, kind, type, label, category, "
+                            "severity, confidence, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            rows
+                        )
+                        conn.execute("COMMIT")
+                    except Exception:
+                        conn.execute("ROLLBACK")
+                        raise
+                    self._counters["written"] += len(rows)
+                    self._counters["batches"] += 1
+            except Exception as e:
+                self._counters["errors"] += 1
+                print(f"Detection store error: {e}")
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Wait until every queued event is committed."""
+        if self._pid == os.getpid():
+            self._queue.join()
+
+    def close(self):
+        """Commit what is queued and stop the writer."""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout=10)
+
+    # ---------------- QUERIES ----------------
+
+    def query(
+        self,
+        camera_id=None,
+        detection_type=None,
+        kind=None,
+        since=None,
+        until=None,
+        limit=100,
+        include_data=True
+    ):
+        """
+        Events matching every given filter, newest first.
+
+        Args:
+            since / until: Unix timestamps bounding ts (inclusive / exclusive)
+            limit: Capped at DETECTION_QUERY_LIMIT
+        """
+        clauses, params = [], []
+        for column, value in (("camera_id", camera_id), ("type", detection_type), ("kind", kind)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        params.append(max(1, min(int(limit), DETECTION_QUERY_LIMIT)))
+        rows = self._connection().execute(
+            "SELECT id, ts, camera_id, kind, type, label, category, severity, confidence, "
+            f"{'data' if include_data else 'NULL'} FROM detections {where}"
+            "ORDER BY ts DESC LIMIT ?",
+            params
+        ).fetchall()
+
+        events = []
+        for event_id, ts, camera, event_kind, event_type, label, category, severity, confidence, data in rows:
+            event = {
+                "id": event_id,
+                "timestamp": ts,
+                "camera_id": camera,
+                "kind": event_kind,
+                "type": event_type,
+                "label": label,
+                "category": category,
+                "severity": severity,
+                "confidence": confidence
+            }
+            if include_data:
+                event["data"] = loads(data)
+            events.append(event)
+        return events
+
+    def stats(self):
+        stats = dict(self._counters)
+        stats["pending"] = self._queue.qsize() if self._pid == os.getpid() else 0
+        return stats
+
+
+# Process-wide store used by the analysis pipeline and the API
+detection_store = DetectionStore()
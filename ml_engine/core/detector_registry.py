@@ -0,0 +1,176 @@
+"""
+Detector Registry
+
+Declarations of the pipeline's detectors and the machinery that runs a
+selected subset of them on one frame.
+
+Each Detector declares its name, the detectors whose results it reads
+(depends_on), the frame features and models it uses, its priority (the
+resolve_conflicts order, lower first) and a relative cost. Selectable
+detectors are the ones a request or camera profile can ask for; the
+others (the shared person check, the water mask) only run as a
+dependency of a selected detector. A DetectorRun evaluates detectors on
+demand and at most once per frame, so anything no selected detector
+needs, models included, never executes.
+
+Which detectors run comes from the request's `detectors` field (names
+and/or DETECTOR_PROFILES names, comma-separated), else from the
+camera's entry in CAMERA_PROFILES, else every selectable detector.
+The detectors themselves are registered by core.analysis.
+"""
+
+from core.config import CAMERA_PROFILES, DEFAULT_CAMERA_ID, DETECTOR_PROFILES
+
+
+class Detector:
+    def __init__(
+        self,
+        name,
+        run,
+        depends_on=(),
+        features=(),
+        models=(),
+        priority=100,
+        cost=1.0,
+        selectable=True,
+        decisive=None,
+        skipped=None
+    ):
+        """
+        Args:
+            run: run(detector_run) -> result; reads dependencies with detector_run.get
+            depends_on: Detectors whose results run() reads
+            features: FrameContext features it uses (gray, hsv, edges, ...)
+            models: Models it runs (yolo, pose)
+            cost: Relative cost, breaks priority ties (cheaper first)
+            decisive: decisive(result) -> True when nothing with a higher
+                      priority value could outrank the result
+            skipped: skipped(detector_run) when run_until_decisive stops
+                     before reaching it; keeps per-camera history current
+        """
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+        self.features = tuple(features)
+        self.models = tuple(models)
+        self.priority = priority
+        self.cost = cost
+        self.selectable = selectable
+        self.decisive = decisive
+        self.skipped = skipped
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "depends_on": list(self.depends_on),
+            "features": list(self.features),
+            "models": list(self.models),
+            "priority": self.priority,
+            "cost": self.cost
+        }
+
+
+DETECTORS = {}
+
+
+def register(detector):
+    DETECTORS[detector.name] = detector
+    return detector
+
+
+def _ordered(names):
+    return tuple(sorted(names, key=lambda n: (DETECTORS[n].priority, DETECTORS[n].cost)))
+
+
+def selectable_detectors():
+    """Names of every selectable detector, in priority order"""
+    return _ordered(n for n, d in DETECTORS.items() if d.selectable)
+
+
+def resolve_selection(detectors=None, camera_id=None):
+    """
+    Detectors to run for a request.
+
+    Args:
+        detectors: Comma-separated string or list of detector and/or
+                   profile names; None falls back to the camera profile
+        camera_id: Camera whose CAMERA_PROFILES entry applies
+
+    Returns:
+        (tuple of names in priority order, None) or (None, error_response)
+    """
+    if detectors is None or detectors == "":
+        detectors = CAMERA_PROFILES.get(camera_id or DEFAULT_CAMERA_ID)
+    if detectors is None:
+        return selectable_detectors(), None
+
+    if isinstance(detectors, str):
+        detectors = detectors.split(",")
+
+    names, unknown = set(), []
+    for token in (t.strip() for t in detectors):
+        if not token:
+            continue
+        if token in DETECTOR_PROFILES:
+            names.update(DETECTOR_PROFILES[token])
+        elif token in DETECTORS and DETECTORS[token].selectable:
+            names.add(token)
+        else:
+            unknown.append(token)
+
+    if unknown:
+        return None, {"status": "ERROR", "message": f"Unknown detectors: {', '.join(unknown)}"}
+    if not names:
+        return None, {"status": "ERROR", "message": "No detectors selected"}
+    return _ordered(names), None
+
+
+def models_needed(names):
+    """Models the given detectors and their dependencies run"""
+    models, pending, seen = set(), list(names), set()
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        models.update(DETECTORS[name].models)
+        pending.extend(DETECTORS[name].depends_on)
+    return models
+
+
+class DetectorRun:
+    """Results of the detectors evaluated on one frame so far."""
+
+    def __init__(self, ctx, state, options):
+        self.ctx = ctx
+        self.state = state
+        # Request options (start_hour, end_hour, check_unauthorized)
+        self.options = options
+        self.results = {}
+
+    def get(self, name):
+        """Result of a detector, running it (after its dependencies) on first use."""
+        if name not in self.results:
+            detector = DETECTORS[name]
+            for dependency in detector.depends_on:
+                self.get(dependency)
+            self.results[name] = detector.run(self)
+        return self.results[name]
+
+    def run_all(self, names):
+        for name in names:
+            self.get(name)
+
+    def run_until_decisive(self, names):
+        """
+        Run names in order and stop after the first decisive result; the
+        detectors left unevaluated get their skipped hook instead.
+        """
+        for index, name in enumerate(names):
+            detector = DETECTORS[name]
+            result = self.get(name)
+            if detector.decisive is not None and detector.decisive(result):
+                for rest in names[index + 1:]:
+                    if rest not in self.results and DETECTORS[rest].skipped is not None:
+                        DETECTORS[rest].skipped(self)
+                return
@@ -0,0 +1,189 @@
+"""
+Analysis Executor
+
+Runs the CPU-bound detector pipeline off the asyncio event loop, in a
+thread pool or a process pool, with a bounded queue.
+
+At most `workers + queue_size` analyses are admitted at once; further
+submissions raise QueueFullError so the API can answer 503 instead of
+letting latency grow without bound.
+
+In process mode every call also brings back the metrics the worker
+recorded while running it, which are merged into this process's registry.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from core.metrics import registry
+
+
+class QueueFullError(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+def _init_worker(initializer, initargs):
+    # A forked worker starts with a copy of the parent's metrics; drop them
+    # so take_delta() only ever reports what this worker recorded
+    registry.take_delta()
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _call_with_metrics(fn, *args):
+    """Run fn(*args) in a worker process; returns (result, metric delta)."""
+    result = fn(*args)
+    return result, registry.take_delta()
+
+
+def _merge_metrics(future):
+    if not future.cancelled() and future.exception() is None:
+        registry.merge(future.result()[1])
+
+
+class AnalysisExecutor:
+    def __init__(self, mode="thread", workers=2, queue_size=8, initializer=None, initargs=()):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown executor mode: {mode}")
+
+        self.mode = mode
+        self.workers = workers
+        self.queue_size = queue_size
+        # Run once in every worker process (threads share the parent's models)
+        self.initializer = initializer
+        self.initargs = initargs
+
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def _get_pool(self):
+        """Create the pool on first use (and again after shutdown)."""
+        with self._lock:
+            if self._pool is None:
+                if self.mode == "process":
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        initializer=_init_worker,
+                        initargs=(self.initializer, self.initargs)
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="analysis"
+                    )
+            return self._pool
+
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.workers + self.queue_size:
+                self._rejected += 1
+                raise QueueFullError("Analysis queue is full")
+            self._pending += 1
+
+    def _release(self, failed):
+        with self._lock:
+            self._pending -= 1
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+
+    def reserve(self):
+        """
+        Admit one analysis ahead of run(), for callers with work of their
+        own to do first (decoding into the frame arena) that must be
+        bounded like the analysis. Follow with run(..., reserved=True),
+        or unreserve() if there is nothing to run after all.
+
+        Raises:
+            QueueFullError if the executor is saturated
+        """
+        self._admit()
+
+    def unreserve(self):
+        """Give back a reservation that will not be run."""
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn, *args, on_done=None, reserved=False):
+        """
+        Run fn(*args) on the pool and await its result.
+
+        Args:
+            on_done: Optional callback run once fn has finished, or right
+                     away if fn was never submitted (frees resources the
+                     worker reads, like a shared-memory frame slot)
+            reserved: Admission already taken with reserve()
+
+        Raises:
+            QueueFullError if the executor is saturated
+        """
+        try:
+            if not reserved:
+                self._admit()
+        except QueueFullError:
+            if on_done is not None:
+                on_done()
+            raise
+
+        try:
+            if self.mode == "process":
+                future = self._get_pool().submit(_call_with_metrics, fn, *args)
+            else:
+                future = self._get_pool().submit(fn, *args)
+        except Exception:
+            self._release(failed=True)
+            if on_done is not None:
+                on_done()
+            raise
+
+        # Release on completion rather than when the awaiting request ends,
+        # so a disconnected client does not free a slot that is still busy
+        future.add_done_callback(
+            lambda f: self._release(failed=f.cancelled() or f.exception() is not None)
+        )
+        if on_done is not None:
+            future.add_done_callback(lambda f: on_done())
+        if self.mode == "process":
+            # Merged on completion, like the release, whether or not anyone
+            # is still awaiting the result
+            future.add_done_callback(_merge_metrics)
+            result, _ = await asyncio.wrap_future(future)
+            return result
+        return await asyncio.wrap_future(future)
+
+    def prime(self, fn, *args):
+        """
+        Submit fn(*args) as many times as there are workers, without
+        waiting and outside the admission bound, for housekeeping such as
+        warmup. In process mode this also starts every worker process
+        (running the initializer).
+        """
+        pool = self._get_pool()
+        for _ in range(self.workers):
+            pool.submit(fn, *args)
+
+    def stats(self):
+        """Queue-depth and throughput counters."""
+        with self._lock:
+            pending = self._pending
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "in_flight": min(pending, self.workers),
+                "queue_depth": max(pending - self.workers, 0),
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected
+            }
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,148 @@
+"""
+Frame Arena
+
+Zero-copy hand-off of decoded frames to process-pool workers.
+
+The API process owns one multiprocessing.shared_memory block split into
+fixed-size slots, each large enough for a decoded 1080p BGR frame
+(FRAME_ARENA_SLOT_PIXELS) and for any frame at MAX_WORKING_RESOLUTION.
+An upload is written into a free slot as decoded when it fits (one
+copy: cv2.imdecode cannot decode into a caller's buffer) and otherwise
+downscaled by cv2.resize straight into the slot. The worker receives
+only a FrameHandle (block name, slot, shape, scale) and maps the slot as
+a numpy view instead of unpickling a multi-megabyte array. The slot
+returns to the free list when the worker's future completes, so a slot
+is never rewritten while a worker can still read it.
+
+The API process owns the block. Its resource tracker starts with the
+arena, so the arena must exist before the executor starts its workers
+(the API creates both at import, the pool lazily): workers then inherit
+that tracker, fork and spawn alike, and their attach-time registration
+is a no-op there rather than a second owner that would unlink the
+block when the worker exits. Python 3.13+ attaches untracked outright.
+
+Workers must not keep references to the mapped frame past the call:
+everything stored in camera state is derived (gray copies, thumbnails,
+hashes), never a view of the slot.
+"""
+
+import sys
+import threading
+from collections import namedtuple
+from multiprocessing import resource_tracker, shared_memory
+
+import cv2
+import numpy as np
+
+from core.config import FRAME_ARENA_SLOTS, FRAME_ARENA_SLOT_PIXELS, MAX_WORKING_RESOLUTION
+from core.frame_context import FrameContext, fit_size
+
+# A decoded 1080p frame, or any frame at the analysis resolution; 3 channels
+SLOT_BYTES = max(MAX_WORKING_RESOLUTION * MAX_WORKING_RESOLUTION, FRAME_ARENA_SLOT_PIXELS) * 3
+
+FrameHandle = namedtuple("FrameHandle", ["name", "slot", "offset", "shape", "scale"])
+
+
+class ArenaFullError(Exception):
+    """Raised when every slot holds a frame that is still being analyzed."""
+
+
+class FrameArena:
+    def __init__(self, slots=FRAME_ARENA_SLOTS, slot_bytes=SLOT_BYTES):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self._shm = None
+        self._free = list(range(slots))
+        self._lock = threading.Lock()
+        self._acquired = 0
+        self._rejected = 0
+        # Inherited by workers forked or spawned from now on
+        resource_tracker.ensure_running()
+
+    def _block(self):
+        """Create the shared block on first use; thread mode never needs it."""
+        if self._shm is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+        return self._shm
+
+    def put(self, ctx):
+        """
+        Write a decoded frame context into a free slot: its native (as
+        decoded) frame when that fits, else that frame resized into the
+        slot at MAX_WORKING_RESOLUTION.
+
+        Returns:
+            FrameHandle to pass to the worker
+
+        Raises:
+            ArenaFullError if no slot is free
+        """
+        native = ctx.native
+        frame = native.frame
+        if frame.dtype != np.uint8 or frame.ndim != 3:
+            raise ValueError(f"Frame {frame.shape} {frame.dtype} is not an 8-bit color frame")
+
+        size = None
+        shape, scale = frame.shape, native.scale
+        if frame.nbytes > self.slot_bytes:
+            size, factor = fit_size(frame.shape, MAX_WORKING_RESOLUTION)
+            shape, scale = (size[1], size[0], frame.shape[2]), native.scale * factor
+
+        with self._lock:
+            if not self._free:
+                self._rejected += 1
+                raise ArenaFullError("Frame arena is full")
+            slot = self._free.pop()
+            self._acquired += 1
+            shm = self._block()
+
+        offset = slot * self.slot_bytes
+        view = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+        if size is None:
+            np.copyto(view, frame)
+        else:
+            cv2.resize(frame, size, dst=view, interpolation=cv2.INTER_AREA)
+        return FrameHandle(shm.name, slot, offset, shape, scale)
+
+    def release(self, handle):
+        with self._lock:
+            self._free.append(handle.slot)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "free": len(self._free),
+                "acquired": self._acquired,
+                "rejected": self._rejected
+            }
+
+    def close(self):
+        with self._lock:
+            shm, self._shm = self._shm, None
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+
+# ---------------- WORKER SIDE ----------------
+
+# Blocks this worker process has mapped, by name
+_attached = {}
+
+
+def _attach(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Registers with the owner's tracker, inherited from the API process,
+    # which already tracks the block: nothing changes (see module docstring)
+    return shared_memory.SharedMemory(name=name)
+
+
+def open_frame(handle):
+    """FrameContext over the slot's memory (no copy), in a worker process"""
+    shm = _attached.get(handle.name)
+    if shm is None:
+        shm = _attached[handle.name] = _attach(handle.name)
+    frame = np.ndarray(handle.shape, dtype=np.uint8, buffer=shm.buf, offset=handle.offset)
+    return FrameContext(frame, scale=handle.scale)
@@ -1,5 +1,154 @@
+"""
+Frame Buffer
+
+Per-camera temporal storage for the pipelines that compare frames over
+time (fan motion, water persistence).
+
+FrameRingBuffer preallocates `capacity` downscaled grayscale frames and
+their timestamps once and overwrites the oldest slot on every push.
+Running per-pixel sums and squared sums are updated incrementally, so
+the window mean and temporal variance cost one pass over a single frame
+instead of the whole window. Each frame is written twice (slot i and
+i + capacity), which keeps the most recent k frames contiguous: last(k)
+is always a zero-copy view. mean() and variance() allocate nothing but
+their result, and not even that when given `out`.
+"""
+
 import time
 
+import cv2
+import numpy as np
+
+from core.config import FRAME_HISTORY, FRAME_BUFFER_WIDTH, FRAME_BUFFER_MAX_BYTES
+
+
+def shrink(gray, width=FRAME_BUFFER_WIDTH):
+    """Downscale a grayscale frame to the buffer width (never upscales)"""
+    h, w = gray.shape[:2]
+    if w <= width:
+        return gray
+    return cv2.resize(gray, (width, max(int(round(h * width / w)), 1)), interpolation=cv2.INTER_AREA)
+
+
+class FrameRingBuffer:
+    """Fixed-size window of uint8 frames with running sums."""
+
+    def __init__(self, shape, capacity=FRAME_HISTORY, max_bytes=FRAME_BUFFER_MAX_BYTES):
+        self.shape = tuple(shape)
+        pixels = int(np.prod(self.shape))
+        # Fixed cost: sum, squared sum and a scratch frame (int32 each);
+        # per slot: the frame twice plus its timestamp
+        fixed = 12 * pixels
+        per_slot = 2 * pixels + 8
+        fits = (max_bytes - fixed) // per_slot
+        if fits < 2:
+            raise ValueError(
+                f"FRAME_BUFFER_MAX_BYTES ({max_bytes}) cannot hold two {self.shape} frames "
+                f"({fixed + 2 * per_slot} bytes needed)"
+            )
+        self.capacity = min(capacity, fits)
+
+        self._frames = np.zeros((2 * self.capacity,) + self.shape, dtype=np.uint8)
+        self._timestamps = np.zeros(2 * self.capacity, dtype=np.float64)
+        self._sum = np.zeros(self.shape, dtype=np.int32)
+        self._sqsum = np.zeros(self.shape, dtype=np.int32)
+        self._scratch = np.empty(self.shape, dtype=np.int32)
+        # The same memory as float32, for variance(); never used at once
+        self._float_scratch = self._scratch.view(np.float32)
+        self._next = 0      # slot the next frame is written to
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        return (
+            self._frames.nbytes + self._timestamps.nbytes +
+            self._sum.nbytes + self._sqsum.nbytes + self._scratch.nbytes
+        )
+
+    def push(self, frame, timestamp=None):
+        """Append a uint8 frame of the buffer's shape, evicting the oldest when full."""
+        if frame.shape != self.shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match buffer shape {self.shape}")
+
+        slot = self._next
+        if self._count == self.capacity:
+            evicted = self._frames[slot]
+            np.subtract(self._sum, evicted, out=self._sum, casting="unsafe")
+            np.multiply(evicted, evicted, out=self._scratch, dtype=np.int32)
+            np.subtract(self._sqsum, self._scratch, out=self._sqsum)
+        else:
+            self._count += 1
+
+        self._frames[slot] = frame
+        self._frames[slot + self.capacity] = frame
+        stamp = time.time() if timestamp is None else timestamp
+        self._timestamps[slot] = stamp
+        self._timestamps[slot + self.capacity] = stamp
+
+        np.add(self._sum, frame, out=self._sum, casting="unsafe")
+        np.multiply(frame, frame, out=self._scratch, dtype=np.int32)
+        np.add(self._sqsum, self._scratch, out=self._sqsum)
+
+        self._next = (slot + 1) % self.capacity
+
+    def _window(self, k):
+        k = self._count if k is None else min(k, self._count)
+        end = self._next + self.capacity
+        return end - k, end
+
+    def last(self, k=None):
+        """View (oldest first) of the last k frames, all buffered frames by default"""
+        start, end = self._window(k)
+        return self._frames[start:end]
+
+    def timestamps(self, k=None):
+        """View of the timestamps matching last(k)"""
+        start, end = self._window(k)
+        return self._timestamps[start:end]
+
+    def mean(self, out=None):
+        """Per-pixel mean over the buffered frames (float32)"""
+        if out is None:
+            out = np.empty(self.shape, dtype=np.float32)
+        # float32 loop: a float64 one would buffer the whole cast frame
+        n = np.float32(max(self._count, 1))
+        np.divide(self._sum, n, out=out, dtype=np.float32, casting="unsafe")
+        return out
+
+    def variance(self, out=None):
+        """Per-pixel temporal variance over the buffered frames (float32)"""
+        n = np.float32(max(self._count, 1))
+        if out is None:
+            out = np.empty(self.shape, dtype=np.float32)
+        # mean^2 in the scratch frame, in place: no temporaries
+        mean_sq = self.mean(out=self._float_scratch)
+        np.multiply(mean_sq, mean_sq, out=mean_sq)
+        np.divide(self._sqsum, n, out=out, dtype=np.float32, casting="unsafe")
+        np.subtract(out, mean_sq, out=out)
+        np.maximum(out, 0, out=out)
+        return out
+
+    def clear(self):
+        self._sum.fill(0)
+        self._sqsum.fill(0)
+        self._next = 0
+        self._count = 0
+
+
+def frame_buffer(section, key, shape, capacity=FRAME_HISTORY):
+    """
+    The ring buffer stored under section[key], (re)created when missing
+    or when the camera's frame shape changed.
+    """
+    buffer = section.get(key)
+    if buffer is None or buffer.shape != tuple(shape):
+        buffer = section[key] = FrameRingBuffer(shape, capacity)
+    return buffer
+
+
 class EmptyRoomTracker:
     def __init__(self):
         self.last_person_time = time.time()
@@ -10,5 +159,3 @@ class EmptyRoomTracker:
 
     def is_empty_long_enough(self, threshold):
         return time.time() - self.last_person_time > threshold
-
-
@@ -0,0 +1,220 @@
+"""
+Frame Context
+
+Per-frame feature cache shared by all detectors.
+
+analyze_image builds one FrameContext per decoded frame. Derived images
+(gray, HSV, RGB, Laplacian, Canny edges, ROI crops) are computed the
+first time a detector asks for them and reused by every later detector,
+so each full-frame color conversion or filter runs at most once.
+
+Detectors work at the resolution they declare in DETECTOR_RESOLUTION
+(see working_context). `scale` records how much the working frame was
+shrunk relative to the uploaded image, so pixel-unit thresholds can be
+expressed in original-image pixels and stay consistent across decode
+modes and working resolutions: lengths with scaled(), areas with
+scaled_area(), edge-pixel ratios with edge_ratio(). Laplacian variance
+has no such law (downscaling averages sensor noise away but sharpens
+edges), so it is always measured at one reference size instead: the
+frame with its longest side at SHARPNESS_RESOLUTION (sharpness_view),
+whatever the upload size, decode mode or detector resolution.
+"""
+
+import cv2
+import numpy as np
+
+from core.config import DETECTOR_RESOLUTION, SHARPNESS_RESOLUTION
+
+
+def image_variance(image):
+    _, std = cv2.meanStdDev(image)
+    return float(std[0, 0]) ** 2
+
+
+def laplacian_variance(gray):
+    """Variance of the Laplacian of an 8-bit image (float32 is exact here, and faster)"""
+    return image_variance(cv2.Laplacian(gray, cv2.CV_32F))
+
+
+def fit_size(shape, max_side):
+    """((width, height), factor) scaling an image of this shape to a longest side of max_side"""
+    h, w = shape[:2]
+    factor = max_side / float(max(h, w))
+    return (max(int(round(w * factor)), 1), max(int(round(h * factor)), 1)), factor
+
+
+def roi_bounds(shape, roi):
+    """Pixel bounds (x1, y1, x2, y2) of a fractional ROI in an image of this shape"""
+    h, w = shape[:2]
+    return int(roi[0] * w), int(roi[1] * h), int(roi[2] * w), int(roi[3] * h)
+
+
+class FrameContext:
+    def __init__(
+        self, frame, parent=None, region=None, scale=1.0, roi=None, source=None
+    ):
+        self.frame = frame
+        self.shape = frame.shape
+        # Set for ROI crops: parent context, (x1, y1, x2, y2) in parent
+        # pixels and the fractional ROI it was cut with
+        self.parent = parent
+        self.region = region
+        self.roi = roi
+        # Set for downscaled contexts: the context this one was resized from
+        self.source = source
+        # Linear size of this frame relative to the original image (<= 1)
+        self.scale = scale
+        self._cache = {}
+
+    @property
+    def area_scale(self):
+        """Multiply working-resolution pixel areas by this to get original-image areas"""
+        return 1.0 / (self.scale * self.scale)
+
+    def scaled(self, length):
+        """Convert a length in original-image pixels to working pixels"""
+        return max(int(round(length * self.scale)), 1)
+
+    def scaled_area(self, area):
+        """Convert an area in original-image pixels to working pixels"""
+        return area * self.scale * self.scale
+
+    @property
+    def native(self):
+        """This view of the frame at the largest resolution available (self if never downscaled)"""
+        if self.source is not None:
+            return self.source.native
+        if self.parent is not None:
+            parent_native = self.parent.native
+            if parent_native is not self.parent:
+                return parent_native.crop(self.roi)
+        return self
+
+    # ---------------- GENERIC MEMO ----------------
+
+    def memo(self, key, compute):
+        """Return the cached value for key, computing it on first access."""
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def has(self, key):
+        return key in self._cache
+
+    def store(self, key, value):
+        """Seed the cache with a value computed elsewhere (e.g. batched inference)."""
+        self._cache[key] = value
+
+    def _from_parent(self, key):
+        """Slice an already computed per-pixel feature out of the parent."""
+        if self.parent is None or key not in self.parent._cache:
+            return None
+        x1, y1, x2, y2 = self.region
+        return self.parent._cache[key][y1:y2, x1:x2]
+
+    # ---------------- DERIVED IMAGES ----------------
+
+    @property
+    def gray(self):
+        if "gray" not in self._cache:
+            gray = self._from_parent("gray")
+            if gray is None:
+                gray = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)
+            self._cache["gray"] = gray
+        return self._cache["gray"]
+
+    @property
+    def hsv(self):
+        if "hsv" not in self._cache:
+            hsv = self._from_parent("hsv")
+            if hsv is None:
+                hsv = cv2.cvtColor(self.frame, cv2.COLOR_BGR2HSV)
+            self._cache["hsv"] = hsv
+        return self._cache["hsv"]
+
+    @property
+    def rgb(self):
+        return self.memo("rgb", lambda: cv2.cvtColor(self.frame, cv2.COLOR_BGR2RGB))
+
+    @property
+    def sharpness_view(self):
+        """This view of the frame at SHARPNESS_RESOLUTION, where Laplacian features are measured"""
+        native = self.native
+        if native.parent is not None:
+            return native.parent.sharpness_view.crop(native.roi)
+        return native.at_resolution(SHARPNESS_RESOLUTION)
+
+    @property
+    def laplacian(self):
+        """Laplacian (float32) of the sharpness view"""
+        view = self.sharpness_view
+        # Not sliced from the parent: border handling differs at the crop edge
+        return view.memo("laplacian", lambda: cv2.Laplacian(view.gray, cv2.CV_32F))
+
+    @property
+    def laplacian_var(self):
+        """Laplacian variance at the reference size, comparable across uploads"""
+        view = self.sharpness_view
+        return view.memo("laplacian_var", lambda: image_variance(view.laplacian))
+
+    def edges(self, low, high):
+        """Canny edges of the gray image for the given thresholds"""
+        return self.memo(("edges", low, high), lambda: cv2.Canny(self.gray, low, high))
+
+    def edge_ratio(self, low, high):
+        """
+        Fraction of edge pixels in original-image terms: edges stay about
+        one pixel wide, so their share of a downscaled frame grows as 1 / scale.
+        """
+        def compute():
+            edges = self.edges(low, high)
+            return np.count_nonzero(edges) / edges.size * self.scale
+        return self.memo(("edge_ratio", low, high), compute)
+
+    # ---------------- ROI CROPS ----------------
+
+    def crop(self, roi):
+        """
+        Memoized child context for a fractional ROI (x1, y1, x2, y2).
+
+        The crop is a view of the frame, and gray/HSV are sliced from this
+        context when they have already been computed here.
+        """
+        key = ("crop", tuple(roi))
+        if key not in self._cache:
+            x1, y1, x2, y2 = roi_bounds(self.shape, roi)
+            self._cache[key] = FrameContext(
+                self.frame[y1:y2, x1:x2], parent=self, region=(x1, y1, x2, y2),
+                scale=self.scale, roi=tuple(roi)
+            )
+        return self._cache[key]
+
+    # ---------------- WORKING RESOLUTION ----------------
+
+    def at_resolution(self, max_side):
+        """
+        Memoized downscaled context whose longest side is at most max_side.
+        Returns self when the frame is already small enough (or max_side is None).
+        """
+        h, w = self.shape[:2]
+        if max_side is None or max(h, w) <= max_side:
+            return self
+
+        key = ("resolution", max_side)
+        if key not in self._cache:
+            size, factor = fit_size(self.shape, max_side)
+            small = cv2.resize(self.frame, size, interpolation=cv2.INTER_AREA)
+            self._cache[key] = FrameContext(small, scale=self.scale * factor, source=self)
+        return self._cache[key]
+
+
+def as_frame_context(frame):
+    """Accept either a raw BGR frame or a FrameContext."""
+    if isinstance(frame, FrameContext):
+        return frame
+    return FrameContext(frame)
+
+
+def working_context(frame, detector):
+    """Context at the working resolution the detector declares"""
+    return as_frame_context(frame).at_resolution(DETECTOR_RESOLUTION.get(detector))
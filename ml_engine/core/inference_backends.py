@@ -0,0 +1,219 @@
+"""
+YOLO Inference Backends
+
+Pluggable runtimes for the shared YOLO detector. Every backend returns,
+per frame, a list of boxes in the contract used by ObjectDetections:
+
+    {"class_name": str, "confidence": float, "box": (x1, y1, x2, y2)}
+
+- UltralyticsBackend: the ultralytics/PyTorch model (default)
+- OnnxYoloBackend: the same weights exported once to ONNX (optionally
+  INT8-quantized) and run on ONNX Runtime's CPU provider; torch is only
+  needed for the one-time export, not for serving
+"""
+
+import ast
+import os
+
+import cv2
+import numpy as np
+
+
+class UltralyticsBackend:
+    name = "ultralytics"
+
+    def __init__(self, weights):
+        from ultralytics import YOLO
+
+        self.model = YOLO(weights)
+        self.names = self.model.names
+
+    def predict(self, frames, conf):
+        results = self.model(frames, conf=conf, verbose=False)
+        detections = []
+        for r in results:
+            boxes = []
+            for b in r.boxes:
+                boxes.append({
+                    "class_name": self.names[int(b.cls[0])],
+                    "confidence": float(b.conf[0]),
+                    "box": tuple(map(int, b.xyxy[0]))
+                })
+            detections.append(boxes)
+        return detections
+
+
+class OnnxYoloBackend:
+    name = "onnxruntime"
+
+    def __init__(self, onnx_path, intra_op_threads=0, imgsz=640, iou=0.7, max_det=300):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.session = ort.InferenceSession(
+            onnx_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        self.imgsz = imgsz
+        self.iou = iou
+        self.max_det = max_det
+
+        # ultralytics stores the class names in the model metadata
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+
+        # Static exports only accept their export batch size
+        batch_dim = self.session.get_inputs()[0].shape[0]
+        self.fixed_batch = batch_dim if isinstance(batch_dim, int) else None
+
+    def predict(self, frames, conf):
+        if self.fixed_batch:
+            detections = []
+            for i in range(0, len(frames), self.fixed_batch):
+                detections.extend(self._predict_batch(frames[i:i + self.fixed_batch], conf))
+            return detections
+        return self._predict_batch(frames, conf)
+
+    def _predict_batch(self, frames, conf):
+        blobs, transforms = zip(*(letterbox(f, self.imgsz) for f in frames))
+        shapes = [f.shape[:2] for f in frames]
+        batch = np.stack(blobs)
+        pad_count = 0
+        if self.fixed_batch and len(frames) < self.fixed_batch:
+            pad_count = self.fixed_batch - len(frames)
+            batch = np.concatenate([batch, np.zeros((pad_count,) + batch.shape[1:], batch.dtype)])
+
+        # (batch, 4 + num_classes, anchors)
+        outputs = self.session.run(None, {self.input_name: batch})[0]
+
+        return [
+            self._decode(outputs[i], transforms[i], shapes[i], conf)
+            for i in range(len(frames))
+        ]
+
+    def _decode(self, output, transform, shape, conf):
+        predictions = output.T   # (anchors, 4 + num_classes)
+        class_scores = predictions[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+
+        keep = scores >= conf
+        if not np.any(keep):
+            return []
+        predictions, class_ids, scores = predictions[keep], class_ids[keep], scores[keep]
+
+        # cx, cy, w, h in letterboxed pixels -> x, y, w, h in frame pixels
+        ratio, pad_x, pad_y = transform
+        xywh = predictions[:, :4].copy()
+        xywh[:, 0] = (xywh[:, 0] - xywh[:, 2] / 2 - pad_x) / ratio
+        xywh[:, 1] = (xywh[:, 1] - xywh[:, 3] / 2 - pad_y) / ratio
+        xywh[:, 2] /= ratio
+        xywh[:, 3] /= ratio
+
+        # Class-aware NMS, as in ultralytics
+        indices = cv2.dnn.NMSBoxesBatched(
+            xywh.tolist(), scores.tolist(), class_ids.tolist(), conf, self.iou
+        )
+        indices = np.asarray(indices, dtype=int).reshape(-1)
+        indices = indices[np.argsort(-scores[indices], kind="stable")][:self.max_det]
+
+        # Clip to the frame like ultralytics does
+        height, width = shape
+        boxes = []
+        for i in indices:
+            x, y, w, h = xywh[i]
+            boxes.append({
+                "class_name": self.names.get(int(class_ids[i]), str(int(class_ids[i]))),
+                "confidence": float(scores[i]),
+                "box": (
+                    int(np.clip(x, 0, width)),
+                    int(np.clip(y, 0, height)),
+                    int(np.clip(x + w, 0, width)),
+                    int(np.clip(y + h, 0, height))
+                )
+            })
+        return boxes
+
+
+def letterbox(frame, imgsz):
+    """
+    Resize keeping aspect ratio and pad to imgsz x imgsz, as YOLO expects.
+
+    Returns:
+        (CHW float32 RGB blob in [0, 1], (ratio, pad_x, pad_y))
+    """
+    h, w = frame.shape[:2]
+    ratio = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+    pad_x = (imgsz - new_w) / 2
+    pad_y = (imgsz - new_h) / 2
+
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    canvas[top:top + new_h, left:left + new_w] = resized
+
+    blob = cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)
+    return np.ascontiguousarray(blob, dtype=np.float32) / 255.0, (ratio, left, top)
+
+
+# ---------------- EXPORT / QUANTIZATION ----------------
+
+def export_onnx(weights, onnx_path, imgsz=640):
+    """Export ultralytics weights to ONNX with a dynamic batch axis (needs torch)."""
+    from ultralytics import YOLO
+
+    exported = YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    if os.path.abspath(exported) != os.path.abspath(onnx_path):
+        os.replace(exported, onnx_path)
+    return onnx_path
+
+
+class _CalibrationReader:
+    """Feeds letterboxed images from a local folder to the INT8 calibrator."""
+
+    def __init__(self, input_name, calibration_dir, imgsz, limit=200):
+        extensions = (".jpg", ".jpeg", ".png", ".bmp")
+        files = sorted(
+            os.path.join(calibration_dir, f)
+            for f in os.listdir(calibration_dir)
+            if f.lower().endswith(extensions)
+        )[:limit]
+        if not files:
+            raise ValueError(f"No calibration images in {calibration_dir}")
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self._files = iter(files)
+
+    def get_next(self):
+        for path in self._files:
+            frame = cv2.imread(path)
+            if frame is not None:
+                blob, _ = letterbox(frame, self.imgsz)
+                return {self.input_name: blob[None]}
+        return None
+
+
+def quantize_onnx_int8(fp32_path, int8_path, calibration_dir, imgsz=640):
+    """Static INT8 quantization calibrated on local images (no network)."""
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+
+    session = ort.InferenceSession(fp32_path, providers=["CPUExecutionProvider"])
+    reader = _CalibrationReader(session.get_inputs()[0].name, calibration_dir, imgsz)
+    del session
+
+    quantize_static(
+        fp32_path,
+        int8_path,
+        reader,
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True
+    )
+    return int8_path
@@ -0,0 +1,368 @@
+"""
+Analysis Jobs
+
+Asynchronous alternative to the synchronous /ML_analyze call: a submit
+stores the upload and returns a job id at once, so clients and proxies
+don't hold a connection open while the detectors run. Results are
+polled by id and, when a callback URL is set, POSTed to it. A job may
+only name its own callback URL on a host in JOB_CALLBACK_HOSTS (see
+callback_error), and callbacks never follow redirects.
+
+Jobs are persisted in a SQLite file (JOBS_DB) and queued in-process.
+A runner claims a job with a conditional UPDATE (QUEUED -> RUNNING), so
+processes sharing JOBS_DB never run the same job twice. On startup,
+queued jobs are queued again. Running jobs are refreshed every
+JOB_MAINTENANCE_INTERVAL; one not refreshed for JOB_STALE_AFTER belongs
+to a process that died and is queued again, so accepted work survives
+a restart. The same maintenance pass prunes results older than
+JOB_RESULT_TTL. The upload bytes are dropped once a job finishes.
+
+The manager is framework-free: the API passes in the coroutine that
+runs one analysis on the executor. SQLite calls made while the API is
+serving run in threads (asyncio.to_thread), never on the event loop.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import traceback
+import urllib.parse
+import urllib.request
+import uuid
+
+from core.config import (
+    JOBS_DB,
+    JOB_CONCURRENCY,
+    JOB_MAX_QUEUED,
+    JOB_RESULT_TTL,
+    JOB_MAINTENANCE_INTERVAL,
+    JOB_STALE_AFTER,
+    JOB_CALLBACK_URL,
+    JOB_CALLBACK_HOSTS,
+    JOB_CALLBACK_TIMEOUT,
+    JOB_CALLBACK_RETRIES,
+    ANALYSIS_RETRY_AFTER,
+)
+from core.executor import QueueFullError
+from core.frame_arena import ArenaFullError
+from core.serialization import dumps, loads
+
+
+class JobQueueFullError(Exception):
+    """Raised when JOB_MAX_QUEUED jobs are already waiting."""
+
+
+class JobStore:
+    """SQLite table of jobs; one connection per thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+            "created REAL NOT NULL, updated REAL NOT NULL, "
+            "options TEXT NOT NULL, contents BLOB, callback_url TEXT, "
+            "result BLOB, error TEXT, callback_status TEXT)"
+        )
+        self._connection().execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def insert(self, job_id, options, contents, callback_url):
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO jobs (id, status, created, updated, options, contents, callback_url) "
+            "VALUES (?, 'QUEUED', ?, ?, ?, ?, ?)",
+            (job_id, now, now, json.dumps(options), contents, callback_url)
+        )
+
+    def load(self, job_id):
+        """(options, contents, callback_url) of a job to run, or None"""
+        row = self._connection().execute(
+            "SELECT options, contents, callback_url FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None or row[1] is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def claim(self, job_id):
+        """Mark a queued job RUNNING; False if it is not queued (another runner has it)"""
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = 'RUNNING', updated = ? WHERE id = ? AND status = 'QUEUED'",
+            (time.time(), job_id)
+        )
+        return cursor.rowcount == 1
+
+    def touch(self, job_ids):
+        """Refresh running jobs so other processes don't take them for stale"""
+        now = time.time()
+        self._connection().executemany(
+            "UPDATE jobs SET updated = ? WHERE id = ? AND status = 'RUNNING'",
+            [(now, job_id) for job_id in job_ids]
+        )
+
+    def finish(self, job_id, status, result=None, error=None):
+        """Store the outcome and drop the upload bytes."""
+        self._connection().execute(
+            "UPDATE jobs SET status = ?, updated = ?, result = ?, error = ?, contents = NULL "
+            "WHERE id = ?",
+            (status, time.time(), result, error, job_id)
+        )
+
+    def set_callback_status(self, job_id, callback_status):
+        self._connection().execute(
+            "UPDATE jobs SET callback_status = ? WHERE id = ?", (callback_status, job_id)
+        )
+
+    def get(self, job_id):
+        row = self._connection().execute(
+            "SELECT status, created, updated, result, error, callback_url, callback_status "
+            "FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, created, updated, result, error, callback_url, callback_status = row
+        job = {"job_id": job_id, "status": status, "created": created, "updated": updated}
+        if result is not None:
+            job["result"] = loads(result)
+        if error is not None:
+            job["error"] = error
+        if callback_url is not None:
+            job["callback_status"] = callback_status
+        return job
+
+    def queued(self):
+        """Ids of queued jobs, oldest first"""
+        rows = self._connection().execute(
+            "SELECT id FROM jobs WHERE status = 'QUEUED' ORDER BY created"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def requeue_stale(self, before):
+        """Queue again RUNNING jobs not refreshed since before; returns their ids"""
+        conn = self._connection()
+        rows = conn.execute(
+            "SELECT id FROM jobs WHERE status = 'RUNNING' AND updated < ? ORDER BY created", (before,)
+        ).fetchall()
+        requeued = []
+        for (job_id,) in rows:
+            # Conditional, like claim: only one process takes a stale job back
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'QUEUED', updated = ? "
+                "WHERE id = ? AND status = 'RUNNING' AND updated < ?",
+                (time.time(), job_id, before)
+            )
+            if cursor.rowcount == 1:
+                requeued.append(job_id)
+        return requeued
+
+    def prune(self, before):
+        self._connection().execute(
+            "DELETE FROM jobs WHERE status IN ('DONE', 'FAILED') AND updated < ?", (before,)
+        )
+
+
+def callback_error(url):
+    """
+    Why a job's own callback URL is refused, or None if it is allowed:
+    JOB_CALLBACK_URL itself, or http(s) on a host in JOB_CALLBACK_HOSTS.
+    """
+    if url is None or url == JOB_CALLBACK_URL:
+        return None
+    parsed = urllib.parse.urlsplit(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return "callback_url must be an http(s) URL"
+    if parsed.hostname.lower() not in JOB_CALLBACK_HOSTS:
+        return f"callback_url host {parsed.hostname} is not allowed"
+    return None
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # An allowed host must not be able to bounce the POST elsewhere
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_callback_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def post_callback(url, body, timeout=JOB_CALLBACK_TIMEOUT):
+    """POST a JSON body; raises on connection errors, redirects and non-2xx answers"""
+    request = urllib.request.Request(
+        url, data=body, method="POST", headers={"Content-Type": "application/json"}
+    )
+    with _callback_opener.open(request, timeout=timeout) as response:
+        return response.status
+
+
+class JobManager:
+    def __init__(self, db_path=JOBS_DB, concurrency=JOB_CONCURRENCY, max_queued=JOB_MAX_QUEUED):
+        self.db_path = db_path
+        self.concurrency = concurrency
+        self.max_queued = max_queued
+        self._store = None
+        self._queue = None
+        self._tasks = []
+        # Jobs this process is running, refreshed by the maintenance task
+        self._running = set()
+        self._counters = {
+            "submitted": 0, "done": 0, "failed": 0, "callbacks_failed": 0, "requeued": 0, "skipped": 0
+        }
+
+    @property
+    def store(self):
+        # Opened on first use so importing the API doesn't create the file
+        if self._store is None:
+            self._store = JobStore(self.db_path)
+        return self._store
+
+    def start(self, run):
+        """
+        Start the runner and maintenance tasks on the current event loop
+        and re-queue queued jobs.
+
+        Args:
+            run: Coroutine function run(contents, **options) -> response dict;
+                 may raise QueueFullError / ArenaFullError, which are retried
+        """
+        self._queue = asyncio.Queue()
+        for job_id in self.store.queued():
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._runner(run)) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._maintenance()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, contents, options, callback_url=None):
+        """
+        Persist and queue a job.
+
+        Args:
+            callback_url: Already checked with callback_error
+
+        Raises:
+            JobQueueFullError if JOB_MAX_QUEUED jobs are waiting
+        """
+        if self._queue is None:
+            raise RuntimeError("Job runner is not started")
+        if self._queue.qsize() >= self.max_queued:
+            raise JobQueueFullError("Job queue is full")
+
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(
+            self.store.insert, job_id, options, contents, callback_url or JOB_CALLBACK_URL
+        )
+        self._queue.put_nowait(job_id)
+        self._counters["submitted"] += 1
+        return job_id
+
+    async def get(self, job_id):
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    def _maintain(self):
+        """One maintenance pass (in a thread); returns the stale jobs taken back"""
+        now = time.time()
+        if self._running:
+            self.store.touch(list(self._running))
+        self.store.prune(now - JOB_RESULT_TTL)
+        return self.store.requeue_stale(now - JOB_STALE_AFTER)
+
+    async def _maintenance(self):
+        while True:
+            try:
+                for job_id in await asyncio.to_thread(self._maintain):
+                    self._queue.put_nowait(job_id)
+                    self._counters["requeued"] += 1
+            except Exception as e:
+                print(f"Job maintenance error: {e}")
+            await asyncio.sleep(JOB_MAINTENANCE_INTERVAL)
+
+    async def _runner(self, run):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id, run)
+            except Exception as e:
+                traceback.print_exc()
+                print(f"Job error: {e}")
+
+    async def _run_job(self, job_id, run):
+        if not await asyncio.to_thread(self.store.claim, job_id):
+            # Finished or taken by another process sharing JOBS_DB
+            self._counters["skipped"] += 1
+            return
+        self._running.add(job_id)
+        try:
+            await self._run_claimed(job_id, run)
+        finally:
+            self._running.discard(job_id)
+
+    async def _run_claimed(self, job_id, run):
+        job = await asyncio.to_thread(self.store.load, job_id)
+        if job is None:
+            # Claimed but without its upload: never leave it RUNNING
+            await asyncio.to_thread(self.store.finish, job_id, "FAILED", error="Job data is missing")
+            self._counters["failed"] += 1
+            return
+        options, contents, callback_url = job
+
+        while True:
+            try:
+                result = await run(contents, **options)
+                break
+            except (QueueFullError, ArenaFullError):
+                # Synchronous requests have the executor; try again shortly
+                await asyncio.sleep(ANALYSIS_RETRY_AFTER)
+            except Exception as e:
+                traceback.print_exc()
+                await asyncio.to_thread(self.store.finish, job_id, "FAILED", error=str(e))
+                self._counters["failed"] += 1
+                await self._deliver(job_id, callback_url)
+                return
+
+        await asyncio.to_thread(self.store.finish, job_id, "DONE", result=dumps(result))
+        self._counters["done"] += 1
+        await self._deliver(job_id, callback_url)
+
+    async def _deliver(self, job_id, callback_url):
+        """POST the finished job to its callback URL, retrying with backoff."""
+        if not callback_url:
+            return
+
+        body = dumps(await asyncio.to_thread(self.store.get, job_id))
+        error = None
+        for attempt in range(JOB_CALLBACK_RETRIES):
+            try:
+                await asyncio.to_thread(post_callback, callback_url, body)
+                await asyncio.to_thread(self.store.set_callback_status, job_id, "DELIVERED")
+                return
+            except Exception as e:
+                error = e
+                if attempt + 1 < JOB_CALLBACK_RETRIES:
+                    await asyncio.sleep(2 ** attempt)
+
+        print(f"Job callback error: {error}")
+        await asyncio.to_thread(self.store.set_callback_status, job_id, f"FAILED: {error}")
+        self._counters["callbacks_failed"] += 1
+
+    def stats(self):
+        stats = dict(self._counters)
+        stats["queued"] = self._queue.qsize() if self._queue is not None else 0
+        return stats
+
+
+# Process-wide manager used by the API
+job_manager = JobManager()
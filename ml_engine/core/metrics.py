@@ -0,0 +1,286 @@
+"""
+Metrics
+
+Minimal Prometheus instrumentation (text exposition format 0.0.4)
+without the prometheus_client dependency: counters, gauges and
+histograms with labels, rendered by the /metrics endpoint.
+
+Stage timings are recorded where the work happens (decode, each
+detector, conflict resolution, serialization), so a p99 spike of the
+whole request can be attributed to the stage whose histogram moved.
+
+Metrics live in the process that records them. With the process-pool
+executor the stage histograms and outcome counters are recorded in the
+worker processes: each worker sends what it recorded since its last
+result along with the result (Registry.take_delta) and the API process
+adds it to its own metrics (Registry.merge), so /metrics covers every
+worker.
+"""
+
+import threading
+import time
+from contextlib import ContextDecorator
+
+# Seconds; detectors take a few ms, full analyses up to seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def drain(self):
+        """Values recorded so far, reset to none"""
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def merge(self, values):
+        """Add values drained from the same counter in another process"""
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    render = Counter.render
+
+
+class _Timer(ContextDecorator):
+    """Observes the elapsed wall time of a with-block or decorated call."""
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        # Per-thread start times: a decorator's timer is shared by all calls
+        self._starts = threading.local()
+
+    def __enter__(self):
+        self._starts.__dict__.setdefault("stack", []).append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc):
+        started = self._starts.stack.pop()
+        self.histogram.observe(time.perf_counter() - started, **self.labels)
+        return False
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+
+    def time(self, **labels):
+        """Context manager / decorator recording the duration in seconds."""
+        return _Timer(self, labels)
+
+    def merge(self, values):
+        """Add series drained from the same histogram in another process"""
+        with self._lock:
+            for key, other in values.items():
+                series = self._values.get(key)
+                if series is None:
+                    series = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0}
+                series["counts"] = [a + b for a, b in zip(series["counts"], other["counts"])]
+                series["sum"] += other["sum"]
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = sorted((k, {"counts": list(v["counts"]), "sum": v["sum"]}) for k, v in self._values.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def take_delta(self):
+        """
+        Counter and histogram values recorded since the last call, reset
+        here: what a worker process sends back (gauges are per process).
+        """
+        delta = {}
+        for metric in self._metrics:
+            if metric.kind != "gauge":
+                values = metric.drain()
+                if values:
+                    delta[metric.name] = values
+        return delta
+
+    def merge(self, delta):
+        """Add a take_delta() result from another process."""
+        by_name = {metric.name: metric for metric in self._metrics}
+        for name, values in delta.items():
+            by_name[name].merge(values)
+
+
+registry = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ---------------- PIPELINE METRICS ----------------
+
+DECODE_SECONDS = registry.register(Histogram(
+    "nazar_decode_seconds", "Image decode (incl. reduced JPEG decode and downscale)"
+))
+
+# water, waste, yolo, person_mediapipe, light, fan, infrastructure.
+# "yolo" is the single shared YOLO pass that person and trash checks read;
+# "water" is the water mask, computed once per frame for every water check.
+DETECTOR_SECONDS = registry.register(Histogram(
+    "nazar_detector_seconds", "Time spent in each detector stage", ["detector"]
+))
+
+CONFLICT_RESOLUTION_SECONDS = registry.register(Histogram(
+    "nazar_conflict_resolution_seconds", "resolve_conflicts over the raw detections"
+))
+
+# step="render": response body encoding
+SERIALIZATION_SECONDS = registry.register(Histogram(
+    "nazar_serialization_seconds", "Response serialization", ["step"]
+))
+
+ANALYSIS_SECONDS = registry.register(Histogram(
+    "nazar_analysis_seconds", "Whole frame analysis after decode", ["path"]
+))
+
+DETECTIONS_TOTAL = registry.register(Counter(
+    "nazar_detections_total", "Verified analysis outcomes by detection type", ["detection"]
+))
+
+ERRORS_TOTAL = registry.register(Counter(
+    "nazar_analysis_errors_total", "Failed analyses by kind", ["kind"]
+))
+
+
+# ---------------- EXECUTOR METRICS ----------------
+
+IN_FLIGHT = registry.register(Gauge(
+    "nazar_analysis_in_flight", "Analyses running on an executor worker (queued ones: queue_depth)"
+))
+
+QUEUE_DEPTH = registry.register(Gauge(
+    "nazar_analysis_queue_depth", "Admitted analyses waiting for a free worker"
+))
+
+REJECTED_TOTAL = registry.register(Counter(
+    "nazar_analysis_rejected_total", "Analyses rejected with 503 (queue full)"
+))
+
+
+def record_outcome(response):
+    """Count the verified detection type of an analysis response."""
+    if not isinstance(response, dict):
+        return
+    if "verified_detections" in response:
+        response = response["verified_detections"] or {}
+    if "detection" in response:
+        DETECTIONS_TOTAL.inc(detection=response["detection"])
+
+
+def render_metrics(executor_stats=None):
+    """Prometheus text exposition of every registered metric."""
+    if executor_stats is not None:
+        IN_FLIGHT.set(executor_stats["in_flight"])
+        QUEUE_DEPTH.set(executor_stats["queue_depth"])
+    return registry.render()
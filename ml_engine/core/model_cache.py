@@ -0,0 +1,132 @@
+"""
+Model Cache
+
+Resolves model files (weights, ONNX exports) inside MODEL_CACHE_DIR and
+verifies them against known SHA-256 checksums before they are loaded.
+
+Missing weights are downloaded into the cache unless MODEL_OFFLINE is set,
+in which case resolution fails immediately instead of hanging on a
+network request (air-gapped nodes).
+
+Checksums come from MODEL_SHA256 or from a "<file>.sha256" file next to
+the model (first token, as written by `sha256sum`). A file with neither
+gets its sidecar written the first time it is resolved (trust on first
+use), so every later load is verified against that digest.
+"""
+
+import hashlib
+import os
+
+from core.config import MODEL_CACHE_DIR, MODEL_OFFLINE, MODEL_SHA256
+
+
+class ModelUnavailableError(Exception):
+    """Raised when a model file is missing (offline) or fails verification."""
+
+
+def cache_path(name):
+    """Location of a model file inside the cache (absolute paths are kept)."""
+    if os.path.isabs(name):
+        return name
+    return os.path.join(MODEL_CACHE_DIR, name)
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def expected_sha256(path):
+    expected = MODEL_SHA256.get(os.path.basename(path))
+    if expected:
+        return expected.lower()
+
+    sidecar = path + ".sha256"
+    if os.path.exists(sidecar):
+        with open(sidecar) as f:
+            content = f.read().split()
+        if content:
+            return content[0].lower()
+    return None
+
+
+def write_checksum(path):
+    """Write the "<file>.sha256" sidecar for a model built locally."""
+    with open(path + ".sha256", "w") as f:
+        f.write(f"{file_sha256(path)}  {os.path.basename(path)}\n")
+
+
+def verify_checksum(path):
+    """
+    Raises:
+        ModelUnavailableError if a checksum is known and does not match
+    """
+    expected = expected_sha256(path)
+    if expected is None:
+        return
+    actual = file_sha256(path)
+    if actual != expected:
+        raise ModelUnavailableError(
+            f"Checksum mismatch for {path}: expected {expected}, got {actual}"
+        )
+
+
+def verify_or_pin(path):
+    """verify_checksum, or write the sidecar when no checksum is known yet"""
+    if expected_sha256(path) is not None:
+        verify_checksum(path)
+        return
+    try:
+        write_checksum(path)
+    except OSError as e:
+        print(f"Could not write checksum for {path}: {e}")
+
+
+def resolve_weights(name):
+    """
+    Return the verified local path of YOLO weights, downloading them into
+    the cache first when allowed.
+
+    A file already present at `name` itself (e.g. in the working directory)
+    is used as is, for setups that predate the cache directory.
+
+    Raises:
+        ModelUnavailableError
+    """
+    path = cache_path(name)
+    if not os.path.exists(path) and os.path.exists(name):
+        path = name
+
+    if not os.path.exists(path):
+        if MODEL_OFFLINE:
+            raise ModelUnavailableError(
+                f"{name} not found in {MODEL_CACHE_DIR} and downloads are disabled (offline mode)"
+            )
+        from ultralytics.utils.downloads import attempt_download_asset
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        path = attempt_download_asset(path)
+        if not os.path.exists(path):
+            raise ModelUnavailableError(f"Could not download {name}")
+
+    verify_or_pin(path)
+    return path
+
+
+def resolve_artifact(name):
+    """
+    Path for a file derived locally from the weights (ONNX export, INT8
+    model). Existing files are verified; missing ones are to be built there.
+    """
+    path = cache_path(name)
+    if not os.path.exists(path) and os.path.exists(name):
+        path = name
+
+    if os.path.exists(path):
+        verify_or_pin(path)
+    else:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return path
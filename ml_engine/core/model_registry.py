@@ -0,0 +1,256 @@
+"""
+Model Registry
+
+Holds one instance of each heavy model per process so that every
+detector shares the same weights instead of loading their own copy.
+Nothing is loaded at import time: models load on first use, or ahead of
+the first request through warmup() (run in the background at API startup).
+With the process executor each worker process warms its own models
+(warmup_worker as the pool initializer) and acknowledges to the API
+process, whose readiness is then WorkerReadiness.state().
+
+The YOLO runtime is selected by YOLO_BACKEND: "ultralytics" (PyTorch) or
+"onnx" (ONNX Runtime CPU). The ONNX model is exported from YOLO_WEIGHTS
+on first use if it doesn't exist yet, and INT8-quantized from
+YOLO_CALIBRATION_DIR when YOLO_INT8 is set. All model files live in the
+model cache (see core.model_cache).
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+
+import numpy as np
+
+from core.config import (
+    YOLO_WEIGHTS,
+    YOLO_BACKEND,
+    YOLO_IMGSZ,
+    YOLO_ONNX_PATH,
+    YOLO_INT8,
+    YOLO_ONNX_INT8_PATH,
+    YOLO_CALIBRATION_DIR,
+    ONNX_INTRA_OP_THREADS,
+    YOLO_CONF,
+    MODEL_CACHE_DIR,
+    MODEL_OFFLINE,
+)
+from core.inference_backends import (
+    UltralyticsBackend,
+    OnnxYoloBackend,
+    export_onnx,
+    quantize_onnx_int8,
+)
+from core.model_cache import resolve_weights, resolve_artifact, write_checksum
+
+_models = {}
+_lock = threading.Lock()
+
+# "not_loaded" -> "loading" -> "ready" | "error", per model
+_status = {"yolo": "not_loaded", "pose": "not_loaded"}
+_errors = {}
+_load_seconds = {}
+_warmup = {"state": "pending", "seconds": None, "thread": None}
+
+# One MediaPipe graph shared by all analysis threads; process() is not re-entrant
+pose_lock = threading.Lock()
+
+
+def _load_yolo():
+    if YOLO_BACKEND == "ultralytics":
+        return UltralyticsBackend(resolve_weights(YOLO_WEIGHTS))
+
+    if YOLO_BACKEND != "onnx":
+        raise ValueError(f"Unknown YOLO backend: {YOLO_BACKEND}")
+
+    onnx_path = resolve_artifact(YOLO_ONNX_PATH)
+    if not os.path.exists(onnx_path):
+        export_onnx(resolve_weights(YOLO_WEIGHTS), onnx_path, YOLO_IMGSZ)
+        write_checksum(onnx_path)
+
+    path = onnx_path
+    if YOLO_INT8:
+        path = resolve_artifact(YOLO_ONNX_INT8_PATH)
+        if not os.path.exists(path):
+            quantize_onnx_int8(onnx_path, path, YOLO_CALIBRATION_DIR, YOLO_IMGSZ)
+            write_checksum(path)
+
+    return OnnxYoloBackend(path, intra_op_threads=ONNX_INTRA_OP_THREADS, imgsz=YOLO_IMGSZ)
+
+
+def _load_pose():
+    # mediapipe pulls in TensorFlow Lite and protobuf; only import it when needed
+    import mediapipe as mp
+
+    return mp.solutions.pose.Pose(
+        static_image_mode=True,
+        model_complexity=1,
+        smooth_landmarks=False
+    )
+
+
+_loaders = {"yolo": _load_yolo, "pose": _load_pose}
+
+
+def _get(name):
+    model = _models.get(name)
+    if model is None:
+        with _lock:
+            model = _models.get(name)
+            if model is None:
+                _status[name] = "loading"
+                started = time.time()
+                try:
+                    model = _loaders[name]()
+                except Exception as e:
+                    _status[name] = "error"
+                    _errors[name] = str(e)
+                    raise
+                _models[name] = model
+                _status[name] = "ready"
+                _errors.pop(name, None)
+                _load_seconds[name] = round(time.time() - started, 3)
+    return model
+
+
+def get_yolo_backend():
+    """Return the shared YOLO backend, loading it on first use."""
+    return _get("yolo")
+
+
+def get_pose_model():
+    """Return the shared MediaPipe Pose graph, loading it on first use."""
+    return _get("pose")
+
+
+def warmup():
+    """
+    Load every model and run one inference on a dummy frame, so the
+    first real request doesn't pay for lazy initialization.
+
+    Returns:
+        True if all models are loaded and warm
+    """
+    _warmup["state"] = "running"
+    started = time.time()
+    ok = True
+
+    frame = np.zeros((YOLO_IMGSZ, YOLO_IMGSZ, 3), dtype=np.uint8)
+    try:
+        get_yolo_backend().predict([frame], YOLO_CONF)
+    except Exception:
+        traceback.print_exc()
+        ok = False
+
+    try:
+        pose = get_pose_model()
+        with pose_lock:
+            pose.process(frame)
+    except Exception:
+        traceback.print_exc()
+        ok = False
+
+    _warmup["state"] = "done" if ok else "failed"
+    _warmup["seconds"] = round(time.time() - started, 3)
+    return ok
+
+
+def start_background_warmup():
+    """Run warmup() on a daemon thread (once per process, again after a failure)."""
+    with _lock:
+        if _warmup["thread"] is not None and _warmup["state"] != "failed":
+            return
+        _warmup["state"] = "running"
+        thread = threading.Thread(target=warmup, name="model-warmup", daemon=True)
+        _warmup["thread"] = thread
+    thread.start()
+
+
+def readiness():
+    """Load/warm state of every model, for the readiness endpoint."""
+    return {
+        "ready": _warmup["state"] == "done",
+        "warmup": _warmup["state"],
+        "warmup_seconds": _warmup["seconds"],
+        "models": dict(_status),
+        "load_seconds": dict(_load_seconds),
+        "errors": dict(_errors),
+        "yolo_backend": YOLO_BACKEND,
+        "cache_dir": MODEL_CACHE_DIR,
+        "offline": MODEL_OFFLINE
+    }
+
+
+# ---------------- PROCESS WORKERS ----------------
+
+def warmup_worker(acks):
+    """
+    Process-pool initializer (and retry task): warm this worker's models
+    unless already warm, then put (pid, readiness()) on the acks queue.
+    """
+    if _warmup["state"] != "done":
+        warmup()
+    acks.put((os.getpid(), readiness()))
+
+
+class WorkerReadiness:
+    """Readiness of the process-pool workers, from their warmup_worker acknowledgements."""
+
+    def __init__(self, workers, warming=True):
+        self.workers = workers
+        self.acks = multiprocessing.Queue()
+        # Whether a warmup was requested (the pool initializer counts)
+        self._requested = warming
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _drain(self):
+        """Caller holds the lock."""
+        while True:
+            try:
+                pid, state = self.acks.get_nowait()
+            except queue.Empty:
+                return
+            self._states[pid] = state
+
+    def claim_retry(self):
+        """
+        True when the workers should be asked to warm up (again): no warmup
+        was requested yet, or a worker reported a failed one. Each failure
+        is claimed once, until that worker acknowledges again.
+        """
+        with self._lock:
+            self._drain()
+            failed = [pid for pid, state in self._states.items() if state["warmup"] == "failed"]
+            if self._requested and not failed:
+                return False
+            self._requested = True
+            for pid in failed:
+                self._states[pid] = dict(self._states[pid], warmup="running")
+            return True
+
+    def state(self):
+        """readiness() of every acknowledged worker; ready once all of them are"""
+        with self._lock:
+            self._drain()
+            states = dict(self._states)
+        ready = sum(1 for state in states.values() if state["ready"])
+        if ready >= self.workers:
+            warmup_state = "done"
+        elif any(state["warmup"] == "failed" for state in states.values()):
+            warmup_state = "failed"
+        else:
+            warmup_state = "running" if self._requested else "pending"
+        return {
+            "ready": ready >= self.workers,
+            "warmup": warmup_state,
+            "workers": self.workers,
+            "workers_ready": ready,
+            "worker_states": {str(pid): state for pid, state in states.items()},
+            "yolo_backend": YOLO_BACKEND,
+            "cache_dir": MODEL_CACHE_DIR,
+            "offline": MODEL_OFFLINE
+        }
@@ -0,0 +1,103 @@
+"""
+Near-Duplicate Index
+
+Recognizes frames that are the same scene as a recently analyzed frame
+but not byte-identical (re-encoded, recompressed, JPEG noise), which the
+response cache cannot match.
+
+Each frame gets a difference hash (dHash) of the grayscale frame shrunk
+to (HASH_SIZE + 1) x HASH_SIZE: two bits per horizontal gradient, "rises"
+and "falls" by more than NEAR_DUPLICATE_GRADIENT_MARGIN. The dead zone
+keeps flat walls and floors, whose plain gradient sign is decided by
+noise, from flipping bits when a frame is recompressed; a changed scene
+still flips many.
+
+The index keeps the hashes and responses of the last
+NEAR_DUPLICATE_MAX_ENTRIES analyzed frames per camera, for at most
+NEAR_DUPLICATE_MAX_AGE seconds. Requests without camera_id share the
+default camera's index.
+
+Like the response cache, it is not consulted while the camera's leak
+confirmation timer is pending; the pipeline enforces that.
+"""
+
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from core.config import (
+    NEAR_DUPLICATE_HASH_SIZE,
+    NEAR_DUPLICATE_GRADIENT_MARGIN,
+    NEAR_DUPLICATE_MAX_DISTANCE,
+    NEAR_DUPLICATE_MAX_AGE,
+    NEAR_DUPLICATE_MAX_ENTRIES,
+)
+
+_lock = threading.Lock()
+_counters = {"reused": 0, "analyzed": 0}
+
+
+def dhash(ctx, hash_size=NEAR_DUPLICATE_HASH_SIZE, margin=NEAR_DUPLICATE_GRADIENT_MARGIN):
+    """Difference hash of the frame as a Python int (memoized on the context)"""
+    def compute():
+        small = cv2.resize(ctx.gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+        gradient = small[:, 1:].astype(np.int16) - small[:, :-1]
+        bits = np.concatenate([(gradient > margin).ravel(), (gradient < -margin).ravel()])
+        return int.from_bytes(np.packbits(bits).tobytes(), "big")
+    return ctx.memo(("dhash", hash_size, margin), compute)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def _index(state):
+    return state.section(
+        "near_duplicate", entries=deque(maxlen=NEAR_DUPLICATE_MAX_ENTRIES)
+    )["entries"]
+
+
+def lookup(state, frame_hash, options_key):
+    """
+    Return a copy of the closest recent response within the distance
+    threshold, flagged "reused", or None if the frame must be analyzed.
+    """
+    entries = _index(state)
+    now = time.time()
+
+    # Drop entries past their age (oldest are on the left)
+    while entries and now - entries[0]["analyzed_at"] >= NEAR_DUPLICATE_MAX_AGE:
+        entries.popleft()
+
+    best, best_distance = None, NEAR_DUPLICATE_MAX_DISTANCE + 1
+    for entry in entries:
+        if entry["options_key"] != options_key:
+            continue
+        distance = hamming(entry["hash"], frame_hash)
+        if distance < best_distance:
+            best, best_distance = entry, distance
+
+    with _lock:
+        _counters["reused" if best is not None else "analyzed"] += 1
+
+    if best is None:
+        return None
+    return dict(best["response"], reused=True)
+
+
+def remember(state, frame_hash, options_key, response):
+    """Index a frame that was just fully analyzed."""
+    _index(state).append({
+        "hash": frame_hash,
+        "options_key": options_key,
+        "response": response,
+        "analyzed_at": time.time()
+    })
+
+
+def stats():
+    with _lock:
+        return dict(_counters)
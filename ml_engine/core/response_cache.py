@@ -0,0 +1,187 @@
+"""
+Response Cache
+
+Exact-match cache for repeated uploads (client retries, gateways that
+re-send an unchanged snapshot). Keyed by a BLAKE2 hash of the uploaded
+bytes plus the request options and camera id, so a hit skips decoding
+and every detector, YOLO included.
+
+Entries are kept as encoded JSON bytes in an in-process LRU bounded by
+entry count and bytes, and expire after RESPONSE_CACHE_TTL seconds.
+With RESPONSE_CACHE_DB set they are also written to a local SQLite file,
+which lets the workers of a process pool (or several API processes on
+one host) share results.
+
+Temporal pipelines: the water-leak confirmation timer must see every
+frame while it is running, so the analysis pipeline bypasses the cache
+for a camera with a pending leak timer and never stores responses
+produced while one is pending (see leak_pipeline.leak_pending). With
+NAZAR_EXECUTOR=process, /ML_analyze consults the cache in the API
+process before decoding, using the leak-timer state the workers report
+with each response. The fan
+motion history simply does not advance on a hit; an identical frame
+would add no motion to it anyway.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from core.config import (
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_DB,
+)
+from core.serialization import dumps, loads
+
+
+def cache_key(contents, options_key, camera_id=None):
+    """Hash of the uploaded bytes, request options and camera"""
+    digest = hashlib.blake2b(contents, digest_size=16)
+    digest.update(repr((options_key, camera_id)).encode())
+    return digest.hexdigest()
+
+
+class _DiskStore:
+    """SQLite table of serialized responses, safe across processes."""
+
+    # Expired rows are pruned every this many writes
+    PRUNE_EVERY = 256
+
+    def __init__(self, path, ttl, max_entries):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, created REAL NOT NULL, body BLOB NOT NULL)"
+        )
+
+    def _connection(self):
+        # sqlite3 connections may not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, now):
+        row = self._connection().execute(
+            "SELECT created, body FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or now - row[0] >= self.ttl:
+            return None, None
+        return row[0], row[1]
+
+    def put(self, key, body, now):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, created, body) VALUES (?, ?, ?)",
+            (key, now, body)
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+
+class ResponseCache:
+    def __init__(self, max_entries=1024, max_bytes=32 * 1024 * 1024, ttl=300, db_path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (created, body)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk = _DiskStore(db_path, ttl, max_entries) if db_path else None
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "evictions": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _insert(self, key, created, body):
+        """Add to the memory LRU; caller holds the lock."""
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous[1])
+        self._entries[key] = (created, body)
+        self._bytes += len(body)
+
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self._counters["evictions"] += 1
+
+    def get(self, key):
+        """Return a fresh copy of the cached response, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return loads(entry[1])
+            if entry is not None:
+                self._entries.pop(key)
+                self._bytes -= len(entry[1])
+
+        if self._disk is not None:
+            try:
+                created, body = self._disk.get(key, now)
+            except sqlite3.Error as e:
+                print(f"Response cache error: {e}")
+                created, body = None, None
+            if body is not None:
+                with self._lock:
+                    self._insert(key, created, body)
+                    self._counters["disk_hits"] += 1
+                return loads(body)
+
+        self._count("misses")
+        return None
+
+    def put(self, key, response):
+        body = dumps(response)
+        now = time.time()
+        with self._lock:
+            self._insert(key, now, body)
+
+        if self._disk is not None:
+            try:
+                self._disk.put(key, body, now)
+            except sqlite3.Error as e:
+                print(f"Response cache error: {e}")
+
+    def bypass(self):
+        """Record a request that skipped the cache (temporal state pending)."""
+        self._count("bypassed")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        stats["disk"] = self._disk is not None
+        return stats
+
+
+# Process-wide cache used by the analysis pipeline
+response_cache = ResponseCache(
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    max_bytes=RESPONSE_CACHE_MAX_BYTES,
+    ttl=RESPONSE_CACHE_TTL,
+    db_path=RESPONSE_CACHE_DB
+)
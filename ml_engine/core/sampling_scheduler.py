@@ -0,0 +1,251 @@
+"""
+Sampling Scheduler
+
+Decides when each registered stream is analyzed, within one global
+inference budget (STREAM_BUDGET_FPS) shared by every camera.
+
+Each camera asks for a rate between STREAM_IDLE_FPS and its stream fps.
+After every sample the stream reports whether the camera is active
+(recent detection, motion, pending leak timer): an active camera goes
+back to its full rate, an idle one multiplies its rate by
+STREAM_IDLE_BACKOFF down to STREAM_IDLE_FPS.
+
+The budget is split max-min fair: cameras asking for less than an equal
+share get all of it, the rest split what is left equally, so every
+camera gets at least min(its demand, budget / cameras). A single
+dispatcher thread starts at most one analysis every 1 / budget seconds
+(the budget is never exceeded) and picks the camera whose next sample
+is most overdue. A camera has at most one analysis in flight, and at
+most `workers` are in flight overall.
+
+The scheduler only decides when: a camera's sample callback submits
+the analysis itself (to the API's shared AnalysisExecutor, so streams
+share its queue bound and process mode with uploads) and returns a
+future. A sample that analyzed nothing (no new frame, executor full)
+leaves the camera's demand as it was.
+"""
+
+import threading
+import time
+from collections import deque
+
+from core.config import (
+    STREAM_BUDGET_FPS,
+    STREAM_IDLE_FPS,
+    STREAM_IDLE_BACKOFF,
+    STREAM_ANALYSIS_WORKERS,
+)
+
+# Window (seconds) over which effective rates are measured
+RATE_WINDOW = 10.0
+
+
+def fair_share(demands, budget):
+    """Max-min fair allocation of budget to {key: demanded rate}"""
+    allocation = {}
+    remaining = budget
+    pending = sorted(demands.items(), key=lambda item: item[1])
+    for i, (key, demand) in enumerate(pending):
+        share = remaining / (len(pending) - i)
+        allocation[key] = min(demand, share)
+        remaining -= allocation[key]
+    return allocation
+
+
+class _Camera:
+    def __init__(self, camera_id, max_fps, sample):
+        self.camera_id = camera_id
+        self.max_fps = max_fps
+        # sample() -> None (nothing analyzed) or a concurrent future
+        # resolving to None or whether the camera is active
+        self.sample = sample
+        self.demand = max_fps
+        self.allocated = max_fps
+        self.active = True
+        self.next_due = 0.0
+        self.busy = False
+        self.samples = deque()
+
+
+class SamplingScheduler:
+    def __init__(
+        self,
+        budget_fps=STREAM_BUDGET_FPS,
+        idle_fps=STREAM_IDLE_FPS,
+        backoff=STREAM_IDLE_BACKOFF,
+        workers=STREAM_ANALYSIS_WORKERS
+    ):
+        if budget_fps <= 0:
+            raise ValueError("budget_fps must be positive")
+        self.budget_fps = budget_fps
+        self.idle_fps = idle_fps
+        self.backoff = backoff
+        self.workers = workers
+
+        self._cameras = {}
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._last_dispatch = 0.0
+        self._dispatched = 0
+        self._thread = None
+        self._stop = False
+
+    # ---------------- REGISTRATION ----------------
+
+    def add(self, camera_id, max_fps, sample):
+        """Schedule a camera; it starts at its full rate."""
+        with self._cond:
+            self._cameras[camera_id] = _Camera(camera_id, max_fps, sample)
+            self._rebalance()
+            self._ensure_started()
+            self._cond.notify_all()
+
+    def remove(self, camera_id, sample=None):
+        """Stop scheduling a camera; with sample given, only if it is still that callback."""
+        with self._cond:
+            camera = self._cameras.get(camera_id)
+            if camera is None or (sample is not None and camera.sample != sample):
+                return
+            del self._cameras[camera_id]
+            self._rebalance()
+            self._cond.notify_all()
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+
+    # ---------------- RATES ----------------
+
+    def _rebalance(self):
+        """Recompute allocations from demands; caller holds the lock."""
+        allocation = fair_share(
+            {cid: cam.demand for cid, cam in self._cameras.items()}, self.budget_fps
+        )
+        for cid, rate in allocation.items():
+            camera = self._cameras[cid]
+            # A higher rate takes effect now, not after the old interval
+            if rate > camera.allocated:
+                camera.next_due = min(camera.next_due, time.monotonic() + 1.0 / rate)
+            camera.allocated = rate
+
+    def _report(self, camera, active):
+        with self._cond:
+            # Nothing analyzed: no evidence either way, demand stays
+            if active is not None:
+                camera.samples.append(time.monotonic())
+                camera.active = bool(active)
+                if active:
+                    camera.demand = camera.max_fps
+                else:
+                    camera.demand = max(camera.demand * self.backoff, min(self.idle_fps, camera.max_fps))
+            camera.busy = False
+            self._in_flight -= 1
+            self._rebalance()
+            self._cond.notify_all()
+
+    def _rates(self, camera, now):
+        """Caller holds the lock."""
+        while camera.samples and now - camera.samples[0] > RATE_WINDOW:
+            camera.samples.popleft()
+        return {
+            "active": camera.active,
+            "max_fps": camera.max_fps,
+            "target_fps": round(camera.demand, 3),
+            "allocated_fps": round(camera.allocated, 3),
+            # Frames actually analyzed per second over the last RATE_WINDOW
+            "effective_fps": round(len(camera.samples) / RATE_WINDOW, 3)
+        }
+
+    def rate(self, camera_id):
+        """Demanded, allocated and measured (effective) rate of a camera, or None"""
+        with self._cond:
+            camera = self._cameras.get(camera_id)
+            return self._rates(camera, time.monotonic()) if camera is not None else None
+
+    def rates(self):
+        now = time.monotonic()
+        with self._cond:
+            return {cid: self._rates(camera, now) for cid, camera in self._cameras.items()}
+
+    def stats(self):
+        with self._cond:
+            return {
+                "budget_fps": self.budget_fps,
+                "cameras": len(self._cameras),
+                "active": sum(1 for c in self._cameras.values() if c.active),
+                "allocated_fps": round(sum(c.allocated for c in self._cameras.values()), 3),
+                "in_flight": self._in_flight,
+                "dispatched": self._dispatched
+            }
+
+    # ---------------- DISPATCH ----------------
+
+    def _next_camera(self, now):
+        """Most overdue idle-slot camera, or (None, seconds to wait)"""
+        due = None
+        wait = 1.0
+        for camera in self._cameras.values():
+            if camera.busy:
+                continue
+            if camera.next_due <= now:
+                if due is None or camera.next_due < due.next_due:
+                    due = camera
+            else:
+                wait = min(wait, camera.next_due - now)
+        return due, wait
+
+    def _run(self):
+        interval = 1.0 / self.budget_fps
+        while True:
+            with self._cond:
+                if self._stop:
+                    return
+                now = time.monotonic()
+                # Global budget: at most one dispatch per interval
+                wait = self._last_dispatch + interval - now
+                if wait <= 0 and self._in_flight >= self.workers:
+                    wait = 1.0   # woken by the next completion
+                camera = None
+                if wait <= 0:
+                    camera, wait = self._next_camera(now)
+                if camera is None:
+                    self._cond.wait(wait)
+                    continue
+
+                camera.busy = True
+                camera.next_due = now + 1.0 / camera.allocated
+                self._in_flight += 1
+                self._dispatched += 1
+                self._last_dispatch = now
+            self._sample(camera)
+
+    def _sample(self, camera):
+        future = None
+        try:
+            future = camera.sample()
+        except Exception as e:
+            print(f"Stream sampling error ({camera.camera_id}): {e}")
+        if future is None:
+            self._report(camera, None)
+            return
+        future.add_done_callback(lambda f: self._report(camera, self._outcome(camera, f)))
+
+    def _outcome(self, camera, future):
+        """Whether the camera is active, or None if the analysis did not complete"""
+        if future.cancelled():
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"Stream sampling error ({camera.camera_id}): {e}")
+            return None
@@ -0,0 +1,53 @@
+"""
+Serialization
+
+One-pass JSON encoding of analysis responses. orjson encodes numpy
+scalars and arrays natively (OPT_SERIALIZE_NUMPY), so responses and
+debug payloads (scores, contour data, masks) no longer need a recursive
+convert_numpy_types walk before encoding.
+
+Falls back to the standard json module (with convert_numpy_types) when
+orjson is not installed.
+"""
+
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _default(obj):
+    """Types orjson can't encode itself (non-contiguous arrays, numpy scalars it skips)"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj) -> bytes:
+    """Encode obj (possibly holding numpy values) as UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(
+            obj,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+
+    from core.analysis import convert_numpy_types
+
+    return json.dumps(
+        convert_numpy_types(obj), ensure_ascii=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,372 @@
+"""
+Stream Ingestion
+
+Continuous analysis of RTSP / MJPEG / HTTP / local video-file sources.
+
+Sources are limited to stream URLs on STREAM_SOURCE_HOSTS and video
+files under STREAM_SOURCE_DIRS (stream_source_error, checked when the
+API registers a stream).
+
+Each registered source gets a decoder thread that reads with
+cv2.VideoCapture and keeps only the newest frame (older, unconsumed
+frames are dropped, never queued). When the newest frame is analyzed is
+decided by the shared SamplingScheduler: a camera is sampled at its fps
+while it is active (a detection within STREAM_ACTIVE_HOLD, motion
+between samples, or a pending leak confirmation timer) and backs off
+towards STREAM_IDLE_FPS otherwise, all streams together staying within
+STREAM_BUDGET_FPS. Frames run through the regular analysis pipeline
+under the source's camera_id, so the temporal pipelines (leak
+confirmation, fan motion) see a real frame sequence. The analysis
+itself is the API's (StreamManager.start): it runs on the shared
+analysis executor, and a frame the executor has no room for is dropped.
+"""
+
+import asyncio
+import os
+import threading
+import time
+import traceback
+import urllib.parse
+
+import cv2
+
+from core.config import (
+    STREAM_SAMPLE_FPS,
+    STREAM_RECONNECT_DELAY,
+    STREAM_MAX_SOURCES,
+    STREAM_SOURCE_HOSTS,
+    STREAM_SOURCE_DIRS,
+    STREAM_SOURCE_SCHEMES,
+    STREAM_ACTIVE_HOLD,
+    STREAM_MOTION_THRESHOLD,
+    CHANGE_GATE_THUMB_SIZE,
+)
+from core.executor import QueueFullError
+from core.frame_arena import ArenaFullError
+from core.sampling_scheduler import SamplingScheduler
+
+
+def stream_source_error(source):
+    """
+    Why a stream source is refused, or None if it is allowed: a URL with
+    a scheme in STREAM_SOURCE_SCHEMES on a host in STREAM_SOURCE_HOSTS,
+    or a file under one of STREAM_SOURCE_DIRS.
+    """
+    if "://" in source:
+        parsed = urllib.parse.urlsplit(source)
+        if parsed.scheme.lower() not in STREAM_SOURCE_SCHEMES or not parsed.hostname:
+            return f"source must be an {'/'.join(STREAM_SOURCE_SCHEMES)} URL or a video file"
+        if parsed.hostname.lower() not in STREAM_SOURCE_HOSTS:
+            return f"source host {parsed.hostname} is not allowed"
+        return None
+
+    # Symlinks and ".." resolved before the directory check
+    path = os.path.realpath(source)
+    if not any(os.path.commonpath([path, directory]) == directory for directory in STREAM_SOURCE_DIRS):
+        return "source file is not in an allowed directory"
+    return None
+
+
+class LatestFrameReader:
+    """Decoder thread holding a single slot with the newest frame."""
+
+    def __init__(self, source, loop=False):
+        self.source = source
+        self.is_file = "://" not in source
+        self.loop = loop
+
+        self._lock = threading.Lock()
+        self._frame = None
+        self._frame_time = 0.0
+        self._seq = 0
+        self._consumed_seq = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+        self.finished = False
+        self.error = None
+        self.frames_read = 0
+        self.frames_dropped = 0
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def latest(self):
+        """
+        Return (frame, timestamp, seq) of the newest frame not yet handed
+        out, or (None, None, None) if no new frame arrived.
+        """
+        with self._lock:
+            if self._frame is None or self._seq == self._consumed_seq:
+                return None, None, None
+            self._consumed_seq = self._seq
+            return self._frame, self._frame_time, self._seq
+
+    def _publish(self, frame):
+        with self._lock:
+            if self._seq != self._consumed_seq:
+                self.frames_dropped += 1
+            self._frame = frame
+            self._frame_time = time.time()
+            self._seq += 1
+        self.frames_read += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            cap = cv2.VideoCapture(self.source)
+            if not cap.isOpened():
+                self.error = f"Could not open source: {self.source}"
+                if self.is_file:
+                    break
+                self._stop.wait(STREAM_RECONNECT_DELAY)
+                continue
+
+            self.error = None
+            # Files are paced at their native rate so they behave like a live camera
+            file_fps = cap.get(cv2.CAP_PROP_FPS) if self.is_file else 0
+            frame_interval = 1.0 / file_fps if file_fps and file_fps > 0 else 0.0
+
+            while not self._stop.is_set():
+                started = time.time()
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                self._publish(frame)
+                if frame_interval:
+                    self._stop.wait(max(frame_interval - (time.time() - started), 0))
+
+            cap.release()
+
+            if self.is_file and not self.loop:
+                break
+            if not self.is_file:
+                # Live source dropped: reconnect after a delay
+                self._stop.wait(STREAM_RECONNECT_DELAY)
+
+        self.finished = True
+
+
+def has_detection(result):
+    """True if an analysis response reports an issue"""
+    if not isinstance(result, dict):
+        return False
+    if "verified_detections" in result:
+        return any(v is not None for v in result["verified_detections"].values())
+    return result.get("detection") not in (None, "No Issue")
+
+
+class StreamSource:
+    """One registered camera: decoder thread plus scheduled analysis."""
+
+    def __init__(
+        self,
+        camera_id,
+        source,
+        fps=STREAM_SAMPLE_FPS,
+        loop=False,
+        options=None,
+        scheduler=None,
+        analyze=None,
+        event_loop=None
+    ):
+        self.camera_id = camera_id
+        self.source = source
+        self.fps = fps
+        self.options = options or {}
+        self.reader = LatestFrameReader(source, loop=loop)
+        self.scheduler = scheduler
+        self.analyze = analyze
+        self.event_loop = event_loop
+
+        self._stopped = False
+        self._thumbnail = None
+
+        self.started_at = None
+        self.frames_analyzed = 0
+        self.frames_rejected = 0
+        self.last_result = None
+        self.last_analyzed_at = None
+        self.last_detection_at = None
+        self.last_error = None
+        self.activity = None
+
+    def start(self):
+        self.started_at = time.time()
+        self.reader.start()
+        self.scheduler.add(self.camera_id, self.fps, self.sample)
+
+    def stop(self):
+        self._stopped = True
+        self.scheduler.remove(self.camera_id, self.sample)
+        self.reader.stop()
+
+    @property
+    def running(self):
+        return not self._stopped and not self.reader.finished
+
+    async def _analyze(self, frame, frame_time, motion):
+        """Analyze one frame; whether the camera is active, or None if the executor was full."""
+        try:
+            result, pending = await self.analyze(frame, self.camera_id, self.options)
+        except (QueueFullError, ArenaFullError):
+            # Saturated by other work: drop the frame, the next sample retries
+            self.frames_rejected += 1
+            return None
+        except Exception as e:
+            traceback.print_exc()
+            self.last_error = str(e)
+            pending = False
+        else:
+            self.last_result = result
+            self.last_error = result.get("error") if result.get("status") == "SERVER_ERROR" else None
+            if has_detection(result):
+                self.last_detection_at = frame_time
+
+        self.frames_analyzed += 1
+        self.last_analyzed_at = frame_time
+        self.activity = {
+            "detection": self.last_detection_at is not None
+                         and time.time() - self.last_detection_at < STREAM_ACTIVE_HOLD,
+            "motion": motion,
+            "leak_pending": bool(pending)
+        }
+        return any(self.activity.values())
+
+    def _motion(self, frame):
+        """Mean absolute thumbnail difference to the previous sample"""
+        small = cv2.resize(frame, CHANGE_GATE_THUMB_SIZE, interpolation=cv2.INTER_AREA)
+        thumbnail = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        previous, self._thumbnail = self._thumbnail, thumbnail
+        return cv2.absdiff(previous, thumbnail).mean() if previous is not None else 0.0
+
+    def sample(self):
+        """
+        Scheduler callback: submit the newest frame for analysis.
+
+        Returns:
+            None if there was no new frame, else a future resolving to
+            whether the camera is active (None if the frame was dropped)
+        """
+        frame, frame_time, _ = self.reader.latest()
+        if frame is None:
+            if self.reader.finished:
+                # File ended: stop taking budget
+                self.scheduler.remove(self.camera_id, self.sample)
+            return None
+
+        motion = bool(self._motion(frame) > STREAM_MOTION_THRESHOLD)
+        return asyncio.run_coroutine_threadsafe(
+            self._analyze(frame, frame_time, motion), self.event_loop
+        )
+
+    def status(self):
+        return {
+            "camera_id": self.camera_id,
+            "source": self.source,
+            "fps": self.fps,
+            "running": self.running,
+            "frames_read": self.reader.frames_read,
+            "frames_dropped": self.reader.frames_dropped,
+            "frames_analyzed": self.frames_analyzed,
+            "frames_rejected": self.frames_rejected,
+            "sampling": self.scheduler.rate(self.camera_id),
+            "activity": self.activity,
+            "last_analyzed_at": self.last_analyzed_at,
+            "last_result": self.last_result,
+            "error": self.last_error or self.reader.error
+        }
+
+
+class StreamManager:
+    def __init__(self, max_sources=STREAM_MAX_SOURCES, scheduler=None):
+        self.max_sources = max_sources
+        self.scheduler = scheduler or SamplingScheduler()
+        self._sources = {}
+        self._lock = threading.Lock()
+        self._analyze = None
+        self._event_loop = None
+
+    def start(self, analyze, event_loop):
+        """
+        Set the analysis streams submit their frames to.
+
+        Args:
+            analyze: async analyze(frame, camera_id, options) ->
+                     (response, whether the camera's leak timer is pending);
+                     raises QueueFullError / ArenaFullError when saturated
+            event_loop: Loop analyze runs on
+        """
+        self._analyze = analyze
+        self._event_loop = event_loop
+
+    def register(self, camera_id, source, fps=STREAM_SAMPLE_FPS, loop=False, options=None):
+        """
+        Start ingesting a source; replaces an existing source for the camera.
+
+        Raises:
+            ValueError on invalid fps or when the source limit is reached
+            RuntimeError before start()
+        """
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        if self._analyze is None:
+            raise RuntimeError("Stream analysis is not started")
+
+        with self._lock:
+            previous = self._sources.pop(camera_id, None)
+            if len(self._sources) >= self.max_sources:
+                if previous is not None:
+                    self._sources[camera_id] = previous
+                raise ValueError(f"At most {self.max_sources} stream sources")
+            stream = StreamSource(
+                camera_id,
+                source,
+                fps=fps,
+                loop=loop,
+                options=options,
+                scheduler=self.scheduler,
+                analyze=self._analyze,
+                event_loop=self._event_loop
+            )
+            self._sources[camera_id] = stream
+
+        if previous is not None:
+            previous.stop()
+        stream.start()
+        return stream
+
+    def unregister(self, camera_id):
+        with self._lock:
+            stream = self._sources.pop(camera_id, None)
+        if stream is None:
+            return False
+        stream.stop()
+        return True
+
+    def get(self, camera_id):
+        with self._lock:
+            return self._sources.get(camera_id)
+
+    def statuses(self):
+        with self._lock:
+            streams = list(self._sources.values())
+        return [s.status() for s in streams]
+
+    def sampling_stats(self):
+        return self.scheduler.stats()
+
+    def stop_all(self):
+        with self._lock:
+            streams = list(self._sources.values())
+            self._sources.clear()
+        for stream in streams:
+            stream.stop()
+        self.scheduler.stop()
+
+
+# Process-wide stream registry used by the API
+stream_manager = StreamManager()
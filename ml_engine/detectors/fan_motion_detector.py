@@ -1,12 +1,59 @@
 import cv2
 import numpy as np
-from utils.roi_utils import extract_roi
+from collections import deque
+from core.config import CEILING_ROI, FRAME_HISTORY
+from core.frame_buffer import frame_buffer, shrink
+from core.frame_context import working_context
+from core.camera_state import camera_states
+from core.metrics import DETECTOR_SECONDS
 
-prev_frame = None
-prev_frame_shape = None
-consistent_motion_count = 0
+def _fan_section(state):
+    # Recent ceiling frames of this camera only
+    return state.section(
+        "fan_motion", frames=None, motion_history=deque(maxlen=FRAME_HISTORY)
+    )
+
+
+def _temporal_motion(fan, gray):
+    """Push the ceiling frame into the camera's history; True on sustained motion"""
+    # Downscaled: the mean absolute difference of blade motion barely changes
+    small = shrink(gray)
+    frames = frame_buffer(fan, "frames", small.shape)
+    frames.push(small)
+    
+    if len(frames) < 2:
+        return False
+    
+    prev_frame, current = frames.last(2)
+    diff = cv2.absdiff(prev_frame, current)
+    motion_score = np.mean(diff)
+    # Lowered threshold for better detection
+    motion_detected = motion_score > 15
+    
+    # A running fan moves in most recent frames; a one-off change
+    # (door, lighting flicker) doesn't count as fan motion
+    history = fan["motion_history"]
+    history.append(motion_detected)
+    return motion_detected and sum(history) * 2 >= len(history)
 
-def detect_fan_motion(frame):
+
+def track_fan_motion(frame, state=None):
+    """
+    Advance the camera's ceiling frame history without a verdict, for
+    frames where lazy evaluation skips detect_fan_motion; otherwise the
+    next frame it does see would be compared with a stale one.
+    """
+    if state is None:
+        state = camera_states.get()
+    
+    roi = working_context(frame, "fan").crop(CEILING_ROI)
+    if roi.frame.size == 0:
+        return
+    _temporal_motion(_fan_section(state), roi.gray)
+
+
+@DETECTOR_SECONDS.time(detector="fan")
+def detect_fan_motion(frame, state=None):
     """
     Detect fan motion in ceiling ROI.
     
@@ -15,22 +62,28 @@ def detect_fan_motion(frame):
     - Circular/radial patterns (fan propeller)
     - Temporal consistency (if multiple frames available)
     
+    Args:
+        frame: Input frame or FrameContext
+        state: CameraState of the camera that produced the frame
+               (defaults to the shared default camera)
+    
     Returns:
         True if fan motion is detected
     """
-    global prev_frame, prev_frame_shape, consistent_motion_count
+    if state is None:
+        state = camera_states.get()
     
-    roi = extract_roi(frame)
+    roi = working_context(frame, "fan").crop(CEILING_ROI)
     
-    if roi is None or roi.size == 0:
+    if roi.frame.size == 0:
         return False
     
-    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+    gray = roi.gray
     
     # Method 1: Detect motion blur patterns
-    # Fans create streaking/blur patterns
-    laplacian = cv2.Laplacian(gray, cv2.CV_64F)
-    blur_variance = np.var(laplacian)
+    # Fans create streaking/blur patterns (measured at the reference
+    # size, so the thresholds below mean the same for every upload)
+    blur_variance = roi.laplacian_var
     
     # Method 2: Detect circular/radial patterns (propeller blades)
     # Use Hough circle detection
@@ -39,26 +92,17 @@ def detect_fan_motion(frame):
         blurred,
         cv2.HOUGH_GRADIENT,
         dp=1,
-        minDist=30,
+        minDist=roi.scaled(30),
         param1=50,
         param2=30,
-        minRadius=10,
-        maxRadius=100
+        minRadius=roi.scaled(10),
+        maxRadius=roi.scaled(100)
     )
     
     has_circular_pattern = circles is not None and len(circles[0]) > 0
     
     # Method 3: Compare with previous frame if available
-    motion_detected_temporal = False
-    if prev_frame is not None and prev_frame.shape == gray.shape:
-        diff = cv2.absdiff(prev_frame, gray)
-        motion_score = np.mean(diff)
-        # Lowered threshold for better detection
-        motion_detected_temporal = motion_score > 15
-    
-    # Update frame buffer
-    prev_frame = gray.copy()
-    prev_frame_shape = gray.shape
+    motion_detected_temporal = _temporal_motion(_fan_section(state), gray)
     
     # Fan is detected if:
     # - High motion blur variance OR
@@ -1,7 +1,10 @@
 import cv2
 import numpy as np
-from utils.roi_utils import extract_roi
+from core.config import CEILING_ROI
+from core.frame_context import working_context
+from core.metrics import DETECTOR_SECONDS
 
+@DETECTOR_SECONDS.time(detector="light")
 def detect_artificial_light(frame):
     """
     Detect artificial light in room using multiple methods.
@@ -14,12 +17,12 @@ def detect_artificial_light(frame):
     Returns:
         True if artificial light is strongly detected
     """
-    roi = extract_roi(frame)
+    roi = working_context(frame, "light").crop(CEILING_ROI)
     
-    if roi is None or roi.size == 0:
+    if roi.frame.size == 0:
         return False
     
-    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+    gray = roi.gray
     
     # Method 1: Overall brightness in ceiling area
     blurred = cv2.GaussianBlur(gray, (7, 7), 0)
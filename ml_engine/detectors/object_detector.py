@@ -0,0 +1,89 @@
+"""
+Shared YOLO Object Detector
+
+Runs YOLO once per frame and keeps the boxes so that the person check
+and the trash filter read from the same result instead of invoking the
+model again.
+"""
+
+from core.config import YOLO_CONF, PERSON_CONF, YOLO_BATCH_SIZE
+from core.frame_context import as_frame_context
+from core.metrics import DETECTOR_SECONDS
+from core.model_registry import get_yolo_backend
+
+
+class ObjectDetections:
+    """All YOLO boxes found in one frame at confidence >= YOLO_CONF."""
+
+    def __init__(self, boxes=None, ok=True):
+        # Each box: {"class_name": str, "confidence": float, "box": (x1, y1, x2, y2)}
+        self.boxes = boxes or []
+        # False when the model could not be loaded or failed on this frame,
+        # so "no boxes" does not mean "nothing there"
+        self.ok = ok
+
+    def of_classes(self, class_names, min_conf=YOLO_CONF):
+        """Boxes whose class is in class_names and confidence >= min_conf"""
+        return [
+            b for b in self.boxes
+            if b["class_name"] in class_names and b["confidence"] >= min_conf
+        ]
+
+    def persons(self, min_conf=PERSON_CONF):
+        return self.of_classes(("person",), min_conf)
+
+
+def detect_objects(frame):
+    """
+    Run YOLO once on the frame; later calls with the same FrameContext
+    return the cached result.
+
+    Returns:
+        ObjectDetections (empty, with ok False, if the model fails)
+    """
+    ctx = as_frame_context(frame)
+    return ctx.memo("objects", lambda: _run_yolo(ctx.frame))
+
+
+def detect_objects_batch(frames):
+    """
+    Run YOLO over many frames with batched model calls and cache each
+    result on its FrameContext, so later detect_objects() calls are free.
+
+    Args:
+        frames: List of FrameContext (or raw frames)
+
+    Returns:
+        List of ObjectDetections in input order
+    """
+    contexts = [as_frame_context(f) for f in frames]
+    todo = [ctx for ctx in contexts if not ctx.has("objects")]
+
+    for i in range(0, len(todo), YOLO_BATCH_SIZE):
+        chunk = todo[i:i + YOLO_BATCH_SIZE]
+        try:
+            backend = get_yolo_backend()
+            with DETECTOR_SECONDS.time(detector="yolo_batch"):
+                results = backend.predict([ctx.frame for ctx in chunk], YOLO_CONF)
+            detections = [ObjectDetections(boxes) for boxes in results]
+        except Exception as e:
+            print(f"YOLO error: {e}")
+            detections = [ObjectDetections(ok=False) for _ in chunk]
+
+        for ctx, dets in zip(chunk, detections):
+            ctx.store("objects", dets)
+
+    return [ctx.memo("objects", ObjectDetections) for ctx in contexts]
+
+
+def _run_yolo(frame):
+    try:
+        backend = get_yolo_backend()
+        # Model loading is not part of the stage time
+        with DETECTOR_SECONDS.time(detector="yolo"):
+            boxes = backend.predict([frame], YOLO_CONF)[0]
+    except Exception as e:
+        print(f"YOLO error: {e}")
+        return ObjectDetections(ok=False)
+
+    return ObjectDetections(boxes)
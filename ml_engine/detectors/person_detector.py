@@ -1,54 +1,139 @@
 import cv2
-import mediapipe as mp
-import numpy as np
-from ultralytics import YOLO
-
-# MediaPipe pose detection
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(
-    static_image_mode=True,
-    model_complexity=1,
-    smooth_landmarks=False
+import threading
+from core.config import (
+    PERSON_DETECTION_MODE,
+    PERSON_CASCADE_CONFIDENT,
+    PERSON_CASCADE_MIN,
+    PERSON_CASCADE_MAX_CROPS,
+    PERSON_CROP_PADDING,
 )
+from core.frame_context import as_frame_context
+from core.metrics import DETECTOR_SECONDS
+from core.model_registry import get_pose_model, pose_lock
+from detectors.object_detector import detect_objects
 
-# YOLOv8 for person detection (more reliable backup)
-yolo_model = YOLO("yolov8n.pt")
+# Per-stage outcome counters of the cascade, used to tune the uncertainty band
+_cascade_lock = threading.Lock()
+_cascade_counters = {
+    "yolo_unavailable": 0,
+    "yolo_confident_person": 0,
+    "yolo_confident_absent": 0,
+    "mediapipe_checked": 0,
+    "mediapipe_confirmed": 0,
+    "mediapipe_rejected": 0
+}
 
-def detect_person_mediapipe(frame):
-    """Detect person using MediaPipe pose estimation"""
+@DETECTOR_SECONDS.time(detector="person_mediapipe")
+def detect_person_mediapipe(frame, box=None):
+    """
+    Detect person using MediaPipe pose estimation.
+    
+    Args:
+        frame: Input frame or FrameContext
+        box: Optional (x1, y1, x2, y2); only a padded crop around it is checked
+    """
     try:
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        result = pose.process(rgb)
+        ctx = as_frame_context(frame)
+        if box is None:
+            rgb = ctx.rgb
+        else:
+            h, w = ctx.shape[:2]
+            x1, y1, x2, y2 = box
+            pad_x = int((x2 - x1) * PERSON_CROP_PADDING)
+            pad_y = int((y2 - y1) * PERSON_CROP_PADDING)
+            crop = ctx.frame[max(y1 - pad_y, 0):min(y2 + pad_y, h),
+                             max(x1 - pad_x, 0):min(x2 + pad_x, w)]
+            if crop.size == 0:
+                return False
+            rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+        # MediaPipe pose detection
+        pose = get_pose_model()
+        with pose_lock:
+            result = pose.process(rgb)
         return result.pose_landmarks is not None
     except Exception as e:
         print(f"MediaPipe error: {e}")
         return False
 
 def detect_person_yolo(frame):
-    """Detect person using YOLO object detection"""
-    try:
-        results = yolo_model(frame, conf=0.4)[0]
-        for box in results.boxes:
-            class_id = int(box.cls[0])
-            class_name = yolo_model.names[class_id]
-            if class_name == "person":
-                return True
-        return False
-    except Exception as e:
-        print(f"YOLO error: {e}")
+    """Detect person using the shared YOLO pass for this frame"""
+    return bool(detect_objects(frame).persons())
+
+def _count(stage):
+    with _cascade_lock:
+        _cascade_counters[stage] += 1
+
+def detect_person_cascade(frame):
+    """
+    YOLO first; MediaPipe only when YOLO is uncertain.
+    
+    - a person box with confidence >= PERSON_CASCADE_CONFIDENT -> person
+    - no person box with confidence >= PERSON_CASCADE_MIN -> no person
+    - otherwise MediaPipe Pose checks the crops of the uncertain boxes
+    
+    Without a YOLO result (model missing or failing) MediaPipe checks the
+    full frame, as in "both" mode.
+    
+    Returns:
+        True if a person is detected
+    """
+    ctx = as_frame_context(frame)
+    objects = detect_objects(ctx)
+    if not objects.ok:
+        _count("yolo_unavailable")
+        return detect_person_mediapipe(ctx)
+    
+    candidates = objects.persons(min_conf=PERSON_CASCADE_MIN)
+    
+    if any(b["confidence"] >= PERSON_CASCADE_CONFIDENT for b in candidates):
+        _count("yolo_confident_person")
+        return True
+    
+    if not candidates:
+        _count("yolo_confident_absent")
         return False
+    
+    _count("mediapipe_checked")
+    candidates = sorted(candidates, key=lambda b: -b["confidence"])
+    for candidate in candidates[:PERSON_CASCADE_MAX_CROPS]:
+        if detect_person_mediapipe(ctx, candidate["box"]):
+            _count("mediapipe_confirmed")
+            return True
+    
+    _count("mediapipe_rejected")
+    return False
+
+def person_cascade_stats():
+    """Cascade stage counters plus the share of frames that needed MediaPipe"""
+    with _cascade_lock:
+        stats = dict(_cascade_counters)
+    total = (
+        stats["yolo_unavailable"] + stats["yolo_confident_person"]
+        + stats["yolo_confident_absent"] + stats["mediapipe_checked"]
+    )
+    mediapipe = stats["mediapipe_checked"] + stats["yolo_unavailable"]
+    stats["mediapipe_rate"] = mediapipe / total if total else 0.0
+    return stats
 
 def detect_person(frame):
     """
     Detect person using multiple methods for higher reliability.
-    Uses both MediaPipe pose and YOLO detection.
+    
+    PERSON_DETECTION_MODE "cascade" runs MediaPipe only when YOLO is
+    uncertain (see detect_person_cascade); "both" always runs MediaPipe
+    pose and YOLO detection on the full frame.
     
     Returns:
-        True if a person is detected by either method
+        True if a person is detected
     """
+    ctx = as_frame_context(frame)
+    
+    if PERSON_DETECTION_MODE == "cascade":
+        return detect_person_cascade(ctx)
+    
     # Try both detection methods
-    pose_detected = detect_person_mediapipe(frame)
-    person_detected = detect_person_yolo(frame)
+    pose_detected = detect_person_mediapipe(ctx)
+    person_detected = detect_person_yolo(ctx)
     
     # Return True if either method detects a person
     # YOLO is more reliable for full-body detection
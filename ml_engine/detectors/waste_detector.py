@@ -1,8 +1,9 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
-
-model = YOLO("yolov8n.pt")
+from core.config import TRASH_CONF
+from core.frame_context import as_frame_context, laplacian_variance, working_context
+from core.metrics import DETECTOR_SECONDS
+from detectors.object_detector import detect_objects
 
 TRASH_CLASSES = [
     "bottle", "cup", "wine glass", "plastic bag",
@@ -10,16 +11,14 @@ TRASH_CLASSES = [
 ]
 
 
-def yolo_trash(frame):
-    results = model(frame, conf=0.3)[0]
+# Floor region analysed for clutter (x1, y1, x2, y2 as frame fractions)
+CLUTTER_ROI = (0.0, 0.55, 1.0, 1.0)
 
-    boxes = []
-    for b in results.boxes:
-        name = model.names[int(b.cls[0])]
-        if name in TRASH_CLASSES:
-            boxes.append(tuple(map(int, b.xyxy[0])))
 
-    return boxes
+def yolo_trash(frame):
+    detections = detect_objects(frame)
+
+    return [b["box"] for b in detections.of_classes(TRASH_CLASSES, TRASH_CONF)]
 
 
 def clutter_score(frame, water_mask=None):
@@ -30,23 +29,36 @@ def clutter_score(frame, water_mask=None):
         frame: Input frame
         water_mask: Optional mask for water regions to exclude from analysis
     """
-    h, w, _ = frame.shape
-    roi = frame[int(h*0.55):h, :]
-
-    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+    ctx = working_context(frame, "waste")
+    roi = ctx.crop(CLUTTER_ROI)
+    gray = roi.gray
 
+    # Edge ratio and texture are in original-image terms (see FrameContext):
+    # edges at the working resolution, the Laplacian at the reference size
     # If water mask provided, exclude those regions from clutter analysis
     if water_mask is not None:
-        # Resize water mask to match roi size if needed
-        water_roi = water_mask[int(h*0.55):h, :]
+        if water_mask.shape[:2] != ctx.shape[:2]:
+            # Water ran at a different working resolution
+            water_mask = cv2.resize(
+                water_mask, (ctx.shape[1], ctx.shape[0]), interpolation=cv2.INTER_NEAREST
+            )
+        x1, y1, x2, y2 = roi.region
+        dry = cv2.bitwise_not(water_mask[y1:y2, x1:x2])
         # Where water is detected, don't analyze for clutter
-        gray = cv2.bitwise_and(gray, gray, mask=cv2.bitwise_not(water_roi))
-
-    edges = cv2.Canny(gray, 70, 140)
-    edge_ratio = edges.mean() / 255
-
-    lap = cv2.Laplacian(gray, cv2.CV_64F)
-    texture = np.var(lap)
+        gray = cv2.bitwise_and(gray, gray, mask=dry)
+        edges = cv2.Canny(gray, 70, 140)
+        edge_ratio = np.count_nonzero(edges) / edges.size * roi.scale
+
+        sharp_gray = roi.sharpness_view.gray
+        if sharp_gray.shape[:2] != roi.shape[:2]:
+            dry = cv2.resize(
+                dry, (sharp_gray.shape[1], sharp_gray.shape[0]), interpolation=cv2.INTER_NEAREST
+            )
+        texture = laplacian_variance(cv2.bitwise_and(sharp_gray, sharp_gray, mask=dry))
+    else:
+        edges = roi.edges(70, 140)
+        edge_ratio = roi.edge_ratio(70, 140)
+        texture = roi.laplacian_var
 
     score = edge_ratio * texture
 
@@ -56,19 +68,22 @@ def clutter_score(frame, water_mask=None):
     return score, mask
 
 
+@DETECTOR_SECONDS.time(detector="waste")
 def detect_waste(frame, water_mask=None):
     """
     Detect waste while accounting for water regions.
     
     Args:
-        frame: Input frame
+        frame: Input frame or FrameContext
         water_mask: Optional mask for water regions detected by water_detector
     """
-    trash_boxes = yolo_trash(frame)
-    score, mask = clutter_score(frame, water_mask)
+    ctx = as_frame_context(frame)
+    trash_boxes = yolo_trash(ctx)
+    score, mask = clutter_score(ctx, water_mask)
 
     # STRICT: High threshold to reduce false positives
     # Only detect actual waste/clutter, not shadows or furniture
+    score = float(score)
     clutter_detected = score > 28  # Increased from 18
 
     waste_detected = bool(trash_boxes) or clutter_detected
@@ -1,36 +1,105 @@
 import cv2
 import numpy as np
+from core.config import MIN_PUDDLE_CONTOUR_AREA
+from core.frame_context import as_frame_context, working_context
+from core.metrics import DETECTOR_SECONDS
+
+
+class PuddleBlobs:
+    """
+    Connected components of the water mask, one entry per blob.
+
+    Lengths (boxes) are in working pixels; areas are in original-image
+    pixels. All per-blob values are numpy arrays indexed alike, so filters
+    are boolean masks over them.
+    """
+
+    def __init__(self, mask, labels, stats, brightness, area_scale):
+        self.mask = mask
+        self.labels = labels
+        # Label 0 is the background
+        self.boxes = stats[1:, :4]                      # x, y, w, h
+        self.areas = stats[1:, cv2.CC_STAT_AREA] * area_scale
+        self.brightness = brightness
+        widths = self.boxes[:, 2]
+        heights = self.boxes[:, 3]
+        self.aspect = heights / (widths + 1.0)
+
+    def __len__(self):
+        return len(self.areas)
+
+
+def _water_mask(ctx):
+    """
+    Blue-ish OR dark pixels, cleaned with a 7x7 close/open (memoized).
+    This is the timed water stage: it runs once per frame whichever of
+    detect_raw_puddles / analyze_puddles asks first.
+    """
+    def compute():
+        with DETECTOR_SECONDS.time(detector="water"):
+            # 1. Detect blue/cyan water colors (H: 90-130, S: 50-255, V: 0-200)
+            lower_blue = np.array([90, 50, 0])
+            upper_blue = np.array([130, 255, 200])
+            water_color_mask = cv2.inRange(ctx.hsv, lower_blue, upper_blue)
+
+            # 2. Detect dark pixels (wet areas typically darker)
+            # Wet floor is darker than dry floor
+            dark_mask = cv2.threshold(ctx.gray, 100, 255, cv2.THRESH_BINARY_INV)[1]
+
+            # 3. Combine both masks - water is either blue-ish OR dark
+            combined_mask = cv2.bitwise_or(water_color_mask, dark_mask)
+
+            # Apply morphology to clean up noise
+            kernel = np.ones((7, 7), np.uint8)
+            combined_mask = cv2.morphologyEx(combined_mask, cv2.MORPH_CLOSE, kernel)
+            return cv2.morphologyEx(combined_mask, cv2.MORPH_OPEN, kernel)
+    return ctx.memo("water_mask", compute)
+
 
 def detect_raw_puddles(frame):
-    """Detect water puddles by looking for dark wet areas and blue/cyan hues"""
-    
-    # Convert to HSV for better color detection
-    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    
-    # 1. Detect blue/cyan water colors (H: 90-130, S: 50-255, V: 0-200)
-    lower_blue = np.array([90, 50, 0])
-    upper_blue = np.array([130, 255, 200])
-    water_color_mask = cv2.inRange(hsv, lower_blue, upper_blue)
-    
-    # 2. Detect dark pixels (wet areas typically darker)
-    # Wet floor is darker than dry floor
-    dark_mask = cv2.threshold(gray, 100, 255, cv2.THRESH_BINARY_INV)[1]
+    """
+    Detect water puddles by looking for dark wet areas and blue/cyan hues.
     
-    # 3. Combine both masks - water is either blue-ish OR dark
-    combined_mask = cv2.bitwise_or(water_color_mask, dark_mask)
+    Returns:
+        (frame, contours, mask): the input frame, puddle contours in
+        original-image coordinates (so their areas compare with
+        original-pixel thresholds) and the water mask at the water
+        working resolution
+    """
     
-    # Apply morphology to clean up noise
-    kernel = np.ones((7, 7), np.uint8)
-    combined_mask = cv2.morphologyEx(combined_mask, cv2.MORPH_CLOSE, kernel)
-    combined_mask = cv2.morphologyEx(combined_mask, cv2.MORPH_OPEN, kernel)
+    # Runs at the water working resolution
+    ctx = working_context(frame, "water")
+    combined_mask = _water_mask(ctx)
     
     # Find contours
     contours, _ = cv2.findContours(
         combined_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
     )
     
-    # Filter by area - minimum 200 pixels for water puddle
-    puddles = [c for c in contours if cv2.contourArea(c) > 200]
+    # Filter by area - MIN_PUDDLE_CONTOUR_AREA original-image pixels
+    min_area = ctx.scaled_area(MIN_PUDDLE_CONTOUR_AREA)
+    puddles = [c for c in contours if cv2.contourArea(c) > min_area]
+    if ctx.scale != 1.0:
+        puddles = [np.round(c / ctx.scale).astype(np.int32) for c in puddles]
     
-    return frame, puddles, combined_mask
+    return as_frame_context(frame).frame, puddles, combined_mask
+
+
+def analyze_puddles(frame):
+    """
+    Measure every water blob in one pass (memoized on the working context).
+
+    connectedComponentsWithStats gives area and bounding box per label;
+    mean brightness comes from a label-indexed bincount over the gray
+    image, so no per-blob mask is ever allocated.
+    """
+    ctx = working_context(frame, "water")
+
+    def compute():
+        mask = _water_mask(ctx)
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        pixels = stats[:, cv2.CC_STAT_AREA]
+        sums = np.bincount(labels.ravel(), weights=ctx.gray.ravel(), minlength=count)
+        brightness = sums[1:] / np.maximum(pixels[1:], 1)
+        return PuddleBlobs(mask, labels, stats, brightness, ctx.area_scale)
+    return ctx.memo("puddle_blobs", compute)
@@ -0,0 +1,62 @@
+"""
+Export the YOLO weights to ONNX (and optionally INT8) for the ONNX Runtime backend.
+
+Run once on a machine with ultralytics/torch installed; the serving image
+then only needs onnxruntime (NAZAR_YOLO_BACKEND=onnx). Outputs go to the
+model cache (NAZAR_MODEL_DIR) with a .sha256 file next to each, so copying
+the directory to an offline node is enough.
+
+Usage:
+    python export_yolo_onnx.py [--weights yolov8n.pt] [--output yolov8n.onnx]
+                               [--int8 --calibration-dir calibration/]
+"""
+
+import argparse
+import os
+import sys
+
+from core.config import (
+    YOLO_WEIGHTS,
+    YOLO_IMGSZ,
+    YOLO_ONNX_PATH,
+    YOLO_ONNX_INT8_PATH,
+    YOLO_CALIBRATION_DIR,
+)
+from core.inference_backends import export_onnx, quantize_onnx_int8
+from core.model_cache import cache_path, write_checksum
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export YOLO to ONNX for CPU serving")
+    parser.add_argument("--weights", default=YOLO_WEIGHTS, help="ultralytics weights (.pt or .yaml)")
+    parser.add_argument("--output", default=cache_path(YOLO_ONNX_PATH), help="FP32 ONNX output path")
+    parser.add_argument("--imgsz", type=int, default=YOLO_IMGSZ)
+    parser.add_argument("--int8", action="store_true", help="Also write an INT8-quantized model")
+    parser.add_argument("--int8-output", default=cache_path(YOLO_ONNX_INT8_PATH))
+    parser.add_argument(
+        "--calibration-dir",
+        default=YOLO_CALIBRATION_DIR,
+        help="Folder of representative local images for INT8 calibration"
+    )
+
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    print(f"Exporting {args.weights} -> {args.output}")
+    export_onnx(args.weights, args.output, args.imgsz)
+    write_checksum(args.output)
+
+    if args.int8:
+        print(f"Quantizing {args.output} -> {args.int8_output} (calibration: {args.calibration_dir})")
+        try:
+            quantize_onnx_int8(args.output, args.int8_output, args.calibration_dir, args.imgsz)
+            write_checksum(args.int8_output)
+        except ValueError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+
+    print("✓ Done")
+
+
+if __name__ == "__main__":
+    main()
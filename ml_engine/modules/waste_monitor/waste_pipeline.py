@@ -6,7 +6,7 @@ def process_waste_frame(frame, water_mask=None):
     Process frame for waste/clutter detection.
     
     Args:
-        frame: Input frame
+        frame: Input frame or FrameContext
         water_mask: Optional mask for water regions to exclude from analysis
     """
     detected, boxes, mask, score = detect_waste(frame, water_mask)
@@ -1,64 +1,144 @@
-import cv2
 import time
 import numpy as np
-from detectors.water_detector import detect_raw_puddles
+from detectors.water_detector import analyze_puddles
 from detectors.person_detector import detect_person
+from core.camera_state import camera_states
+from core.config import (
+    FLOW_CONFIRM_FRAMES,
+    PERSISTENCE_BUFFER,
+    SEVERITY_SMALL,
+    SEVERITY_MEDIUM,
+    SEVERITY_HIGH,
+)
+from core.frame_buffer import frame_buffer, shrink
+from core.frame_context import working_context
+from modules.water_leak.validator import false_positive_mask
 
 
 
 CONFIRM_TIME = 180   # seconds
 ALERT_COOLDOWN = 180
 
-first_seen = None
-last_alert = 0
 
-
-def process_water_frame(frame):
-
-    global first_seen, last_alert
+def _water_missing(leak):
+    """
+    Count a frame without visible water (dry or occluded by a person).
+    The confirmation timer only resets after PERSISTENCE_BUFFER such
+    frames in a row, so brief occlusions don't restart it.
+    """
+    leak["wet_streak"] = 0
+    leak["dry_streak"] += 1
+    if leak["dry_streak"] >= PERSISTENCE_BUFFER:
+        leak["first_seen"] = None
+
+
+def _remember_wet_pixels(leak, blobs, keep, ctx):
+    """
+    Push the downscaled mask of the validated blobs into the camera's
+    ring buffer and return (buffer, original-image area of one buffer pixel).
+    """
+    lut = np.zeros(len(blobs) + 1, dtype=np.uint8)
+    lut[1:][keep] = 255
+    wet = shrink(lut[blobs.labels])
+    masks = frame_buffer(leak, "wet_masks", wet.shape)
+    masks.push(wet)
+    pixel_area = ctx.area_scale * (ctx.shape[1] / wet.shape[1]) ** 2
+    return masks, pixel_area
+
+
+def _persistent_area(masks, pixel_area):
+    """Original-image area wet in at least half of the buffered frames"""
+    return float(np.count_nonzero(masks.mean() >= 127.5) * pixel_area)
+
+
+def leak_pending(state):
+    """
+    True while the camera has water under observation (streak or running
+    confirmation timer), i.e. while every frame matters to the timer.
+    """
+    leak = state.section(
+        "water_leak", first_seen=None, last_alert=0, wet_streak=0, dry_streak=0
+    )
+    return leak["first_seen"] is not None or leak["wet_streak"] > 0
+
+
+def process_water_frame(frame, person_detected=None, state=None):
+    """
+    Args:
+        frame: Input frame or FrameContext
+        person_detected: Optional person check already run on this frame
+        state: CameraState of the camera that produced the frame
+               (defaults to the shared default camera)
+    """
+
+    if state is None:
+        state = camera_states.get()
+
+    # Per-camera confirmation timer and alert cooldown
+    leak = state.section(
+        "water_leak", first_seen=None, last_alert=0, wet_streak=0, dry_streak=0
+    )
+
+    if person_detected is None:
+        person_detected = detect_person(frame)
 
     # 👤 Human present → ignore scene
-    if detect_person(frame):
-        first_seen = None
+    if person_detected:
+        _water_missing(leak)
         return None, None
 
-    _, puddles, mask = detect_raw_puddles(frame)
+    blobs = analyze_puddles(frame)
+    mask = blobs.mask
+    ctx = working_context(frame, "water")
 
-    area = sum(cv2.contourArea(c) for c in puddles)
+    # Area in original-image pixels of the blobs that pass the validator
+    # (human shapes, glare and small noise rejected)
+    keep = ~false_positive_mask(blobs, ctx)
+    area = float(blobs.areas[keep].sum())
+
+    # Recent wet pixels, dry frames included, so persistence decays
+    masks, pixel_area = _remember_wet_pixels(leak, blobs, keep, ctx)
 
     # no water visible
-    if area < 250:
-        first_seen = None
+    if area < SEVERITY_SMALL:
+        _water_missing(leak)
         return None, mask
 
+    leak["dry_streak"] = 0
+    leak["wet_streak"] += 1
+
     now = time.time()
 
-    # start confirmation timer
-    if first_seen is None:
-        first_seen = now
+    # start confirmation timer once water showed up in enough consecutive frames
+    if leak["first_seen"] is None:
+        if leak["wet_streak"] >= FLOW_CONFIRM_FRAMES:
+            leak["first_seen"] = now
         return None, mask
 
     # wait until confirmed stable
-    if now - first_seen < CONFIRM_TIME:
+    if now - leak["first_seen"] < CONFIRM_TIME:
         return None, mask
 
     # cooldown between alerts
-    if now - last_alert < ALERT_COOLDOWN:
+    if now - leak["last_alert"] < ALERT_COOLDOWN:
         return None, mask
 
-    # severity
-    if area > 1200:
+    # severity from the water that stayed in place over the buffered
+    # frames, so a transient dark object doesn't inflate it
+    persistent_area = _persistent_area(masks, pixel_area)
+    if persistent_area > SEVERITY_HIGH:
         severity = "HIGH"
-    elif area > 600:
+    elif persistent_area > SEVERITY_MEDIUM:
         severity = "MEDIUM"
     else:
         severity = "LOW"
 
-    last_alert = now
+    leak["last_alert"] = now
 
     return {
         "issue": "WATER LEAK / SPILL",
         "severity": severity,
         "area": int(area),
-        "confirmed_after_sec": int(now - first_seen)
+        "persistent_area": int(persistent_area),
+        "confirmed_after_sec": int(now - leak["first_seen"])
     }, mask
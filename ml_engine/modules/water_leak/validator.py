@@ -1,39 +1,41 @@
-import cv2
-import numpy as np
-
-
-def reject_false_positive(contour, roi):
+"""
+Puddle Validator
 
-    x, y, w, h = cv2.boundingRect(contour)
-    area = cv2.contourArea(contour)
-
-    # ---------------- HUMAN BLOCK ----------------
-    # Humans appear tall compared to puddles
-    if h > 140:
-        return True
+False-positive rules for water blobs, applied to all blobs of a frame
+at once as boolean filters over detectors.water_detector.PuddleBlobs.
+Pixel thresholds are in original-image pixels.
+"""
 
-    # Leg/body like proportions
-    ratio = h / (w + 1)
-    if ratio > 2.5:
-        return True
+import numpy as np
 
+# Humans appear tall compared to puddles
+MAX_HEIGHT = 140
+# Leg/body like proportions (height / (width + 1))
+MAX_ASPECT = 2.5
+# Very bright = likely sunlight reflection, not puddle
+MAX_BRIGHTNESS = 235
+# Small noise
+MIN_AREA = 250
 
-    # ---------------- SUNLIGHT / WALL GLARE BLOCK ----------------
-    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
 
-    mask = np.zeros_like(gray)
-    cv2.drawContours(mask, [contour], -1, 255, -1)
+def false_positive_mask(blobs, ctx):
+    """
+    Boolean array, True for blobs to reject.
 
-    mean_brightness = np.mean(gray[mask == 255])
+    Args:
+        blobs: PuddleBlobs of the frame
+        ctx: Working FrameContext the blobs were measured on
+    """
+    heights = blobs.boxes[:, 3]
 
-    # Very bright = likely sunlight reflection, not puddle
-    if mean_brightness > 235:
-        return True
+    # ---------------- HUMAN BLOCK ----------------
+    human = (heights > ctx.scaled(MAX_HEIGHT)) | (blobs.aspect > MAX_ASPECT)
 
+    # ---------------- SUNLIGHT / WALL GLARE BLOCK ----------------
+    glare = blobs.brightness > MAX_BRIGHTNESS
 
     # ---------------- SMALL NOISE ----------------
-    if area < 250:
-        return True
+    noise = blobs.areas < MIN_AREA
 
+    return np.asarray(human | glare | noise, dtype=bool)
 
-    return False
@@ -0,0 +1,65 @@
+"""
+Tests for the local detection history: which events a frame records and
+how queries filter them.
+
+Run with: python -m pytest -q test_detection_store.py
+"""
+
+import pytest
+
+from core.detection_store import DetectionStore, event_rows
+
+LEAK = {
+    "detection": "Water Leak Detected",
+    "category": "Plumbing",
+    "severity": "High",
+    "confidence": 0.9
+}
+
+
+def test_event_rows_flatten_infrastructure():
+    raw = {
+        "water": {"issue": "puddle", "confidence": 0.9},
+        "waste": None,
+        "general_infrastructure": {"crack": {"issue_type": "crack", "severity": "Low"}}
+    }
+    rows = event_rows(100.0, "cam1", LEAK, raw)
+
+    kinds = [(row[2], row[3]) for row in rows]
+    assert kinds == [("verified", "water_leak"), ("raw", "water"), ("raw", "crack")]
+    assert event_rows(100.0, "cam1", {"detection": "No Issue"}, None) == []
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = DetectionStore(path=str(tmp_path / "detections.sqlite3"), flush_interval=0.01)
+    for ts, camera in ((100.0, "cam1"), (200.0, "cam2"), (300.0, "cam1")):
+        store.record(camera, LEAK, {"water": {"issue": "puddle"}}, timestamp=ts)
+    store.flush()
+    yield store
+    store.close()
+
+
+def test_query_filters_and_orders(store):
+    events = store.query(camera_id="cam1", kind="verified")
+    assert [e["timestamp"] for e in events] == [300.0, 100.0]
+    assert events[0]["type"] == "water_leak"
+    assert events[0]["data"]["severity"] == "High"
+
+    assert len(store.query(detection_type="water")) == 3
+    assert [e["timestamp"] for e in store.query(since=100.0, until=300.0, kind="raw")] == [200.0, 100.0]
+
+
+def test_query_limit_and_projection(store):
+    events = store.query(limit=2, include_data=False)
+    assert len(events) == 2
+    assert "data" not in events[0]
+    # A limit below one still returns the newest event
+    assert len(store.query(limit=0)) == 1
+
+
+def test_store_counts_what_it_wrote(store):
+    stats = store.stats()
+    assert stats["recorded"] == 3
+    assert stats["written"] == 6
+    assert stats["pending"] == 0
@@ -0,0 +1,96 @@
+"""
+Tests for the analysis executor: admission bound, reservations and the
+metrics process workers send back.
+
+Run with: python -m pytest -q test_executor.py
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from core.executor import AnalysisExecutor, QueueFullError
+from core.metrics import ERRORS_TOTAL
+
+
+def _count_error(kind):
+    ERRORS_TOTAL.inc(kind=kind)
+    return kind
+
+
+def test_queue_full_rejects_and_frees_resources():
+    executor = AnalysisExecutor("thread", workers=1, queue_size=1)
+    release = threading.Event()
+    freed = []
+
+    async def scenario():
+        busy = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(QueueFullError):
+            await executor.run(release.wait, on_done=lambda: freed.append(True))
+        stats = executor.stats()
+        release.set()
+        await asyncio.gather(*busy)
+        return stats
+
+    try:
+        stats = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+    assert stats["in_flight"] == 1
+    assert stats["queue_depth"] == 1
+    assert stats["rejected"] == 1
+    # A rejected call still runs its on_done cleanup
+    assert freed == [True]
+    assert executor.stats()["completed"] == 2
+
+
+def test_reserve_counts_against_the_bound():
+    executor = AnalysisExecutor("thread", workers=1, queue_size=1)
+    executor.reserve()
+    executor.reserve()
+    with pytest.raises(QueueFullError):
+        executor.reserve()
+
+    # The remaining reservation is the one run() takes over
+    executor.unreserve()
+    try:
+        result = asyncio.run(executor.run(sum, [1, 2], reserved=True))
+    finally:
+        executor.shutdown()
+
+    assert result == 3
+    stats = executor.stats()
+    assert (stats["in_flight"], stats["completed"]) == (0, 1)
+
+
+def test_failures_are_counted_and_raised():
+    executor = AnalysisExecutor("thread", workers=1, queue_size=0)
+    try:
+        with pytest.raises(ZeroDivisionError):
+            asyncio.run(executor.run(divmod, 1, 0))
+    finally:
+        executor.shutdown()
+
+    stats = executor.stats()
+    assert stats["failed"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_process_workers_report_their_metrics():
+    kind = "test_process_metrics"
+    before = ERRORS_TOTAL._values.get((kind,), 0)
+    executor = AnalysisExecutor("process", workers=1, queue_size=2)
+
+    async def scenario():
+        return [await executor.run(_count_error, kind) for _ in range(3)]
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+    assert results == [kind] * 3
+    assert ERRORS_TOTAL._values.get((kind,), 0) == before + 3
@@ -0,0 +1,91 @@
+"""
+Tests for FrameRingBuffer: window contents and running statistics
+against numpy over the same frames.
+
+Run with: python -m pytest -q test_frame_buffer.py
+"""
+
+import numpy as np
+import pytest
+
+from core.frame_buffer import FrameRingBuffer, frame_buffer
+
+
+def _frames(count, shape=(24, 32), seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, shape, dtype=np.uint8) for _ in range(count)]
+
+
+@pytest.mark.parametrize("count", [1, 3, 5, 12])
+def test_statistics_match_numpy(count):
+    buffer = FrameRingBuffer((24, 32), capacity=5)
+    frames = _frames(count)
+    for i, frame in enumerate(frames):
+        buffer.push(frame, timestamp=float(i))
+
+    window = np.stack(frames[-5:]).astype(np.float64)
+    assert len(buffer) == min(count, 5)
+    np.testing.assert_allclose(buffer.mean(), window.mean(axis=0), rtol=1e-5)
+    np.testing.assert_allclose(buffer.variance(), window.var(axis=0), rtol=1e-4, atol=1e-2)
+
+
+def test_last_is_a_chronological_view():
+    buffer = FrameRingBuffer((24, 32), capacity=4)
+    frames = _frames(6)
+    for i, frame in enumerate(frames):
+        buffer.push(frame, timestamp=float(i))
+
+    last = buffer.last(3)
+    assert np.shares_memory(last, buffer._frames)
+    np.testing.assert_array_equal(last, np.stack(frames[3:]))
+    np.testing.assert_array_equal(buffer.timestamps(3), [3.0, 4.0, 5.0])
+    assert len(buffer.last()) == 4
+
+
+def test_out_arrays_are_filled_in_place():
+    buffer = FrameRingBuffer((24, 32), capacity=3)
+    for frame in _frames(4):
+        buffer.push(frame)
+
+    out = np.empty((24, 32), np.float32)
+    assert buffer.mean(out=out) is out
+    assert buffer.variance(out=out) is out
+    assert out.min() >= 0
+
+
+def test_clear_resets_the_window():
+    buffer = FrameRingBuffer((24, 32), capacity=3)
+    for frame in _frames(3):
+        buffer.push(frame)
+    buffer.clear()
+
+    assert len(buffer) == 0
+    assert not buffer.mean().any()
+
+
+def test_rejects_frames_of_another_shape():
+    buffer = FrameRingBuffer((24, 32), capacity=3)
+    with pytest.raises(ValueError):
+        buffer.push(np.zeros((32, 24), np.uint8))
+
+
+def test_byte_budget_caps_capacity():
+    pixels = 24 * 32
+    buffer = FrameRingBuffer((24, 32), capacity=50, max_bytes=12 * pixels + 4 * (2 * pixels + 8))
+    assert buffer.capacity == 4
+
+
+def test_budget_below_two_frames_is_an_error():
+    pixels = 24 * 32
+    with pytest.raises(ValueError):
+        FrameRingBuffer((24, 32), capacity=5, max_bytes=12 * pixels + 2 * pixels)
+
+
+def test_frame_buffer_is_recreated_on_shape_change():
+    section = {}
+    first = frame_buffer(section, "history", (24, 32), capacity=3)
+    assert frame_buffer(section, "history", (24, 32), capacity=3) is first
+
+    second = frame_buffer(section, "history", (48, 64), capacity=3)
+    assert second is not first
+    assert section["history"] is second
@@ -0,0 +1,109 @@
+"""
+Tests for the ONNX YOLO backend's output contract: letterboxing and
+decoding raw model output into ObjectDetections boxes.
+
+Decoding is tested on synthetic model output, so no exported model is
+needed; the session test runs only when a model is present.
+
+Run with: python -m pytest -q test_inference_backends.py
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from core.inference_backends import OnnxYoloBackend, letterbox
+
+
+def _backend(names=None, iou=0.7, max_det=300):
+    # The decoder without an ONNX Runtime session
+    backend = OnnxYoloBackend.__new__(OnnxYoloBackend)
+    backend.names = names if names is not None else {0: "person", 1: "bottle"}
+    backend.iou = iou
+    backend.max_det = max_det
+    return backend
+
+
+def _output(*predictions, num_classes=2, anchors=8):
+    """(4 + num_classes, anchors) array from (cx, cy, w, h, class_id, score)"""
+    output = np.zeros((4 + num_classes, anchors), np.float32)
+    for i, (cx, cy, w, h, class_id, score) in enumerate(predictions):
+        output[:4, i] = (cx, cy, w, h)
+        output[4 + class_id, i] = score
+    return output
+
+
+def test_letterbox_pads_to_a_square_blob():
+    frame = np.zeros((480, 640, 3), np.uint8)
+    blob, (ratio, pad_x, pad_y) = letterbox(frame, 640)
+
+    assert blob.shape == (3, 640, 640)
+    assert blob.dtype == np.float32
+    assert ratio == 1.0
+    assert (pad_x, pad_y) == (0, 80)
+    # Padding is YOLO's gray, scaled to [0, 1]
+    assert blob[0, 0, 0] == pytest.approx(114 / 255)
+
+
+def test_decode_returns_the_box_contract():
+    frame_shape = (480, 640)
+    transform = (1.0, 0, 80)
+    output = _output((320, 320, 100, 200, 0, 0.9), (100, 150, 40, 40, 1, 0.6))
+
+    boxes = _backend()._decode(output, transform, frame_shape, conf=0.25)
+
+    assert [b["class_name"] for b in boxes] == ["person", "bottle"]
+    assert all(isinstance(b["confidence"], float) for b in boxes)
+    assert boxes[0]["confidence"] == pytest.approx(0.9)
+    # Letterboxed centre/size -> frame corners, padding removed
+    assert boxes[0]["box"] == (270, 140, 370, 340)
+    assert all(isinstance(v, int) for b in boxes for v in b["box"])
+
+
+def test_decode_filters_suppresses_and_clips():
+    transform = (1.0, 0, 0)
+    output = _output(
+        (100, 100, 50, 50, 0, 0.9),
+        (102, 101, 50, 50, 0, 0.8),     # overlaps the first: suppressed
+        (102, 101, 50, 50, 1, 0.7),     # same place, other class: kept
+        (300, 300, 40, 40, 0, 0.1),     # below conf
+        (630, 5, 40, 40, 1, 0.5),       # partly outside the frame
+    )
+
+    boxes = _backend()._decode(output, transform, (320, 640), conf=0.25)
+
+    assert [(b["class_name"], round(b["confidence"], 1)) for b in boxes] == [
+        ("person", 0.9), ("bottle", 0.7), ("bottle", 0.5)
+    ]
+    assert boxes[-1]["box"] == (610, 0, 640, 25)
+
+
+def test_decode_respects_max_det_and_unknown_classes():
+    output = _output((100, 100, 20, 20, 0, 0.9), (300, 100, 20, 20, 1, 0.8))
+
+    boxes = _backend(names={}, max_det=1)._decode(output, (1.0, 0, 0), (480, 640), conf=0.25)
+
+    assert len(boxes) == 1
+    assert boxes[0]["class_name"] == "0"
+    assert _backend()._decode(output, (1.0, 0, 0), (480, 640), conf=0.95) == []
+
+
+ONNX_MODEL = os.environ.get("NAZAR_TEST_ONNX_MODEL")
+
+
+@pytest.mark.skipif(not ONNX_MODEL or not os.path.exists(ONNX_MODEL), reason="NAZAR_TEST_ONNX_MODEL not set")
+def test_session_output_contract():
+    pytest.importorskip("onnxruntime")
+    backend = OnnxYoloBackend(ONNX_MODEL)
+    frames = [np.zeros((480, 640, 3), np.uint8), np.full((720, 1280, 3), 200, np.uint8)]
+
+    detections = backend.predict(frames, conf=0.25)
+
+    assert len(detections) == len(frames)
+    for boxes, frame in zip(detections, frames):
+        height, width = frame.shape[:2]
+        for box in boxes:
+            assert set(box) == {"class_name", "confidence", "box"}
+            x1, y1, x2, y2 = box["box"]
+            assert 0 <= x1 <= x2 <= width and 0 <= y1 <= y2 <= height
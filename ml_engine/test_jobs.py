@@ -0,0 +1,146 @@
+"""
+Tests for analysis job persistence, claiming and recovery, and for the
+callback and stream source allowlists.
+
+Run with: python -m pytest -q test_jobs.py
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+from core import jobs, stream_ingest
+from core.jobs import JobManager, JobStore, callback_error
+from core.stream_ingest import stream_source_error
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_job_round_trip(store):
+    store.insert("j1", {"debug": True}, b"jpeg", None)
+    assert store.queued() == ["j1"]
+    assert store.load("j1") == ({"debug": True}, b"jpeg", None)
+
+    assert store.claim("j1")
+    store.finish("j1", "DONE", result=jobs.dumps({"detection": "No Issue"}))
+
+    job = store.get("j1")
+    assert job["status"] == "DONE"
+    assert job["result"] == {"detection": "No Issue"}
+    assert "callback_status" not in job
+    # The upload is dropped once the job is finished
+    assert store.load("j1") is None
+
+
+def test_a_job_is_claimed_once(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    first, second = JobStore(path), JobStore(path)
+    first.insert("j1", {}, b"jpeg", None)
+
+    assert first.claim("j1")
+    assert not second.claim("j1")
+    assert second.queued() == []
+
+
+def test_stale_running_jobs_are_requeued(store):
+    store.insert("stale", {}, b"jpeg", None)
+    store.insert("alive", {}, b"jpeg", None)
+    store.claim("stale")
+    store.claim("alive")
+
+    cutoff = time.time()
+    time.sleep(0.01)
+    store.touch(["alive"])
+
+    assert store.requeue_stale(cutoff) == ["stale"]
+    assert store.get("stale")["status"] == "QUEUED"
+    assert store.get("alive")["status"] == "RUNNING"
+    # Already taken back: a second process finds nothing
+    assert store.requeue_stale(cutoff) == []
+
+
+def test_prune_keeps_unfinished_jobs(store):
+    store.insert("done", {}, b"jpeg", None)
+    store.insert("queued", {}, b"jpeg", None)
+    store.finish("done", "DONE", result=jobs.dumps({}))
+
+    store.prune(time.time() + 1)
+
+    assert store.get("done") is None
+    assert store.get("queued")["status"] == "QUEUED"
+
+
+def test_manager_runs_and_survives_restart(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    JobStore(path).insert("left-over", {"debug": False}, b"old", None)
+
+    async def run(contents, **options):
+        return {"size": len(contents), "options": options}
+
+    async def scenario():
+        manager = JobManager(db_path=path, concurrency=1, max_queued=4)
+        manager.start(run)
+        job_id = await manager.submit(b"jpeg", {"debug": True})
+        for _ in range(100):
+            jobs_done = [await manager.get(job_id), await manager.get("left-over")]
+            if all(job["status"] == "DONE" for job in jobs_done):
+                break
+            await asyncio.sleep(0.01)
+        await manager.stop()
+        return jobs_done, manager.stats()
+
+    (submitted, recovered), stats = asyncio.run(scenario())
+
+    assert submitted["result"] == {"size": 4, "options": {"debug": True}}
+    assert recovered["result"] == {"size": 3, "options": {"debug": False}}
+    assert stats["done"] == 2
+
+
+def test_manager_bounds_the_queue(tmp_path):
+    async def run(contents, **options):
+        await asyncio.sleep(10)
+
+    async def scenario():
+        manager = JobManager(db_path=str(tmp_path / "jobs.sqlite3"), concurrency=1, max_queued=1)
+        manager.start(run)
+        try:
+            await manager.submit(b"a", {})
+            with pytest.raises(jobs.JobQueueFullError):
+                await manager.submit(b"b", {})
+        finally:
+            await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_callback_allowlist(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_CALLBACK_HOSTS", {"hooks.example.com"})
+    monkeypatch.setattr(jobs, "JOB_CALLBACK_URL", "http://internal/notify")
+
+    assert callback_error(None) is None
+    assert callback_error("http://internal/notify") is None
+    assert callback_error("https://HOOKS.example.com/nazar") is None
+    assert callback_error("http://169.254.169.254/latest") is not None
+    assert callback_error("file:///etc/passwd") is not None
+    assert callback_error("hooks.example.com/nazar") is not None
+
+
+def test_stream_source_allowlist(monkeypatch, tmp_path):
+    videos = tmp_path / "videos"
+    videos.mkdir()
+    monkeypatch.setattr(stream_ingest, "STREAM_SOURCE_HOSTS", {"cam.local"})
+    monkeypatch.setattr(stream_ingest, "STREAM_SOURCE_DIRS", [str(videos)])
+
+    assert stream_source_error("rtsp://cam.local:554/stream") is None
+    assert stream_source_error("rtsp://other.host/stream") is not None
+    assert stream_source_error("ftp://cam.local/stream") is not None
+    assert stream_source_error(str(videos / "lobby.mp4")) is None
+    assert stream_source_error(str(videos / ".." / "secret.mp4")) is not None
+
+    os.symlink("/etc/passwd", videos / "link.mp4")
+    assert stream_source_error(str(videos / "link.mp4")) is not None
@@ -0,0 +1,117 @@
+"""
+Tests for the exact-match response cache and the near-duplicate index.
+
+Run with: python -m pytest -q test_response_cache.py
+"""
+
+import cv2
+import numpy as np
+
+from core import near_duplicate
+from core.camera_state import CameraState
+from core.config import NEAR_DUPLICATE_MAX_DISTANCE
+from core.frame_context import FrameContext
+from core.response_cache import ResponseCache, cache_key
+from utils.synthetic_scenes import generate_scene
+
+
+def test_cache_key_covers_bytes_options_and_camera():
+    key = cache_key(b"frame", ("debug",), "cam1")
+    assert key == cache_key(b"frame", ("debug",), "cam1")
+    assert key != cache_key(b"frame!", ("debug",), "cam1")
+    assert key != cache_key(b"frame", (), "cam1")
+    assert key != cache_key(b"frame", ("debug",), "cam2")
+
+
+def test_hit_returns_an_independent_copy():
+    cache = ResponseCache()
+    cache.put("a", {"detection": "Water Leak", "boxes": [1, 2]})
+
+    first = cache.get("a")
+    first["boxes"].append(3)
+
+    assert cache.get("a") == {"detection": "Water Leak", "boxes": [1, 2]}
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    cache.get("a")
+    cache.put("c", {"n": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    assert cache.get("c") == {"n": 3}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_budget_evicts():
+    cache = ResponseCache(max_bytes=200)
+    cache.put("a", {"text": "x" * 120})
+    cache.put("b", {"text": "y" * 120})
+
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["bytes"] <= 200
+    assert cache.get("b") is not None
+
+
+def test_expired_entries_miss():
+    cache = ResponseCache(ttl=0)
+    cache.put("a", {"n": 1})
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_disk_store_is_shared(tmp_path):
+    path = str(tmp_path / "responses.sqlite3")
+    ResponseCache(db_path=path).put("a", {"n": 1})
+
+    other = ResponseCache(db_path=path)
+    assert other.get("a") == {"n": 1}
+    assert other.stats()["disk_hits"] == 1
+
+
+def _hash(frame):
+    return near_duplicate.dhash(FrameContext(frame))
+
+
+def test_recompressed_frame_is_a_near_duplicate():
+    frame = generate_scene("720p", 0)
+    ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    recompressed = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+    assert near_duplicate.hamming(_hash(frame), _hash(recompressed)) <= NEAR_DUPLICATE_MAX_DISTANCE
+
+    state = CameraState("cam1")
+    near_duplicate.remember(state, _hash(frame), ("debug",), {"detection": "No Issue"})
+
+    reused = near_duplicate.lookup(state, _hash(recompressed), ("debug",))
+    assert reused == {"detection": "No Issue", "reused": True}
+    # Other request options never share a response
+    assert near_duplicate.lookup(state, _hash(recompressed), ()) is None
+
+
+def test_changed_scene_is_analyzed():
+    frame = generate_scene("720p", 0)
+    changed = frame.copy()
+    h, w = changed.shape[:2]
+    cv2.rectangle(changed, (w // 4, h // 4), (3 * w // 4, 3 * h // 4), (0, 0, 0), -1)
+
+    state = CameraState("cam1")
+    near_duplicate.remember(state, _hash(frame), (), {"detection": "No Issue"})
+
+    assert near_duplicate.hamming(_hash(frame), _hash(changed)) > NEAR_DUPLICATE_MAX_DISTANCE
+    assert near_duplicate.lookup(state, _hash(changed), ()) is None
+
+
+def test_flat_frame_hash_ignores_noise():
+    rng = np.random.default_rng(0)
+    flat = np.full((480, 640, 3), 128, np.uint8)
+    noisy = np.clip(flat + rng.integers(-2, 3, flat.shape), 0, 255).astype(np.uint8)
+
+    assert _hash(flat) == _hash(noisy)
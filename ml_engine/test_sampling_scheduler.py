@@ -0,0 +1,118 @@
+"""
+Tests for the stream sampling scheduler: the max-min fair split of the
+inference budget and how sample outcomes move a camera's demand.
+
+Run with: python -m pytest -q test_sampling_scheduler.py
+"""
+
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from core.sampling_scheduler import SamplingScheduler, fair_share
+
+
+def test_fair_share_gives_small_demands_in_full():
+    allocation = fair_share({"a": 1.0, "b": 10.0, "c": 10.0}, 9.0)
+    assert allocation == pytest.approx({"a": 1.0, "b": 4.0, "c": 4.0})
+
+
+def test_fair_share_never_exceeds_budget_or_demand():
+    demands = {"a": 2.0, "b": 3.0, "c": 0.5}
+    for budget in (1.0, 4.0, 20.0):
+        allocation = fair_share(demands, budget)
+        assert sum(allocation.values()) <= budget + 1e-9
+        assert all(allocation[key] <= demands[key] for key in demands)
+    assert fair_share(demands, 20.0) == demands
+
+
+def _scheduler(**kwargs):
+    scheduler = SamplingScheduler(budget_fps=10, idle_fps=1, backoff=0.5, **kwargs)
+    # Registered cameras without the dispatcher thread
+    scheduler._ensure_started = lambda: None
+    return scheduler
+
+
+def _dispatch(scheduler, camera_id):
+    camera = scheduler._cameras[camera_id]
+    camera.busy = True
+    scheduler._in_flight += 1
+    scheduler._sample(camera)
+    return camera
+
+
+def test_idle_camera_backs_off_and_active_one_recovers():
+    scheduler = _scheduler()
+    outcomes = []
+
+    def sample():
+        future = Future()
+        future.set_result(outcomes.pop(0))
+        return future
+
+    scheduler.add("cam1", 8.0, sample)
+    outcomes.extend([False, False, True])
+
+    camera = _dispatch(scheduler, "cam1")
+    assert camera.demand == 4.0
+    _dispatch(scheduler, "cam1")
+    assert camera.demand == 2.0
+    _dispatch(scheduler, "cam1")
+    assert camera.demand == 8.0
+    assert scheduler._in_flight == 0
+    assert not camera.busy
+
+
+def test_sample_that_analyzed_nothing_keeps_demand():
+    scheduler = _scheduler()
+    failed = Future()
+    failed.set_exception(RuntimeError("decoder gone"))
+    results = [None, failed]
+
+    scheduler.add("cam1", 8.0, lambda: results.pop(0))
+    camera = scheduler._cameras["cam1"]
+    camera.demand = 4.0
+
+    _dispatch(scheduler, "cam1")
+    _dispatch(scheduler, "cam1")
+
+    assert camera.demand == 4.0
+    assert scheduler.rate("cam1")["effective_fps"] == 0
+    assert scheduler._in_flight == 0
+
+
+def test_budget_is_split_between_cameras():
+    scheduler = _scheduler()
+    scheduler.add("cam1", 8.0, lambda: None)
+    scheduler.add("cam2", 8.0, lambda: None)
+    scheduler.add("cam3", 2.0, lambda: None)
+
+    rates = scheduler.rates()
+    assert rates["cam3"]["allocated_fps"] == 2.0
+    assert rates["cam1"]["allocated_fps"] == 4.0
+    assert scheduler.stats()["allocated_fps"] == 10.0
+
+    scheduler.remove("cam3")
+    assert scheduler.rate("cam1")["allocated_fps"] == 5.0
+
+
+def test_dispatch_stays_within_budget():
+    scheduler = SamplingScheduler(budget_fps=20, idle_fps=1, backoff=0.5, workers=4)
+    calls = []
+
+    def sample():
+        calls.append(time.monotonic())
+        future = Future()
+        future.set_result(True)
+        return future
+
+    scheduler.add("cam1", 100.0, sample)
+    scheduler.add("cam2", 100.0, sample)
+    time.sleep(0.5)
+    scheduler.stop()
+
+    # 20 fps for 0.5 s, plus the first dispatch
+    assert 5 <= len(calls) <= 11
+    gaps = [b - a for a, b in zip(calls, calls[1:])]
+    assert min(gaps) >= 1 / 20 - 0.01
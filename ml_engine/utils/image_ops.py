@@ -25,3 +25,35 @@ def contour_area(binary_img):
 
 def brightness_score(gray):
     return np.mean(gray)
+
+def read_image_size(data):
+    """
+    Read (width, height) from JPEG or PNG header bytes without decoding.
+    Returns None for other formats or malformed headers.
+    """
+    # PNG: 8-byte signature, then the IHDR chunk with width/height
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+
+    if data[:2] != b"\xff\xd8":
+        return None
+
+    # JPEG: walk the marker segments up to the first start-of-frame
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = int.from_bytes(data[i + 5:i + 7], "big")
+            width = int.from_bytes(data[i + 7:i + 9], "big")
+            return width, height
+        i += 2 + int.from_bytes(data[i + 2:i + 4], "big")
+
+    return None
@@ -0,0 +1,144 @@
+"""
+Synthetic Scenes
+
+Deterministic indoor frames for benchmarking the detectors without
+camera footage or network access. Every scene is a pure function of
+(resolution, seed, features), so two runs on any machine get
+byte-identical frames.
+
+Layout (BGR): a bright ceiling with light panels and a fan across the
+top 40% (the detectors' CEILING_ROI), a wall band, and a floor with
+blue/dark puddles, crack-like line textures, rust patches and clutter.
+"""
+
+import cv2
+import numpy as np
+
+RESOLUTIONS = {
+    "480p": (854, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+}
+
+ALL_FEATURES = ("ceiling", "puddles", "cracks", "rust", "clutter")
+
+
+def _floor(h, w, top, rng):
+    """Grey floor with a vertical gradient and fine sensor-like noise."""
+    rows = h - top
+    gradient = np.linspace(120, 165, rows, dtype=np.float32)[:, None, None]
+    floor = np.broadcast_to(gradient, (rows, w, 3)).copy()
+    floor += rng.normal(0, 4, size=(rows, w, 1)).astype(np.float32)
+    return np.clip(floor, 0, 255).astype(np.uint8)
+
+
+def _draw_ceiling(frame, rng, s, fan_phase):
+    h, w = frame.shape[:2]
+    ceiling_h = int(h * 0.4)
+    frame[:ceiling_h] = (215, 220, 225)
+
+    # Light panels
+    for i in range(3):
+        cx = int(w * (0.2 + 0.3 * i))
+        cy = int(ceiling_h * rng.uniform(0.25, 0.5))
+        half_w, half_h = int(70 * s), int(18 * s)
+        cv2.rectangle(frame, (cx - half_w, cy - half_h), (cx + half_w, cy + half_h), (252, 252, 252), -1)
+
+    # Ceiling fan: hub and blades
+    cx, cy = int(w * rng.uniform(0.4, 0.6)), int(ceiling_h * 0.6)
+    radius = int(60 * s)
+    for k in range(3):
+        angle = fan_phase + k * 2 * np.pi / 3
+        tip = (int(cx + radius * np.cos(angle)), int(cy + radius * 0.4 * np.sin(angle)))
+        cv2.line(frame, (cx, cy), tip, (90, 90, 95), max(int(8 * s), 1))
+    cv2.circle(frame, (cx, cy), max(int(12 * s), 2), (60, 60, 60), -1)
+
+
+def _draw_puddles(frame, rng, s, floor_top):
+    h, w = frame.shape[:2]
+    for _ in range(3):
+        center = np.array([rng.uniform(0.1, 0.9) * w, rng.uniform(floor_top + 0.1 * h, 0.95 * h)])
+        radius = rng.uniform(30, 90) * s
+        # Irregular outline: a circle with a low-frequency radial wobble
+        angles = np.linspace(0, 2 * np.pi, 48, endpoint=False)
+        wobble = 1 + 0.25 * np.sin(3 * angles + rng.uniform(0, np.pi)) * rng.uniform(0.5, 1)
+        points = center + np.stack([np.cos(angles), 0.45 * np.sin(angles)], axis=1) * (radius * wobble)[:, None]
+        color = (150, 90, 40) if rng.random() < 0.5 else (45, 40, 38)   # blue-ish / dark
+        cv2.fillPoly(frame, [points.astype(np.int32)], color)
+
+
+def _draw_cracks(frame, rng, s):
+    h, w = frame.shape[:2]
+    for _ in range(4):
+        point = np.array([rng.uniform(0, w), rng.uniform(0.35 * h, h)])
+        points = [point.copy()]
+        direction = rng.uniform(0, 2 * np.pi)
+        for _ in range(25):
+            direction += rng.normal(0, 0.4)
+            point = point + np.array([np.cos(direction), np.sin(direction)]) * 12 * s
+            points.append(point.copy())
+        cv2.polylines(frame, [np.array(points, dtype=np.int32)], False, (35, 35, 35), max(int(2 * s), 1))
+
+
+def _draw_rust(frame, rng, s):
+    h, w = frame.shape[:2]
+    for _ in range(2):
+        center = (int(rng.uniform(0.05, 0.95) * w), int(rng.uniform(0.4, 0.55) * h))
+        axes = (int(rng.uniform(20, 45) * s), int(rng.uniform(10, 25) * s))
+        cv2.ellipse(frame, center, axes, rng.uniform(0, 180), 0, 360, (30, 75, 150), -1)
+
+
+def _draw_clutter(frame, rng, s, floor_top):
+    h, w = frame.shape[:2]
+    for _ in range(12):
+        x = int(rng.uniform(0, w))
+        y = int(rng.uniform(floor_top, h))
+        size = int(rng.uniform(8, 35) * s)
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        if rng.random() < 0.5:
+            cv2.rectangle(frame, (x, y), (x + size, y + size // 2), color, -1)
+        else:
+            cv2.circle(frame, (x, y), size // 2, color, -1)
+
+
+def generate_scene(resolution="720p", seed=0, features=ALL_FEATURES, fan_phase=0.0):
+    """
+    Build one synthetic frame.
+
+    Args:
+        resolution: Key of RESOLUTIONS or a (width, height) tuple
+        seed: Same seed, resolution and features -> identical frame
+        features: Subset of ALL_FEATURES to draw
+        fan_phase: Fan blade angle in radians (only thing that moves between frames)
+
+    Returns:
+        BGR uint8 frame
+    """
+    w, h = RESOLUTIONS[resolution] if isinstance(resolution, str) else resolution
+    rng = np.random.default_rng(seed)
+    # Geometry is authored for 720p and scaled with the frame width
+    s = w / 1280
+
+    frame = np.empty((h, w, 3), dtype=np.uint8)
+    floor_top = int(h * 0.55)
+    frame[:floor_top] = (175, 180, 185)   # wall
+    frame[floor_top:] = _floor(h, w, floor_top, rng)
+
+    if "ceiling" in features:
+        _draw_ceiling(frame, rng, s, fan_phase)
+    if "rust" in features:
+        _draw_rust(frame, rng, s)
+    if "cracks" in features:
+        _draw_cracks(frame, rng, s)
+    if "puddles" in features:
+        _draw_puddles(frame, rng, s, floor_top)
+    if "clutter" in features:
+        _draw_clutter(frame, rng, s, floor_top)
+
+    return frame
+
+
+def scene_sequence(resolution="720p", count=5, seed=0, features=ALL_FEATURES):
+    """`count` frames of the same scene with the fan rotated between frames."""
+    return [generate_scene(resolution, seed, features, fan_phase=0.7 * i) for i in range(count)]